@@ -2,7 +2,7 @@ import wx
 import wx.richtext as rt
 import platform
 import webbrowser
-import streamlink
+import utilities as util
 
 class About(wx.Dialog):
     def __init__(self, parent):
@@ -27,7 +27,7 @@ class About(wx.Dialog):
         ver = wx.StaticText(self, -1, f'Version: {self.parent.version}')
         pyVer = wx.StaticText(self, -1, f'Python: {platform.python_version()}')
         wxVer = wx.StaticText(self, -1, f'wxPython: {wx.__version__}')
-        streamlinkVer = wx.StaticText(self, -1, f'Streamlink: {streamlink.__version__}')
+        streamlinkVer = wx.StaticText(self, -1, f"Streamlink: {util.package_version('streamlink')}")
         self.rtc = rt.RichTextCtrl(self, -1, size=(300, 150), style=wx.TE_READONLY)
         self.rtc.GetCaret().Hide()
         self.rtc.Bind(wx.EVT_TEXT_URL, self.OnURL)
@@ -0,0 +1,284 @@
+'''
+The bandwidth budget of the recordings. With `bandwidth_limit` (bytes per second, 0 for none)
+and `bandwidth_domains` ({domain: bytes per second}), every chunk a recording reads takes its
+size in tokens from the global bucket and from the bucket of its domain.
+
+The buckets are shared by all recordings and weighted by priority (weight `1 / priority`, so a
+priority 1 streamer weighs five times a priority 5 one). When recordings wait for the same
+bucket, they're served in weighted fair order: each chunk moves a recording's turn forward by
+`size / weight`, so under contention the bytes are split in proportion to the weights. A bucket
+nobody waits for is used by whoever comes, so no bandwidth is left unused.
+
+Before a recording starts, `admit` checks that the budget can sustain it. Only the recordings
+with the same or a higher priority count against it, since the lower ones will give way. The
+policy (`bandwidth_admission`) decides what happens when it can't:
+
+    downgrade  a lower quality that fits is recorded instead, or nothing if none does (default)
+    refuse     nothing is recorded
+    off        everything is recorded, the buckets share what there is
+
+Recordings in worker processes (`recording_processes`) can't take from buckets in this process.
+Each one is granted a rate instead, its weighted share of every limit it's under (see `grant`),
+and the worker holds it to that rate with a bucket of its own. What a recording doesn't use of its
+share is granted to the others, but only as often as the grants are sent, every `GRANT_INTERVAL`.
+'''
+
+import time
+import heapq
+import itertools
+from threading import Condition, Lock
+from throughput import ThroughputMeter
+
+DOWNGRADE = 'downgrade'
+REFUSE = 'refuse'
+OFF = 'off'
+
+# Typical rates, in bytes per second, by the height of the video. For a quality never recorded before.
+TYPICAL_RATES = {1080: 750_000, 720: 450_000, 480: 190_000, 360: 120_000, 240: 60_000, 160: 40_000}
+UNKNOWN_RATE = 500_000
+
+# A recording is judged by its measured rate once it has run this long, in seconds.
+MEASURE_AFTER = 20
+
+# A recording in a worker process gets a new grant this often, in seconds.
+GRANT_INTERVAL = 2
+
+# A granted recording may use this much more than its rate so far, so it can show that it needs more.
+HEADROOM = 1.25
+
+def height(quality: str) -> int | None:
+    ''' Returns the height of a video quality such as `720p60`, or None for `audio_only` and the like. '''
+
+    height = quality.split('p')[0]
+    return int(height) if height.isdigit() else None
+
+def typical_rate(quality: str) -> int:
+    ''' Returns the usual rate of a quality such as `720p60`. '''
+
+    value = height(quality)
+    if value is None:
+        return UNKNOWN_RATE
+
+    for h, rate in sorted(TYPICAL_RATES.items()):
+        if value <= h:
+            return rate
+
+    return TYPICAL_RATES[1080] * value // 1080
+
+class TokenBucket():
+    ''' Tokens are bytes. They refill at `rate` per second, up to `burst`. '''
+
+    def __init__(self, rate: float, burst: float = None):
+        self.rate = rate
+        self.burst = burst or rate
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+        self.cond = Condition()
+        self.waiting = []
+        self.virtual = 0.0
+        self.counter = itertools.count()
+
+        self.waited = 0.0
+
+    def take(self, account, size: int):
+        ''' Takes `size` tokens for `account`, waiting for its turn and for the tokens. A chunk bigger than
+        the burst is let through when the bucket is full, and the next ones wait for the debt. '''
+
+        with self.cond:
+            tag = max(self.virtual, account.tags.get(id(self), 0.0)) + size / account.weight
+            account.tags[id(self)] = tag
+
+            entry = (tag, next(self.counter))
+            heapq.heappush(self.waiting, entry)
+            needed = min(size, self.burst)
+            start = time.monotonic()
+
+            while True:
+                self._refill()
+                if self.waiting[0] is entry:
+                    if self.tokens >= needed:
+                        break
+
+                    self.cond.wait((needed - self.tokens) / self.rate)
+                else:
+                    self.cond.wait()
+
+            heapq.heappop(self.waiting)
+            self.tokens -= size
+            self.virtual = tag
+            self.waited += time.monotonic() - start
+            self.cond.notify_all()
+
+    def set_rate(self, rate: float):
+        ''' Changes the rate, and the burst with it. '''
+
+        with self.cond:
+            self._refill()
+            self.rate = rate
+            self.burst = rate
+            self.tokens = min(self.tokens, self.burst)
+            self.cond.notify_all()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.tokens + (now - self.updated) * self.rate, self.burst)
+        self.updated = now
+
+class Account():
+    ''' What a recording uses of the budget. Only its own thread takes from it. '''
+
+    def __init__(self, name: str, domain: str, priority: int, estimate: float):
+        self.name = name
+        self.domain = domain
+        self.weight = 1 / max(priority, 1)
+        self.estimate = estimate
+        self.started = time.monotonic()
+
+        # Where this account's turn is, per bucket.
+        self.tags = {}
+        self.total = 0
+        self.meter = ThroughputMeter()
+        self.meter.sample(0, self.started)
+
+    def rate(self, now: float) -> float:
+        ''' The rate the budget has to sustain for this recording: the estimate, then the measured one. '''
+
+        if now - self.started < MEASURE_AFTER:
+            return self.estimate
+
+        return self.meter.rates()[1]
+
+class BandwidthBudget():
+    def __init__(self, limit: float = 0, domains: dict = None, policy: str = DOWNGRADE):
+        self.limit = limit
+        self.domains = domains or {}
+        self.policy = policy
+
+        self.bucket = TokenBucket(limit) if limit else None
+        self.buckets = {domain: TokenBucket(rate) for domain, rate in self.domains.items() if rate}
+
+        self.accounts = {}
+        self.lock = Lock()
+
+        self.admitted = 0
+        self.downgraded = 0
+        self.refused = 0
+
+    @property
+    def enabled(self) -> bool:
+        ''' Tells if there's a budget at all. Without one, recordings are neither admitted nor shaped. '''
+
+        return self.bucket is not None or bool(self.buckets)
+
+    def admit(self, name: str, domain: str, priority: int, qualities: list) -> tuple:
+        ''' Decides whether `name` may be recorded. `qualities` are (quality, estimated bytes per second),
+        the chosen one first, then the lower ones. Returns the quality to record and its `Account`, or (None, None). '''
+
+        with self.lock:
+            now = time.monotonic()
+            for i, (quality, estimate) in enumerate(qualities):
+                if self.policy == OFF or self._fits(domain, priority, estimate, now):
+                    account = Account(name, domain, priority, estimate)
+                    self.accounts[name] = account
+                    if i == 0:
+                        self.admitted += 1
+                    else:
+                        self.downgraded += 1
+
+                    return quality, account
+
+                if self.policy == REFUSE:
+                    break
+
+            self.refused += 1
+            return None, None
+
+    def take(self, account: Account, size: int):
+        ''' Called by a recording for each chunk it read. Waits while it's over its share. '''
+
+        bucket = self.buckets.get(account.domain)
+        if bucket is not None:
+            bucket.take(account, size)
+        if self.bucket is not None:
+            self.bucket.take(account, size)
+
+        self.measure(account, account.total + size)
+
+    def measure(self, account: Account, total: int):
+        ''' Records that the recording of `account` read `total` bytes so far. `take` does it, recordings
+        that are shaped by their `grant` instead (the ones in worker processes) call it themselves. '''
+
+        account.total = total
+        now = time.monotonic()
+        if now - account.meter.samples[-1][0] >= 1:
+            account.meter.sample(total, now)
+
+    def release(self, account: Account):
+        ''' The recording of `account` ended. '''
+
+        with self.lock:
+            if self.accounts.get(account.name) is account:
+                del self.accounts[account.name]
+
+    def grant(self, account: Account) -> float:
+        ''' Returns the rate `account` may use, for a recording that can't take from the buckets: the smallest
+        of its weighted shares of the global and domain limits. 0 means no limit. '''
+
+        with self.lock:
+            now = time.monotonic()
+            grants = []
+            if self.limit:
+                grants.append(self._share(self.limit, list(self.accounts.values()), now).get(account.name, 0))
+
+            limit = self.domains.get(account.domain)
+            if limit:
+                accounts = [a for a in self.accounts.values() if a.domain == account.domain]
+                grants.append(self._share(limit, accounts, now).get(account.name, 0))
+
+            return min(grants) if grants else 0
+
+    def stats(self) -> dict:
+        with self.lock:
+            now = time.monotonic()
+            used = sum(a.rate(now) for a in self.accounts.values())
+            waited = sum(b.waited for b in [self.bucket, *self.buckets.values()] if b is not None)
+
+            return {'recordings': len(self.accounts), 'rate': used, 'limit': self.limit, 'admitted': self.admitted,
+                'downgraded': self.downgraded, 'refused': self.refused, 'waited': waited}
+
+    def _share(self, capacity: float, accounts: list, now: float) -> dict:
+        ''' Splits `capacity` between `accounts` in proportion to their weights. Those that need less than their
+        part get what they need, with `HEADROOM`, and the rest is split between the others. Returns `name -> rate`. '''
+
+        shares = {}
+        while accounts:
+            unit = capacity / sum(a.weight for a in accounts)
+            satisfied = [a for a in accounts if a.rate(now) * HEADROOM <= unit * a.weight]
+            if not satisfied:
+                for a in accounts:
+                    shares[a.name] = unit * a.weight
+                break
+
+            for a in satisfied:
+                shares[a.name] = a.rate(now) * HEADROOM
+                capacity -= shares[a.name]
+            accounts = [a for a in accounts if a not in satisfied]
+
+        return shares
+
+    def _fits(self, domain: str, priority: int, estimate: float, now: float) -> bool:
+        ''' Tells if the global and domain budgets can sustain `estimate` more, next to the recordings
+        with the same or a higher priority. Must be called with `self.lock` held. '''
+
+        weight = 1 / max(priority, 1)
+        ahead = [a for a in self.accounts.values() if a.weight >= weight]
+
+        if self.limit and sum(a.rate(now) for a in ahead) + estimate > self.limit:
+            return False
+
+        limit = self.domains.get(domain)
+        if limit and sum(a.rate(now) for a in ahead if a.domain == domain) + estimate > limit:
+            return False
+
+        return True
@@ -0,0 +1,103 @@
+'''
+Startup time and memory of the headless mode against the GUI. Each mode is started in its own
+process, on a throwaway home folder with a configuration of `--streamers` streamers, and
+measured when it's ready: the scheduler built for the headless mode, the first idle event with
+the window shown for the GUI. Memory is the peak resident size of the process.
+
+Needs the app dependencies (streamlink, wxPython and pypubsub) installed, and a display for the GUI.
+
+    python benchmarks/headless_startup.py [--streamers 200] [--runs 5]
+'''
+
+import os
+import sys
+import json
+import argparse
+import tempfile
+import subprocess
+from statistics import median
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+# Both report (seconds until ready, peak RSS in KiB) as json and exit without waiting for anything.
+PRELUDE = '''
+import os, sys, json, time, resource
+start = time.perf_counter()
+def report():
+    print(json.dumps([time.perf_counter() - start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss]), flush=True)
+    os._exit(0)
+'''
+
+MODES = {
+    'python': PRELUDE + '''
+report()
+''',
+    'headless': PRELUDE + '''
+import logging
+import headless
+headless.Headless(os.environ['HOME'], logging.getLogger('benchmark'))
+report()
+''',
+    'gui': PRELUDE + '''
+import wx
+import main_wxframe
+app = wx.App()
+frame = main_wxframe.MainFrame(None)
+frame.Show()
+wx.CallAfter(report)
+app.MainLoop()
+''',
+}
+
+def make_home(streamers: int, start: bool = False) -> str:
+    ''' Makes a home folder with a configuration. The urls don't resolve, so nobody gets recorded. '''
+
+    home = tempfile.mkdtemp(prefix='looper-bench-')
+    appData = {'streamlink_version': -1, 'app_version': 0.1, 'download_dir': os.path.join(home, 'videos'),
+        'start_on_scheduler': start, 'tray_on_minimized': False, 'tray_on_closed': False,
+        'send_notifications': False, 'log_scroll_down': True, 'twitch_auth': '',
+        'domains': {'example.invalid': 30}, 'streamers_data': []}
+
+    for i in range(streamers):
+        appData['streamers_data'].append({'name': f"streamer{i}", 'url': f"https://example.invalid/streamer{i}",
+            'quality': 'best', 'priority': i % 5 + 1, 'wait_until': ''})
+
+    with open(os.path.join(home, '.streamlink_looper.json'), 'w') as f:
+        json.dump(appData, f)
+
+    return home
+
+def run(mode: str, home: str) -> tuple | None:
+    env = dict(os.environ, HOME=home, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get('PYTHONPATH')])))
+    proc = subprocess.run([sys.executable, '-c', MODES[mode]], cwd=ROOT, env=env, capture_output=True, text=True, timeout=120)
+    if proc.returncode != 0 or not proc.stdout.strip():
+        print(f"{mode}: failed.\n{proc.stderr.strip()}")
+        return None
+
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--streamers', type=int, default=200, help='Streamers in the configuration.')
+    parser.add_argument('--runs', type=int, default=5, help='Runs of each mode. The median is shown.')
+    args = parser.parse_args()
+
+    home = make_home(args.streamers)
+    print(f"{args.streamers} streamers, median of {args.runs} runs.\n")
+    print(f"{'mode':<10} {'ready':>10} {'peak RSS':>10}")
+
+    for mode in MODES:
+        results = []
+        for _ in range(args.runs):
+            result = run(mode, home)
+            if result is None:
+                break
+            results.append(result)
+
+        if results:
+            ready = median(r[0] for r in results)
+            rss = median(r[1] for r in results)
+            print(f"{mode:<10} {ready * 1000:>7.0f} ms {rss / 1024:>7.1f} MB")
+
+if __name__ == '__main__':
+    main()
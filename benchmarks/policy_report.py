@@ -0,0 +1,157 @@
+'''
+Offline evaluation of the check scheduling policies on a recorded check history.
+
+The history is split in time. The adaptive policy learns from the first part (`--train`)
+and both policies are replayed over the rest. Whether a streamer is live at a given moment
+is taken from the recorded check closest before it. A live session starts at the first check
+that found them live after one that didn't. Each streamer is replayed on its own: checked
+whenever its interval runs out, and not checked while it's being recorded.
+
+    python benchmarks/policy_report.py [--history ~/.streamlink_looper_history.bin]
+    python benchmarks/policy_report.py --synthetic 20 --weeks 6
+
+With `--synthetic`, a history is made up for streamers who each go live a few evenings a week.
+'''
+
+import os
+import sys
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from check_history import CheckHistory, Histogram, hour_of_week
+from check_policy import StaticPolicy, AdaptivePolicy
+
+WEEK = 7 * 24 * 3600
+
+def synthetic_records(streamers: int, weeks: int, wait_time: int) -> list:
+    ''' Returns (name, timestamp, online, latency) of static checks on made up weekly schedules. '''
+
+    random.seed(42)
+    start = 1_700_000_000
+    records = []
+
+    for i in range(streamers):
+        name = f"streamer{i}"
+        days = random.sample(range(7), random.randint(2, 5))
+        hour = random.randint(12, 21)
+        length = random.randint(2, 4) * 3600
+
+        t = start + random.random() * wait_time * 3
+        while t < start + weeks * WEEK:
+            since_midnight = (t - start) % 86400
+            day = int((t - start) // 86400) % 7
+            online = day in days and hour * 3600 <= since_midnight < hour * 3600 + length
+            records.append((name, t, online, 1.0))
+            t += wait_time * 3
+
+    records.sort(key=lambda r: r[1])
+    return records
+
+def sessions(observations: list) -> list:
+    ''' Returns (start, end) of each run of live checks. '''
+
+    result = []
+    start = None
+    for t, online in observations:
+        if online and start is None:
+            start = t
+        elif not online and start is not None:
+            result.append((start, t))
+            start = None
+
+    if start is not None:
+        result.append((start, observations[-1][0]))
+
+    return result
+
+def replay(policy, name: str, observations: list, begin: float, end: float, wait_time: int, priority: int) -> tuple:
+    ''' Replays the checks of one streamer between `begin` and `end`. Returns (checks, detected, missed, total delay). '''
+
+    streamer = {'name': name, 'priority': priority}
+    live = [s for s in sessions(observations) if s[0] >= begin and s[0] < end]
+
+    checks = 0
+    detected = 0
+    delay = 0.0
+    t = begin
+
+    for start, stop in live:
+        while t < start:
+            checks += 1
+            t += policy.interval(streamer, wait_time, t)
+
+        # The first check after the session started finds it, if it is still on.
+        if t < stop:
+            detected += 1
+            delay += t - start
+
+            # While it's recorded, nobody checks it. The wait starts over when it ends.
+            t = stop
+
+    while t < end:
+        checks += 1
+        t += policy.interval(streamer, wait_time, t)
+
+    return checks, detected, len(live) - detected, delay
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--history', default=os.path.expanduser('~/.streamlink_looper_history.bin'), help='History file to evaluate.')
+    parser.add_argument('--synthetic', type=int, default=0, help='Make up a history for this many streamers instead.')
+    parser.add_argument('--weeks', type=int, default=6, help='Weeks of synthetic history.')
+    parser.add_argument('--train', type=float, default=0.5, help='Share of the history the adaptive policy learns from.')
+    parser.add_argument('--wait-time', type=int, default=30, help='Domain wait time, in seconds.')
+    parser.add_argument('--priority', type=int, default=1, help='Priority of every streamer.')
+    args = parser.parse_args()
+
+    if args.synthetic:
+        records = synthetic_records(args.synthetic, args.weeks, args.wait_time)
+    else:
+        if not os.path.isfile(args.history):
+            print('There is no history file.')
+            return
+
+        # Read only: the app may be appending to it.
+        records = list(CheckHistory(args.history, read_only=True).records())
+
+    if not records:
+        print('The history is empty.')
+        return
+
+    first = min(r[1] for r in records)
+    last = max(r[1] for r in records)
+    split = first + (last - first) * args.train
+
+    observations = {}
+    histograms = {}
+    for name, t, online, _ in records:
+        observations.setdefault(name, []).append((t, online))
+        if t < split:
+            histograms.setdefault(name, Histogram()).add(hour_of_week(t), online)
+
+    for obs in observations.values():
+        obs.sort()
+
+    print(f"{len(records)} checks of {len(observations)} streamers, {(last - first) / 86400:.1f} days. "
+        f"Learning from the first {args.train:.0%}.\n")
+    print(f"{'policy':<10} {'checks':>10} {'sessions':>9} {'missed':>7} {'checks/found':>13} {'mean delay':>11}")
+
+    for policy in (StaticPolicy(), AdaptivePolicy(histograms)):
+        checks = detected = missed = 0
+        delay = 0.0
+        for name, obs in observations.items():
+            c, d, m, total = replay(policy, name, obs, split, last, args.wait_time, args.priority)
+            checks += c
+            detected += d
+            missed += m
+            delay += total
+
+        per_found = f"{checks / detected:.1f}" if detected else '-'
+        mean_delay = f"{delay / detected:.0f} s" if detected else '-'
+        label = type(policy).__name__.replace('Policy', '').lower()
+        print(f"{label:<10} {checks:>10} {detected + missed:>9} {missed:>7} {per_found:>13} {mean_delay:>11}")
+
+if __name__ == '__main__':
+    main()
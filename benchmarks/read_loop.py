@@ -0,0 +1,132 @@
+'''
+Micro-benchmark for the download copy loop. Compares the old 1 KiB `read` loop
+against `ChunkReader`, using fake in-memory streams, so no network is involved.
+
+    python benchmarks/read_loop.py [--size-mb 256] [--recordings 1]
+'''
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from chunk_reader import ChunkReader, DEFAULT_CHUNK_SIZE
+
+class FakeStream():
+    ''' A stream that serves `total` bytes from a repeated payload, `burst` bytes at most per call. '''
+
+    def __init__(self, total: int, burst: int = 188 * 1024):
+        self.payload = os.urandom(burst)
+        self.burst = burst
+        self.left = total
+
+    def read(self, size: int = -1) -> bytes:
+        if self.left <= 0:
+            return b''
+
+        n = min(size, self.burst, self.left)
+        self.left -= n
+        # A real socket read allocates a new object every time.
+        return bytes(memoryview(self.payload)[:n])
+
+class FakeReadIntoStream(FakeStream):
+    ''' Same as `FakeStream`, but also supports `readinto`. '''
+
+    def readinto(self, buffer) -> int:
+        if self.left <= 0:
+            return 0
+
+        n = min(len(buffer), self.burst, self.left)
+        buffer[:n] = self.payload[:n]
+        self.left -= n
+        return n
+
+class NullFile():
+    ''' Swallows writes, so disk speed is not measured. '''
+
+    def write(self, data) -> int:
+        return len(data)
+
+def legacy_loop(stream, file):
+    ''' The loop `Download.start_download` used before `ChunkReader`. '''
+
+    dl_total = 0
+    dl_temp = 0
+    start = time.perf_counter()
+    data = stream.read(1024)
+
+    while data:
+        dl_total += len(data)
+        dl_temp += len(data)
+
+        diff = time.perf_counter() - start
+        if diff > 1:
+            start = time.perf_counter()
+            dl_temp = 0
+
+        file.write(data)
+        data = stream.read(1024)
+
+    return dl_total
+
+def chunk_loop(stream, file, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    ''' The loop `Download.start_download` uses now. '''
+
+    dl_total = 0
+    dl_temp = 0
+    reader = ChunkReader(stream, chunk_size)
+    start = time.perf_counter()
+
+    while True:
+        data = reader.read()
+        if not data:
+            break
+
+        file.write(data)
+
+        size = len(data)
+        dl_total += size
+        dl_temp += size
+
+        diff = time.perf_counter() - start
+        if diff > 1:
+            start = time.perf_counter()
+            dl_temp = 0
+
+    return dl_total
+
+def run(name: str, loop, stream_class, total: int, recordings: int):
+    wall = 0.0
+    cpu = 0.0
+    copied = 0
+
+    for _ in range(recordings):
+        stream = stream_class(total)
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+
+        copied += loop(stream, NullFile())
+
+        wall += time.perf_counter() - wall_start
+        cpu += time.process_time() - cpu_start
+
+    mb = copied / 1_048_576
+    print(f"{name:<28} {mb / wall:>10.1f} MB/s {cpu / recordings:>10.3f} s CPU per recording")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--size-mb', type=int, default=256, help='Bytes copied per recording, in MB.')
+    parser.add_argument('--recordings', type=int, default=1, help='How many recordings to simulate.')
+    args = parser.parse_args()
+
+    total = args.size_mb * 1_048_576
+    print(f"{args.recordings} recording(s) of {args.size_mb} MB each")
+
+    run('legacy read(1024)', legacy_loop, FakeStream, total, args.recordings)
+    run('ChunkReader read()', chunk_loop, FakeStream, total, args.recordings)
+    run('ChunkReader readinto()', chunk_loop, FakeReadIntoStream, total, args.recordings)
+
+if __name__ == '__main__':
+    main()
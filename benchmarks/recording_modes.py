@@ -0,0 +1,155 @@
+'''
+Thread mode against process mode, with N synthetic streams recorded at once.
+
+Each synthetic stream gives `--rate` bytes per second, in chunks, and spends `--cpu` ms of pure
+Python work on each MB it gives, like the segment fetching and decryption of a real stream.
+A stream never gets ahead of its rate, but it falls behind when its reads wait for the GIL.
+After `--seconds`, the files on disk are measured: a mode that keeps up has every stream at
+100% of its rate.
+
+    python benchmarks/recording_modes.py [--streams 5 10 20 40] [--processes 4] [--seconds 10]
+
+Only the standard library and the app modules are used, so streamlink isn't needed.
+'''
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+from threading import Thread
+from statistics import mean
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import pipeline
+from download_thread import copy_stream
+from progress import Progress
+from recording_workers import RecordingPool
+
+CHUNK = 64 * 1024
+
+class SyntheticStream():
+    ''' A stream of `rate` bytes per second, each MB costing `cpu` seconds of Python work, for `seconds`. '''
+
+    def __init__(self, rate: int, cpu: float, seconds: float, loops_per_second: float):
+        self.rate = rate
+        self.seconds = seconds
+        self.loops = int(cpu * loops_per_second * CHUNK / 1_048_576)
+        self.start = None
+        self.sent = 0
+
+    def readinto(self, view) -> int:
+        now = time.monotonic()
+        if self.start is None:
+            self.start = now
+
+        if now - self.start >= self.seconds or self.sent >= self.rate * self.seconds:
+            return 0
+
+        due = self.start + self.sent / self.rate
+        if due > now:
+            time.sleep(due - now)
+
+        burn(self.loops)
+        n = min(len(view), CHUNK)
+        self.sent += n
+        return n
+
+    def close(self):
+        pass
+
+def burn(loops: int):
+    x = 0
+    for i in range(loops):
+        x += i
+
+def calibrate() -> float:
+    ''' Returns how many `burn` loops run in a second. '''
+
+    loops = 1_000_000
+    start = time.perf_counter()
+    burn(loops)
+    return loops / (time.perf_counter() - start)
+
+def open_synthetic(sessions, url: str, quality: str):
+    ''' Worker opener. The url is `synthetic://rate/cpu/seconds/loops_per_second`. '''
+
+    rate, cpu, seconds, loops = url[len('synthetic://'):].split('/')
+    return SyntheticStream(int(rate), float(cpu), float(seconds), float(loops))
+
+def run_threads(urls: list, directory: str):
+    ''' Records every stream in a thread of this process, like thread mode. '''
+
+    threads = []
+    for i, url in enumerate(urls):
+        stream = open_synthetic(None, url, 'best')
+        path = os.path.join(directory, f"{i}.ts")
+        t = Thread(target=copy_stream, args=(stream, path, Progress(str(i), 'best'), lambda: True),
+            kwargs={'buffer_policy': pipeline.BLOCK})
+        t.start()
+        threads.append(t)
+
+    for t in threads:
+        t.join()
+
+def run_processes(urls: list, directory: str, processes: int):
+    ''' Records every stream in a pool of worker processes, like process mode. '''
+
+    pool = RecordingPool(processes, open_synthetic)
+    pool.start()
+
+    # The workers are started before the clock, so only the recording is measured.
+    time.sleep(1)
+
+    recordings = [pool.submit(url, 'best', os.path.join(directory, f"{i}.ts"), {}) for i, url in enumerate(urls)]
+    for recording in recordings:
+        recording.done.wait()
+
+    pool.shutdown()
+
+def measure(mode: str, streams: int, args, loops_per_second: float) -> tuple:
+    ''' Returns the share of the target rate that the streams got, on average and for the slowest one. '''
+
+    directory = tempfile.mkdtemp(prefix='looper-modes-')
+    url = f"synthetic://{args.rate}/{args.cpu / 1000}/{args.seconds}/{loops_per_second}"
+    urls = [url] * streams
+
+    try:
+        if mode == 'threads':
+            run_threads(urls, directory)
+        else:
+            run_processes(urls, directory, args.processes)
+
+        target = args.rate * args.seconds
+        shares = [os.path.getsize(os.path.join(directory, f"{i}.ts")) / target for i in range(streams)]
+    finally:
+        shutil.rmtree(directory)
+
+    return mean(shares), min(shares)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--streams', type=int, nargs='+', default=[5, 10, 20, 40], help='Concurrent streams to try.')
+    parser.add_argument('--processes', type=int, default=4, help='Worker processes in process mode.')
+    parser.add_argument('--seconds', type=float, default=10, help='How long each stream lasts.')
+    parser.add_argument('--rate', type=int, default=750_000, help='Bytes per second of each stream (750 kB/s = 6 Mbit/s).')
+    parser.add_argument('--cpu', type=float, default=40, help='Milliseconds of Python work per MB of stream.')
+    args = parser.parse_args()
+
+    loops_per_second = calibrate()
+    print(f"{args.rate / 1000:.0f} kB/s per stream, {args.cpu:.0f} ms of CPU per MB, {args.seconds:.0f} s, "
+        f"{args.processes} worker processes, {os.cpu_count()} CPUs.\n")
+    print(f"{'streams':>8} {'threads':>16} {'processes':>16}   (mean / slowest share of the target rate)")
+
+    for streams in args.streams:
+        results = []
+        for mode in ('threads', 'processes'):
+            average, slowest = measure(mode, streams, args, loops_per_second)
+            results.append(f"{average:>7.0%} / {slowest:>4.0%}")
+
+        print(f"{streams:>8} {results[0]:>16} {results[1]:>16}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+'''
+Scaling check for the Scheduler lookups. Builds a Scheduler with thousands of streamers
+spread over a few domains and times the operations that used to scan every queue.
+The time per operation should stay flat as the catalog grows.
+
+Needs the app dependencies (streamlink, wxPython and pypubsub) installed.
+
+    python benchmarks/scheduler_lookups.py [--sizes 1000 10000 50000] [--domains 4]
+'''
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from scheduler import Scheduler
+from config_store import ConfigStore
+
+def make_app_data(count: int, domains: int, directory: str) -> dict:
+    ''' The recordings, the catalog and the check history go in `directory`, not in the home folder. '''
+
+    appData = {'download_dir': directory, 'catalog_path': os.path.join(directory, 'recordings.db'),
+        'history_path': os.path.join(directory, 'history.bin'), 'domains': {}, 'streamers_data': []}
+    for d in range(domains):
+        appData['domains'][f"site{d}.tv"] = 30
+
+    for i in range(count):
+        appData['streamers_data'].append({'name': f"streamer{i}", 'url': f"https://site{i % domains}.tv/streamer{i}",
+            'quality': 'best', 'priority': i % 5 + 1, 'wait_until': ''})
+
+    return appData
+
+def timed(function, names: list) -> float:
+    ''' Returns the mean time, in microseconds, of `function(name)` over `names`. '''
+
+    start = time.perf_counter()
+    for name in names:
+        function(name)
+
+    return (time.perf_counter() - start) / len(names) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10_000, 50_000], help='Catalog sizes to try.')
+    parser.add_argument('--domains', type=int, default=4, help='How many domains the streamers are spread over.')
+    parser.add_argument('--ops', type=int, default=1000, help='Operations timed per size.')
+    args = parser.parse_args()
+
+    print(f"{'streamers':>10} {'lookup':>10} {'requeue':>10} {'unfridge':>10} {'thread':>10}   (us per operation)")
+
+    for size in args.sizes:
+        directory = tempfile.TemporaryDirectory()
+        scheduler = Scheduler(None, ConfigStore(make_app_data(size, args.domains, directory.name)), False)
+        step = max(size // args.ops, 1)
+        names = [f"streamer{i}" for i in range(0, size, step)][:args.ops]
+
+        lookup = timed(scheduler.GetStreamerByName, names)
+
+        def requeue(name):
+            streamer = scheduler.GetStreamerByName(name)
+            domain = scheduler.queueOf[name]['domain']
+            scheduler.RemoveFromQueue(name)
+            scheduler.AddToQueue(streamer, domain)
+
+        requeue_time = timed(requeue, names)
+        unfridge = timed(scheduler.TransferFromFridgeToQueue, names)
+        thread = timed(scheduler.RemoveFromThread, names)
+
+        print(f"{size:>10} {lookup:>10.2f} {requeue_time:>10.2f} {unfridge:>10.2f} {thread:>10.2f}")
+        scheduler.engine.shutdown()
+        scheduler.history.close()
+        scheduler.catalog.close()
+        directory.cleanup()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+'''
+Benchmark for picking the next streamer to check in a domain. Compares the old
+full sort of the queue on every pick with the `IndexedHeap` the scheduler uses now.
+
+    python benchmarks/scheduler_pick.py [--streamers 10000] [--picks 2000]
+'''
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from domain_queue import IndexedHeap
+
+WAIT_TIME = 30
+
+def make_streamers(count: int) -> list:
+    random.seed(42)
+    streamers = []
+    for i in range(count):
+        wait_until = '2099-01-01 00:00:00' if random.random() < 0.05 else ''
+        streamers.append({'name': f"streamer{i}", 'priority': random.randint(1, 5), 'wait_until': wait_until,
+            'waited': random.randint(0, 600), 'checked_at': -random.randint(0, 600)})
+
+    return streamers
+
+def sort_pick(streamers: list, sec: int):
+    ''' What `Scheduler.ChooseOne` did before: score everybody, sort and scan. '''
+
+    wait_queue = []
+    i = 0
+    for streamer in streamers:
+        limit = WAIT_TIME * 3 * streamer['priority']
+        wait_queue.append((i, streamer['waited'] - limit))
+        i += 1
+
+    wait_queue.sort(reverse=True, key=lambda x: x[1])
+
+    for index in wait_queue:
+        streamer = streamers[index[0]]
+        if streamer['wait_until'] == '':
+            streamer['waited'] = 0
+            return streamer
+
+def heap_pick(heap: IndexedHeap, sec: int):
+    ''' What `Scheduler.ChooseOne` does now: pop the top, check it, push it back. '''
+
+    while heap:
+        _, _, streamer = heap.pop()
+        if streamer['wait_until'] == '':
+            streamer['checked_at'] = sec
+            heap.push(streamer['name'], sec + WAIT_TIME * 3 * streamer['priority'], streamer)
+            return streamer
+
+def measure(name: str, pick, data, picks: int):
+    times = []
+    for sec in range(picks):
+        start = time.perf_counter()
+        pick(data, sec)
+        times.append(time.perf_counter() - start)
+
+    times.sort()
+    mean = sum(times) / len(times)
+    p99 = times[int(len(times) * 0.99)]
+    print(f"{name:<14} mean {mean * 1e6:>10.1f} us   p99 {p99 * 1e6:>10.1f} us")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--streamers', type=int, default=10_000, help='Streamers in the domain.')
+    parser.add_argument('--picks', type=int, default=2000, help='How many picks to time.')
+    args = parser.parse_args()
+
+    print(f"{args.streamers} streamers in one domain, {args.picks} picks")
+
+    measure('full sort', sort_pick, make_streamers(args.streamers), args.picks)
+
+    heap = IndexedHeap()
+    for streamer in make_streamers(args.streamers):
+        if streamer['wait_until'] == '':
+            heap.push(streamer['name'], streamer['checked_at'] + WAIT_TIME * 3 * streamer['priority'], streamer)
+
+    measure('indexed heap', heap_pick, heap, args.picks)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+'''
+Cold start report. Starts the app `--runs` times, each in a fresh process on a throwaway home
+folder, until the result of its first check arrives. Shows the median time of each startup
+phase (see `startup.py`) against its budget, and the wall time of the whole process. Exits
+with 1 if a phase is over budget, so it can run in CI.
+
+The checks go to urls that don't resolve, so the first check is quick and nothing is recorded.
+With `--imports`, one more run under `python -X importtime` lists the slowest imports.
+
+Needs the app dependencies (streamlink and pypubsub, and wxPython with a display for the GUI).
+
+    python benchmarks/startup_report.py [--mode headless|gui] [--runs 5] [--imports 15]
+'''
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+from statistics import median
+
+from headless_startup import ROOT, make_home
+
+sys.path.insert(0, ROOT)
+
+from startup import BUDGET
+
+# Both print the phases as json once the first check is done, then exit right away.
+CHILDREN = {
+    'headless': '''
+import startup
+import os, json, logging
+import headless
+startup.mark('imports')
+
+def poll():
+    if 'first check' in startup.phases():
+        print(json.dumps(startup.phases()), flush=True)
+        os._exit(0)
+
+app = headless.Headless(os.environ['HOME'], logging.getLogger('benchmark'))
+app.loop.on_tick = poll
+app.loop.tick = 0.01
+app.loop.run()
+''',
+    'gui': '''
+import startup
+import os, json
+import wx
+import main_wxframe
+startup.mark('imports')
+
+def poll():
+    if 'first check' in startup.phases():
+        print(json.dumps(startup.phases()), flush=True)
+        os._exit(0)
+    wx.CallLater(10, poll)
+
+app = wx.App()
+frame = main_wxframe.MainFrame(None)
+frame.Show()
+wx.CallAfter(startup.mark, 'window shown')
+wx.CallLater(10, poll)
+app.MainLoop()
+''',
+}
+
+def run(mode: str, home: str, flags: tuple = ()) -> tuple:
+    ''' Runs the app once. Returns the phases, the wall time of the process and its stderr. '''
+
+    env = dict(os.environ, HOME=home, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get('PYTHONPATH')])))
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, *flags, '-c', CHILDREN[mode]], cwd=ROOT, env=env, capture_output=True,
+        text=True, timeout=120)
+    wall = time.perf_counter() - start
+
+    if proc.returncode != 0 or not proc.stdout.strip():
+        sys.exit(f"{mode}: failed.\n{proc.stderr.strip()}")
+
+    return json.loads(proc.stdout.strip().splitlines()[-1]), wall, proc.stderr
+
+def slowest_imports(stderr: str, count: int) -> list:
+    ''' Returns (cumulative microseconds, module) of the slowest top level imports in `-X importtime` output. '''
+
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nested imports are indented. Only the ones done by the app itself are listed.
+        if not name.startswith('  '):
+            imports.append((int(cumulative), name.strip()))
+
+    imports.sort(reverse=True)
+    return imports[:count]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--mode', choices=CHILDREN, default='headless', help='Which app to start.')
+    parser.add_argument('--runs', type=int, default=5, help='Runs. The median is shown.')
+    parser.add_argument('--streamers', type=int, default=200, help='Streamers in the configuration.')
+    parser.add_argument('--imports', type=int, default=0, help='List this many of the slowest imports.')
+    args = parser.parse_args()
+
+    home = make_home(args.streamers, start=True)
+
+    # The first run only warms the disk cache.
+    run(args.mode, home)
+
+    phases = {}
+    walls = []
+    for _ in range(args.runs):
+        result, wall, _ = run(args.mode, home)
+        walls.append(wall)
+        for name, seconds in result.items():
+            phases.setdefault(name, []).append(seconds)
+
+    print(f"{args.mode}, {args.streamers} streamers, median of {args.runs} runs.\n")
+    print(f"{'phase':<16} {'time':>9} {'budget':>9}")
+
+    over = False
+    for name, values in sorted(phases.items(), key=lambda item: median(item[1])):
+        seconds = median(values)
+        budget = BUDGET.get(name)
+        flag = ''
+        if budget is not None and seconds > budget:
+            flag = '  over budget'
+            over = True
+
+        budget_text = f"{budget:.2f} s" if budget is not None else '-'
+        print(f"{name:<16} {seconds:>7.3f} s {budget_text:>9}{flag}")
+
+    print(f"{'process':<16} {median(walls):>7.3f} s {'-':>9}")
+
+    if args.imports:
+        _, _, stderr = run(args.mode, home, ['-X', 'importtime'])
+        print("\nSlowest imports:")
+        for cumulative, name in slowest_imports(stderr, args.imports):
+            print(f"{cumulative / 1000:>9.1f} ms  {name}")
+
+    sys.exit(1 if over else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,190 @@
+'''
+Runs the liveness checks concurrently on a thread pool. Each domain has a cap on how many
+of its checks may run at once, so one website is never hit by a burst of requests; the
+rest wait in a per-domain queue. A check that takes longer than `timeout` is reported
+as timed out right away. Whatever it returns later is handed to its `discard` function.
+
+The time each check waited for a slot and the time the probe itself took are recorded
+per domain. Together they are the detection latency: how long after being chosen
+a streamer's status is known.
+'''
+
+import time
+import heapq
+import itertools
+from collections import deque
+from threading import Thread, Condition
+from concurrent.futures import ThreadPoolExecutor
+from utilities import LatencyStats
+
+class Check():
+    __slots__ = ('domain', 'data', 'job', 'callback', 'discard', 'submitted', 'started', 'finished',
+        'result', 'error', 'timed_out', 'done')
+
+    def __init__(self, domain: str, data, job, callback, discard):
+        self.domain = domain
+        self.data = data
+        self.job = job
+        self.callback = callback
+        self.discard = discard
+
+        self.submitted = time.monotonic()
+        self.started = None
+        self.finished = None
+
+        self.result = None
+        self.error = None
+        self.timed_out = False
+        self.done = False
+
+    def latency(self) -> float:
+        ''' Returns the seconds from the submission until the result was known. '''
+
+        return self.finished - self.submitted
+
+class CheckEngine():
+    def __init__(self, max_workers: int = 8, domain_limit: int = 2, timeout: float = 30):
+        self.domain_limit = domain_limit
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers, thread_name_prefix='check')
+
+        self.cond = Condition()
+        self.pending = {}
+        self.running = {}
+        self.deadlines = []
+        self.counter = itertools.count()
+        self.isClosed = False
+
+        # domain -> {'queued', 'probe', 'latency'} LatencyStats, plus timeout count.
+        self.latency = {}
+        self.timeouts = {}
+
+        self.watchdog = Thread(target=self._watch, name='check-watchdog', daemon=True)
+        self.watchdog.start()
+
+    def submit(self, domain: str, data, job, callback, discard = None) -> Check:
+        ''' Queues `job(data)` to run when `domain` has a free slot. `callback(check)` is called
+        from a worker thread with the finished (or timed out) check. '''
+
+        check = Check(domain, data, job, callback, discard)
+        with self.cond:
+            if self.isClosed:
+                return check
+
+            self.pending.setdefault(domain, deque()).append(check)
+            self._dispatch(domain)
+
+        return check
+
+    def in_flight(self, domain: str) -> int:
+        ''' Returns how many checks of `domain` are running or waiting for a slot. '''
+
+        with self.cond:
+            return self.running.get(domain, 0) + len(self.pending.get(domain, ()))
+
+    def stats(self) -> dict:
+        ''' Returns, for each domain, the count, mean and max of the queued, probe and total latencies, and the timeouts. '''
+
+        with self.cond:
+            result = {}
+            for domain, stats in self.latency.items():
+                result[domain] = {key: (s.count, s.mean(), s.max) for key, s in stats.items()}
+                result[domain]['timeouts'] = self.timeouts.get(domain, 0)
+
+            return result
+
+    def shutdown(self):
+        ''' Stops accepting checks. The ones already running are left to finish. '''
+
+        with self.cond:
+            self.isClosed = True
+            self.pending.clear()
+            self.cond.notify_all()
+
+        self.executor.shutdown(wait=False)
+
+    def _dispatch(self, domain: str):
+        ''' Starts pending checks of `domain` while it has free slots. Must be called with `self.cond` held. '''
+
+        queue = self.pending.get(domain)
+        while queue and self.running.get(domain, 0) < self.domain_limit:
+            check = queue.popleft()
+            self.running[domain] = self.running.get(domain, 0) + 1
+            self.executor.submit(self._run, check)
+
+    def _run(self, check: Check):
+        ''' Runs a check in a worker thread. '''
+
+        check.started = time.monotonic()
+        with self.cond:
+            heapq.heappush(self.deadlines, (check.started + self.timeout, next(self.counter), check))
+            self.cond.notify_all()
+
+        result = None
+        error = None
+        try:
+            result = check.job(check.data)
+        except Exception as e:
+            error = e
+
+        finished = time.monotonic()
+        with self.cond:
+            isLate = check.done
+            check.done = True
+
+            self.running[check.domain] -= 1
+            if not self.isClosed:
+                self._dispatch(check.domain)
+
+            if not isLate:
+                check.finished = finished
+                self._record(check)
+
+        if isLate:
+            if check.discard:
+                check.discard(result)
+            return
+
+        check.result = result
+        check.error = error
+        check.callback(check)
+
+    def _record(self, check: Check):
+        ''' Adds the check timings to the statistics. Must be called with `self.cond` held. '''
+
+        stats = self.latency.get(check.domain)
+        if stats is None:
+            stats = {'queued': LatencyStats(), 'probe': LatencyStats(), 'latency': LatencyStats()}
+            self.latency[check.domain] = stats
+
+        stats['queued'].add(check.started - check.submitted)
+        stats['probe'].add(check.finished - check.started)
+        stats['latency'].add(check.latency())
+
+    def _watch(self):
+        ''' Reports the checks that run past their deadline. '''
+
+        while True:
+            expired = []
+            with self.cond:
+                while not expired:
+                    if self.isClosed:
+                        return
+
+                    now = time.monotonic()
+                    while self.deadlines and (self.deadlines[0][2].done or self.deadlines[0][0] <= now):
+                        check = heapq.heappop(self.deadlines)[2]
+                        if not check.done:
+                            check.done = True
+                            check.timed_out = True
+                            check.finished = now
+                            self._record(check)
+                            self.timeouts[check.domain] = self.timeouts.get(check.domain, 0) + 1
+                            expired.append(check)
+
+                    if not expired:
+                        wait = self.deadlines[0][0] - now if self.deadlines else None
+                        self.cond.wait(wait)
+
+            for check in expired:
+                check.callback(check)
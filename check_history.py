@@ -0,0 +1,204 @@
+'''
+Every check result, kept in an append-only binary file, and a per-streamer histogram of the
+168 hours of the week built from it. The histogram is what the adaptive scheduling policy reads
+to know when a streamer usually goes live.
+
+The file is a sequence of records, each starting with a one byte tag:
+
+    b'N' <name length: uint16> <name: utf-8>                      a new streamer name, numbered in order
+    b'C' <name number: uint32> <epoch time: float64> <online: uint8> <latency: float32>
+    b'R' <name number: uint32> <name length: uint16> <name: utf-8>   that streamer was renamed
+
+A check takes 18 bytes. The names are written once, the first time a streamer is checked. A
+renamed streamer keeps their number, so their history follows them to the new name.
+'''
+
+import os
+import time
+import struct
+from array import array
+from threading import Lock
+
+HOURS_IN_WEEK = 168
+
+NAME = struct.Struct('<cH')
+CHECK = struct.Struct('<cIdBf')
+RENAME = struct.Struct('<cIH')
+
+def hour_of_week(timestamp: float) -> int:
+    ''' Returns the local hour of the week of `timestamp`, from 0 (Monday, 00h) to 167. '''
+
+    t = time.localtime(timestamp)
+    return t.tm_wday * 24 + t.tm_hour
+
+class Histogram():
+    __slots__ = ('checks', 'online')
+
+    def __init__(self):
+        self.checks = array('I', bytes(4 * HOURS_IN_WEEK))
+        self.online = array('I', bytes(4 * HOURS_IN_WEEK))
+
+    def add(self, hour: int, online: bool):
+        self.checks[hour] += 1
+        if online:
+            self.online[hour] += 1
+
+class CheckHistory():
+    def __init__(self, path: str, read_only: bool = False):
+        ''' Loads the history at `path`. With `read_only`, the file is never created, repaired or written,
+        so it can be read while the app is appending to it, and `record` can't be used. '''
+
+        self.path = path
+        self.lock = Lock()
+
+        self.ids = {}
+        self.names = []
+        self.histograms = {}
+
+        # Where the last complete record ends.
+        self.end = 0
+
+        if os.path.isfile(path):
+            for tag, id, *fields in self._read():
+                if tag == b'N':
+                    self._add_name(fields[0])
+                elif tag == b'R':
+                    self._move(id, fields[0])
+                else:
+                    timestamp, online, _ = fields
+                    self._histogram(self.names[id]).add(hour_of_week(timestamp), online)
+
+            # Drops a record left half written by a crash, so new ones are appended after a complete one.
+            if not read_only and os.path.getsize(path) > self.end:
+                os.truncate(path, self.end)
+
+        self.file = None if read_only else open(path, 'ab')
+
+    def record(self, name: str, timestamp: float, online: bool, latency: float):
+        ''' Appends a check result and adds it to the histogram of `name`. '''
+
+        with self.lock:
+            id = self.ids.get(name)
+            if id is None:
+                encoded = name.encode('utf-8')
+                self.file.write(NAME.pack(b'N', len(encoded)) + encoded)
+                id = self._add_name(name)
+
+            self.file.write(CHECK.pack(b'C', id, timestamp, online, latency))
+            self.file.flush()
+
+            self._histogram(name).add(hour_of_week(timestamp), online)
+
+    def rename(self, oldName: str, newName: str):
+        ''' Moves the history of `oldName` to `newName`. What `newName` had before is dropped. '''
+
+        with self.lock:
+            id = self.ids.get(oldName)
+            if id is None or oldName == newName:
+                return
+
+            encoded = newName.encode('utf-8')
+            self.file.write(RENAME.pack(b'R', id, len(encoded)) + encoded)
+            self.file.flush()
+            self._move(id, newName)
+
+    def histogram(self, name: str) -> Histogram | None:
+        ''' Returns the histogram of `name`, or None if it was never checked. '''
+
+        return self.histograms.get(name)
+
+    def records(self):
+        ''' Reads the whole file. Yields (name, timestamp, online, latency) for every check, with the
+        name the streamer had when the history was loaded. '''
+
+        names = []
+        for tag, id, *fields in self._read():
+            if tag == b'N':
+                names.append(fields[0])
+            elif tag == b'R':
+                names[id] = fields[0]
+            else:
+                timestamp, online, latency = fields
+                yield (self.names[id] if id < len(self.names) else names[id]), timestamp, online, latency
+
+    def _read(self):
+        ''' Yields the records of the file: (b'N', number, name), (b'R', number, name) and
+        (b'C', number, timestamp, online, latency). Stops at the first incomplete one. '''
+
+        with open(self.path, 'rb') as f:
+            data = f.read()
+
+        count = 0
+        offset = 0
+        while offset < len(data):
+            tag = data[offset:offset + 1]
+            if tag == b'N' or tag == b'R':
+                header = NAME if tag == b'N' else RENAME
+                if offset + header.size > len(data):
+                    break
+
+                if tag == b'N':
+                    _, size = NAME.unpack_from(data, offset)
+                    id = count
+                else:
+                    _, id, size = RENAME.unpack_from(data, offset)
+
+                if offset + header.size + size > len(data):
+                    break
+
+                offset += header.size
+                name = data[offset:offset + size].decode('utf-8')
+                offset += size
+
+                if tag == b'N':
+                    count += 1
+                yield tag, id, name
+
+            elif tag == b'C':
+                # A record cut short by a crash ends the file.
+                if offset + CHECK.size > len(data):
+                    break
+
+                _, id, timestamp, online, latency = CHECK.unpack_from(data, offset)
+                offset += CHECK.size
+                yield tag, id, timestamp, bool(online), latency
+
+            else:
+                break
+
+            self.end = offset
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+
+    def _add_name(self, name: str) -> int:
+        id = len(self.names)
+        self.names.append(name)
+        self.ids[name] = id
+        return id
+
+    def _move(self, id: int, newName: str):
+        ''' Gives the name number `id`, and its histogram, to `newName`. '''
+
+        oldName = self.names[id]
+        if oldName == newName:
+            return
+
+        del self.ids[oldName]
+        self.ids[newName] = id
+        self.names[id] = newName
+
+        histogram = self.histograms.pop(oldName, None)
+        self.histograms.pop(newName, None)
+        if histogram is not None:
+            self.histograms[newName] = histogram
+
+    def _histogram(self, name: str) -> Histogram:
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = Histogram()
+            self.histograms[name] = histogram
+
+        return histogram
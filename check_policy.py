@@ -0,0 +1,125 @@
+'''
+How long a streamer waits between two checks.
+
+`StaticPolicy` is the original rule: `wait_time * 3 * priority`, whatever the time.
+
+`AdaptivePolicy` stretches that wait by how unlikely the streamer is to be live at this hour
+of the week, learned from the check history. At the hour they are most often live, the wait
+is the static one. At an hour they have never been live, it's `1 / min_share` times longer.
+They are still checked then, so a new schedule is learned too. Until an hour has at least
+`min_checks` checks (counting the hour before and after), the static wait is used.
+
+Once a streamer's wait is learned, the scheduler doesn't check them until they have waited it
+in full, and picks the next streamer of their domain instead. Streamers without enough history
+keep the static cadence. The waits are
+computed again every `REPLAN_INTERVAL` seconds, as the history grows and the hour changes.
+'''
+
+from check_history import HOURS_IN_WEEK, hour_of_week
+
+MIN_SHARE = 0.25
+MIN_CHECKS = 6
+
+# The busiest hour of a streamer is recomputed at most this often, in seconds.
+PEAK_TTL = 3600
+
+# The scheduler recomputes when each streamer is due this often, in seconds.
+REPLAN_INTERVAL = 600
+
+class StaticPolicy():
+    # The waits never change, so they're not recomputed.
+    replan_interval = None
+
+    def only_when_due(self, streamer: dict, now: float) -> bool:
+        ''' Tells if `streamer` is only checked once it waited its full interval. If not, the scheduler checks
+        one streamer of each domain every `wait_time`, even if none has reached its wait. '''
+
+        return False
+
+    def interval(self, streamer: dict, wait_time: int, now: float) -> float:
+        ''' Returns how many seconds `streamer` waits after a check, in a domain with `wait_time`. `now` is the epoch time. '''
+
+        return wait_time * 3 * streamer['priority']
+
+    def rename(self, oldName: str, newName: str):
+        ''' Streamer `oldName` is now called `newName`. '''
+
+class AdaptivePolicy(StaticPolicy):
+    replan_interval = REPLAN_INTERVAL
+
+    def __init__(self, histograms: dict, min_share: float = MIN_SHARE, min_checks: int = MIN_CHECKS):
+        ''' `histograms` maps each name to its `check_history.Histogram`. It may keep growing. '''
+
+        self.histograms = histograms
+        self.min_share = min_share
+        self.min_checks = min_checks
+
+        # name -> (time computed, probability at the busiest hour)
+        self.peaks = {}
+
+    def only_when_due(self, streamer: dict, now: float) -> bool:
+        # Checks are skipped until a learned wait is over. That's where the checks are saved.
+        return self.learned(streamer['name'], now)
+
+    def interval(self, streamer: dict, wait_time: int, now: float) -> float:
+        return StaticPolicy.interval(self, streamer, wait_time, now) * self.factor(streamer['name'], now)
+
+    def rename(self, oldName: str, newName: str):
+        # The histogram moves with the history, the cached peak is computed again.
+        self.peaks.pop(oldName, None)
+        self.peaks.pop(newName, None)
+
+    def learned(self, name: str, now: float) -> bool:
+        ''' Tells if the wait of `name` at the time `now` comes from their history, not the static rule. '''
+
+        histogram = self.histograms.get(name)
+        return (histogram is not None and self.probability(histogram, hour_of_week(now)) is not None
+            and self.peak(name, histogram, now) > 0)
+
+    def factor(self, name: str, now: float) -> float:
+        ''' Returns how much longer than the static wait `name` waits at the time `now`. '''
+
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            return 1.0
+
+        probability = self.probability(histogram, hour_of_week(now))
+        if probability is None:
+            return 1.0
+
+        peak = self.peak(name, histogram, now)
+        if not peak:
+            return 1.0
+
+        return 1 / (self.min_share + (1 - self.min_share) * min(probability / peak, 1.0))
+
+    def probability(self, histogram, hour: int) -> float | None:
+        ''' Returns how often the checks around `hour` found the streamer live, or None if there are too few. '''
+
+        checks = 0
+        online = 0
+        for h in (hour - 1, hour, hour + 1):
+            h %= HOURS_IN_WEEK
+            checks += histogram.checks[h]
+            online += histogram.online[h]
+
+        if checks < self.min_checks:
+            return None
+
+        return online / checks
+
+    def peak(self, name: str, histogram, now: float) -> float:
+        ''' Returns the probability of `name` being live at their busiest hour. '''
+
+        cached = self.peaks.get(name)
+        if cached is not None and now - cached[0] < PEAK_TTL:
+            return cached[1]
+
+        peak = 0.0
+        for hour in range(HOURS_IN_WEEK):
+            probability = self.probability(histogram, hour)
+            if probability is not None and probability > peak:
+                peak = probability
+
+        self.peaks[name] = (now, peak)
+        return peak
@@ -0,0 +1,73 @@
+'''
+Reads a stream in large chunks into a single preallocated buffer. If the stream
+supports `readinto`, no new bytes object is created for each read. The chunk size
+is tuned while reading: it grows while the stream keeps filling the whole chunk
+and shrinks when reads come back mostly empty.
+'''
+
+MIN_CHUNK_SIZE = 8 * 1024
+DEFAULT_CHUNK_SIZE = 64 * 1024
+MAX_CHUNK_SIZE = 1024 * 1024
+
+# How many reads in a row must agree before the chunk size changes.
+TUNE_STREAK = 4
+
+class ChunkReader():
+    def __init__(self, stream, chunk_size: int = DEFAULT_CHUNK_SIZE, auto_tune: bool = True):
+        self.stream = stream
+        self.auto_tune = auto_tune
+        self.chunk_size = min(max(chunk_size, MIN_CHUNK_SIZE), MAX_CHUNK_SIZE)
+
+        self.has_readinto = hasattr(stream, 'readinto')
+        self.buffer = None
+        self.view = None
+
+        if self.has_readinto:
+            size = MAX_CHUNK_SIZE if auto_tune else self.chunk_size
+            self.buffer = bytearray(size)
+            self.view = memoryview(self.buffer)
+
+        self.full_reads = 0
+        self.short_reads = 0
+
+    def read(self):
+        ''' Reads the next chunk. Returns an empty value when the stream ended.
+        The returned memoryview is only valid until the next call, since the buffer is reused. '''
+
+        if self.has_readinto:
+            n = self.stream.readinto(self.view[:self.chunk_size])
+            if not n:
+                return b''
+
+            data = self.view[:n]
+        else:
+            data = self.stream.read(self.chunk_size)
+            n = len(data)
+
+        if self.auto_tune:
+            self.tune(n)
+
+        return data
+
+    def tune(self, n: int):
+        ''' Doubles or halves the chunk size based on how full the last reads were. '''
+
+        if n >= self.chunk_size:
+            self.full_reads += 1
+            self.short_reads = 0
+
+            if self.full_reads >= TUNE_STREAK and self.chunk_size < MAX_CHUNK_SIZE:
+                self.chunk_size = min(self.chunk_size * 2, MAX_CHUNK_SIZE)
+                self.full_reads = 0
+
+        elif n < self.chunk_size // 4:
+            self.short_reads += 1
+            self.full_reads = 0
+
+            if self.short_reads >= TUNE_STREAK and self.chunk_size > MIN_CHUNK_SIZE:
+                self.chunk_size = max(self.chunk_size // 2, MIN_CHUNK_SIZE)
+                self.short_reads = 0
+
+        else:
+            self.full_reads = 0
+            self.short_reads = 0
@@ -0,0 +1,171 @@
+'''
+The configuration in memory, shared by the main window, the settings dialog, the scheduler and
+the download threads. It wraps the dictionary loaded from `.streamlink_looper.json` and keeps
+the streamers indexed by name, so nobody has to scan `streamers_data` or read the file again.
+
+Every change goes through the store. It takes the lock, bumps `version` and calls `on_change`,
+which asks for the file to be saved. With a `StateDatabase`, only the row that changed is
+written instead. The UI thread may read `data` directly, and the UI thread and the scheduler loop the records
+returned by `record()`.
+Other threads use `get()` and `get_streamer()`, which return copies.
+'''
+
+import os
+import json
+from threading import RLock
+from state_db import StateDatabase
+
+def load_config(json_path: str, db_path: str, defaults) -> tuple:
+    ''' Loads the configuration from the database at `db_path` if there is one, or else from the json file.
+    A missing json file is created from `defaults()`. Returns the data and the `StateDatabase`, or None. '''
+
+    if os.path.isfile(db_path):
+        database = StateDatabase(db_path)
+        return database.load(), database
+
+    if not os.path.isfile(json_path):
+        data = defaults()
+        with open(json_path, 'w') as f:
+            json.dump(data, f, indent=4)
+
+        return data, None
+
+    with open(json_path, 'r', encoding='utf-8') as f:
+        data = json.loads(f.read())
+
+    # The json file asks to be moved into the database. This happens only once.
+    if data.get('storage') == 'sqlite':
+        database = StateDatabase(db_path)
+        database.import_data(data)
+        os.replace(json_path, f'{json_path}.migrated')
+        return data, database
+
+    return data, None
+
+class ConfigStore():
+    def __init__(self, data: dict, on_change = None, db = None):
+        self.data = data
+        self.on_change = on_change
+        self.db = db
+
+        self.lock = RLock()
+        self.version = 0
+        self.index = {s['name']: s for s in data['streamers_data']}
+
+    def get(self, key: str, default = None):
+        ''' Returns a setting. '''
+
+        with self.lock:
+            return self.data.get(key, default)
+
+    def set(self, key: str, value):
+        ''' Changes a setting. A dictionary is copied, so the caller can go on changing its own. '''
+
+        if isinstance(value, dict):
+            value = dict(value)
+
+        with self.lock:
+            self.data[key] = value
+            if self.db:
+                if key == 'domains':
+                    self.db.set_domains(value)
+                else:
+                    self.db.set_setting(key, value)
+
+            self._changed()
+
+    def streamers(self) -> list:
+        ''' Returns the streamers list itself, in the order they were added. Only for the UI thread. '''
+
+        return self.data['streamers_data']
+
+    def record(self, name: str) -> dict | None:
+        ''' Returns the stored dictionary of streamer `name`, not a copy. Only for the UI thread and the scheduler loop. '''
+
+        return self.index.get(name)
+
+    def get_streamer(self, name: str) -> dict | None:
+        ''' Returns a copy of streamer `name`, or None if there isn't one. Safe from any thread. '''
+
+        with self.lock:
+            record = self.index.get(name)
+            return dict(record) if record is not None else None
+
+    def add_streamer(self, streamer: dict) -> bool:
+        ''' Adds a streamer. Returns False if there is already one with that name. '''
+
+        with self.lock:
+            if streamer['name'] in self.index:
+                return False
+
+            self.data['streamers_data'].append(streamer)
+            self.index[streamer['name']] = streamer
+            if self.db:
+                self.db.add_streamer(streamer)
+
+            self._changed()
+
+        return True
+
+    def remove_streamer(self, name: str) -> dict | None:
+        ''' Removes streamer `name` and returns its dictionary. '''
+
+        with self.lock:
+            record = self.index.pop(name, None)
+            if record is None:
+                return None
+
+            self.data['streamers_data'].remove(record)
+            if self.db:
+                self.db.remove_streamer(name)
+
+            self._changed()
+
+        return record
+
+    def update_streamer(self, name: str, fields: dict) -> bool:
+        ''' Changes the `fields` of streamer `name`, in place. A new 'name' field renames it. '''
+
+        with self.lock:
+            record = self.index.get(name)
+            if record is None:
+                return False
+
+            newName = fields.get('name', name)
+            if newName != name:
+                if newName in self.index:
+                    return False
+
+                del self.index[name]
+                self.index[newName] = record
+
+            record.update(fields)
+            if self.db:
+                self.db.update_streamer(name, record)
+
+            self._changed()
+
+        return True
+
+    def set_wait_until(self, name: str, wait_until: str):
+        ''' Puts streamer `name` in the fridge until `wait_until`, or takes it out if it's an empty string. '''
+
+        with self.lock:
+            record = self.index.get(name)
+            if record is not None and record['wait_until'] != wait_until:
+                record['wait_until'] = wait_until
+                if self.db:
+                    self.db.set_wait_until(name, wait_until)
+
+                self._changed()
+
+    def dumps(self, indent: int = None) -> str:
+        ''' Returns the whole configuration as a json string, compact unless `indent` is given. '''
+
+        with self.lock:
+            return json.dumps(self.data, indent=indent)
+
+    def _changed(self):
+        self.version += 1
+        if self.on_change and not self.db:
+            self.on_change()
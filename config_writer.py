@@ -0,0 +1,160 @@
+'''
+Saves the configuration file in the background. A save request only marks the data as dirty.
+The writer waits `delay` seconds so a burst of requests (a settings dialog, a batch of fridge
+updates) ends up in a single write. Then it takes a snapshot of the data and writes it.
+
+The snapshot is the json string made by `snapshot()`, written as it is. Both the UI thread and
+the scheduler loop change the data, through `ConfigStore`, and `ConfigStore.dumps` holds the
+store's lock while it serializes, so the copy is consistent even though the writer thread makes
+it. The serialization and the disk I/O never run on the UI thread. The file is written to a
+temporary file in the same folder and then renamed over the old one, so a crash never leaves a
+half written configuration behind.
+
+A failed write is retried with the next one, up to `MAX_RETRIES` times in a row. Then the writer
+gives up until the next save request and reports the error through `log(error)`.
+'''
+
+import os
+import time
+from threading import Thread, Condition
+from utilities import LatencyStats
+
+DEFAULT_DELAY = 0.5
+
+# Failed writes in a row before the writer waits for the next request.
+MAX_RETRIES = 5
+
+class ConfigWriter(Thread):
+    def __init__(self, path: str, snapshot, call_in_main = None, delay: float = DEFAULT_DELAY, log = None):
+        ''' `snapshot()` returns the data as a json string. It's called from the writer thread, so it must
+        be safe from any thread. If given, `call_in_main(function)` is used to run `log(error)` on the
+        main thread when the writes fail. '''
+
+        Thread.__init__(self, name='config-writer', daemon=True)
+
+        self.path = path
+        self.snapshot = snapshot
+        self.call_in_main = call_in_main
+        self.delay = delay
+        self.log = log
+
+        self.cond = Condition()
+        self.isDirty = False
+        self.isClosed = False
+        self.isWriting = False
+
+        self.requests = 0
+        self.writes = 0
+        self.errors = 0
+        self.failures = 0
+        self.latency = LatencyStats()
+
+        self.start()
+
+    def request(self):
+        ''' Asks for the file to be saved. Returns right away. '''
+
+        with self.cond:
+            self.requests += 1
+            self.failures = 0
+            if not self.isDirty:
+                self.isDirty = True
+                self.cond.notify_all()
+
+    def _flush(self):
+        ''' Writes any pending change from the calling thread. '''
+
+        with self.cond:
+            while self.isWriting:
+                self.cond.wait()
+
+            if not self.isDirty:
+                return
+
+            self.isDirty = False
+            self.isWriting = True
+
+        try:
+            self._write(self.snapshot())
+        finally:
+            with self.cond:
+                self.isWriting = False
+                self.cond.notify_all()
+
+    def close(self):
+        ''' Stops the writer and saves what is pending. '''
+
+        with self.cond:
+            self.isClosed = True
+            self.cond.notify_all()
+
+        self._flush()
+
+    def stats(self) -> dict:
+        ''' Returns the request and write counters and the write latency (count, mean, max). '''
+
+        with self.cond:
+            return {'requests': self.requests, 'writes': self.writes, 'coalesced': self.requests - self.writes,
+                'errors': self.errors, 'latency': (self.latency.count, self.latency.mean(), self.latency.max)}
+
+    def run(self):
+        while True:
+            with self.cond:
+                while not self.isDirty and not self.isClosed:
+                    self.cond.wait()
+
+                if self.isClosed:
+                    return
+
+                # Lets the requests that come right after this one join the same write.
+                deadline = time.monotonic() + self.delay
+                while not self.isClosed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.cond.wait(remaining)
+
+                if self.isClosed:
+                    return
+
+                self.isDirty = False
+                self.isWriting = True
+
+            try:
+                self._write(self.snapshot())
+            finally:
+                with self.cond:
+                    self.isWriting = False
+                    self.cond.notify_all()
+
+    def _write(self, text: str):
+        start = time.perf_counter()
+        temp = f"{self.path}.tmp"
+
+        try:
+            with open(temp, 'w', encoding='utf-8') as f:
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+
+            os.replace(temp, self.path)
+        except OSError as e:
+            with self.cond:
+                self.errors += 1
+                self.failures += 1
+                failed = self.failures >= MAX_RETRIES
+                if not failed:
+                    self.isDirty = True
+
+            if failed and self.log:
+                error = f"{self.path}: {e.strerror or e}"
+                if self.call_in_main is None:
+                    self.log(error)
+                else:
+                    self.call_in_main(lambda: self.log(error))
+            return
+
+        with self.cond:
+            self.failures = 0
+            self.writes += 1
+            self.latency.add(time.perf_counter() - start)
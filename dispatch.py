@@ -0,0 +1,71 @@
+'''
+Runs functions on the main thread, with or without wx. The scheduler and the download threads
+call `CallAfter`, which hands the call to whatever main loop the app runs: `wx.CallAfter` in the
+GUI, or a `MainLoop` in the headless daemon.
+'''
+
+import time
+import queue
+import traceback
+
+_call_after = None
+
+def set_call_after(function):
+    ''' Sets the function that runs `function(*args, **kwargs)` on the main thread. '''
+
+    global _call_after
+    _call_after = function
+
+def CallAfter(function, *args, **kwargs):
+    ''' Calls `function(*args, **kwargs)` on the main thread, as soon as it's free. '''
+
+    _call_after(function, *args, **kwargs)
+
+class MainLoop():
+    ''' A main loop without a GUI. Runs the calls handed to it, in order, and `on_tick` every `tick` seconds.
+    Like with wx, a call that raises prints its traceback and the loop goes on. '''
+
+    def __init__(self, on_tick = None, tick: float = 1.0):
+        self.on_tick = on_tick
+        self.tick = tick
+        self.calls = queue.SimpleQueue()
+        self.isRunning = False
+
+    def call_after(self, function, *args, **kwargs):
+        self.calls.put((function, args, kwargs))
+
+    def run(self):
+        ''' Runs until `stop()` is called. '''
+
+        self.isRunning = True
+        next_tick = time.monotonic() + self.tick
+
+        while self.isRunning:
+            timeout = None if self.on_tick is None else max(next_tick - time.monotonic(), 0)
+            try:
+                call = self.calls.get(timeout=timeout)
+            except queue.Empty:
+                call = None
+
+            if call is not None:
+                function, args, kwargs = call
+                self._call(function, *args, **kwargs)
+
+            now = time.monotonic()
+            if self.on_tick is not None and now >= next_tick and self.isRunning:
+                self._call(self.on_tick)
+
+                # A late tick doesn't make the next ones come faster.
+                next_tick = max(next_tick + self.tick, now)
+
+    def _call(self, function, *args, **kwargs):
+        try:
+            function(*args, **kwargs)
+        except Exception:
+            traceback.print_exc()
+
+    def stop(self):
+        ''' Makes `run()` return. Safe from any thread and from signal handlers. '''
+
+        self.isRunning = False
+        self.calls.put((lambda: None, (), {}))
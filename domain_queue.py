@@ -0,0 +1,146 @@
+'''
+A binary heap where every item has a name, so it can be found, updated or removed
+in O(log n) without scanning. The scheduler keeps one per domain, keyed on the
+time each streamer becomes due to be checked.
+'''
+
+import itertools
+
+class IndexedHeap():
+    def __init__(self):
+        # Entries are lists [priority, seq, name, value]. `seq` breaks ties by insertion order.
+        self.heap = []
+        self.pos = {}
+        self.counter = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self.heap)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.pos
+
+    def push(self, name: str, priority, value = None):
+        ''' Adds `name` with `priority`. If it's already in the heap, its priority and value are updated. '''
+
+        if name in self.pos:
+            entry = self.heap[self.pos[name]]
+            entry[3] = value
+            self.update(name, priority)
+            return
+
+        entry = [priority, next(self.counter), name, value]
+        self.heap.append(entry)
+        self.pos[name] = len(self.heap) - 1
+        self._sift_up(len(self.heap) - 1)
+
+    def peek(self) -> tuple | None:
+        ''' Returns (name, priority, value) of the item with the lowest priority, without removing it. '''
+
+        if not self.heap:
+            return None
+
+        priority, _, name, value = self.heap[0]
+        return (name, priority, value)
+
+    def pop(self) -> tuple:
+        ''' Removes and returns (name, priority, value) of the item with the lowest priority. '''
+
+        priority, _, name, value = self.heap[0]
+        self._remove_at(0)
+        return (name, priority, value)
+
+    def remove(self, name: str) -> bool:
+        ''' Removes `name` from the heap. Returns False if it wasn't there. '''
+
+        index = self.pos.get(name)
+        if index is None:
+            return False
+
+        self._remove_at(index)
+        return True
+
+    def update(self, name: str, priority):
+        ''' Changes the priority of `name`. '''
+
+        index = self.pos[name]
+        old = self.heap[index][0]
+        self.heap[index][0] = priority
+
+        if priority < old:
+            self._sift_up(index)
+        else:
+            self._sift_down(index)
+
+    def rename(self, oldName: str, newName: str):
+        ''' Changes the name of an item, keeping its place in the heap. '''
+
+        if oldName == newName or oldName not in self.pos:
+            return
+
+        index = self.pos.pop(oldName)
+        self.heap[index][2] = newName
+        self.pos[newName] = index
+
+    def get(self, name: str):
+        ''' Returns the value stored with `name`, or None. '''
+
+        index = self.pos.get(name)
+        return self.heap[index][3] if index is not None else None
+
+    def rebuild(self, priority_of):
+        ''' Recomputes every priority with `priority_of(name, value)` and restores the heap in O(n). '''
+
+        for entry in self.heap:
+            entry[0] = priority_of(entry[2], entry[3])
+
+        for index in reversed(range(len(self.heap) // 2)):
+            self._sift_down(index)
+
+    def _remove_at(self, index: int):
+        del self.pos[self.heap[index][2]]
+        last = self.heap.pop()
+
+        if index < len(self.heap):
+            self.heap[index] = last
+            self.pos[last[2]] = index
+            self._sift_up(index)
+            self._sift_down(self.pos[last[2]])
+
+    def _sift_up(self, index: int):
+        heap = self.heap
+        entry = heap[index]
+
+        while index > 0:
+            parent = (index - 1) >> 1
+            if heap[parent] <= entry:
+                break
+
+            heap[index] = heap[parent]
+            self.pos[heap[index][2]] = index
+            index = parent
+
+        heap[index] = entry
+        self.pos[entry[2]] = index
+
+    def _sift_down(self, index: int):
+        heap = self.heap
+        size = len(heap)
+        entry = heap[index]
+
+        while True:
+            child = 2 * index + 1
+            if child >= size:
+                break
+
+            if child + 1 < size and heap[child + 1] < heap[child]:
+                child += 1
+
+            if entry <= heap[child]:
+                break
+
+            heap[index] = heap[child]
+            self.pos[heap[index][2]] = index
+            index = child
+
+        heap[index] = entry
+        self.pos[entry[2]] = index
@@ -1,18 +1,93 @@
 import os
 import time
 import sys
-from wx import CallAfter
-import subprocess
+from dispatch import CallAfter
 from pubsub import pub
-import json
 from threading import Thread
 from urllib.parse import urlparse
-import stopwatch
-import utilities as util
+from chunk_reader import ChunkReader, DEFAULT_CHUNK_SIZE
+from recording_writer import RecordingWriter
+import pipeline
+import bandwidth
+import recording_catalog as catalog
 from enums import ID
 
+def copy_stream(stream_data, path: str, progress, is_active, chunk_size: int = DEFAULT_CHUNK_SIZE,
+    buffer_size: int = pipeline.DEFAULT_BUFFER_SIZE, buffer_policy: str = pipeline.BLOCK, on_drop = None,
+    on_update = None, name: str = '', shape = None, write_options: dict = None, latencies: dict = None,
+    on_error = None) -> str:
+    ''' Records `stream_data` into `path` until it ends or `is_active()` returns False. Returns why it ended.
+    `progress.total` counts the bytes read. `on_update(total)` is called every `catalog.UPDATE_INTERVAL` seconds.
+    `shape(size)` is called with the size of each chunk read, and may wait to hold the recording to its bandwidth.
+    `write_options` are the keyword arguments of `RecordingWriter`, which adds its write and sync times to `latencies`.
+    If the file can't be written, the recording ends and `on_error(text)` is called with the error.
+    Used by the `Download` threads and, in process mode, by the recording workers. '''
+
+    try:
+        file = RecordingWriter(path, latencies=latencies, **(write_options or {}))
+    except OSError as e:
+        if on_error:
+            on_error(str(e))
+        return catalog.WRITE_ERROR
+
+    # The disk gets its own thread, so a slow drive doesn't hold the network read.
+    buffer_queue = pipeline.BufferQueue(buffer_size, buffer_policy, on_drop=on_drop)
+    writer = pipeline.Writer(file, buffer_queue, f"{name}-writer")
+    writer.start()
+    progress.buffer = buffer_queue.stats
+
+    reader = ChunkReader(stream_data, chunk_size)
+    next_update = time.monotonic() + catalog.UPDATE_INTERVAL
+    reason = catalog.KILLED
+    error = None
+
+    try:
+        while is_active():
+            try:
+                data = reader.read()
+            except:
+                reason = catalog.READ_ERROR
+                break
+
+            if not data:
+                reason = catalog.ENDED
+                break
+
+            if shape:
+                shape(len(data))
+
+            # The reader reuses its buffer, so the queue needs its own copy.
+            if not buffer_queue.put(bytes(data)):
+                break
+
+            # Only this thread writes to its progress entry. The UI reads it once per second.
+            progress.total += len(data)
+
+            now = time.monotonic()
+            if on_update and now >= next_update:
+                on_update(progress.total)
+                next_update = now + catalog.UPDATE_INTERVAL
+    finally:
+        buffer_queue.close()
+        writer.join()
+        buffer_queue.release()
+        try:
+            file.close()
+        except OSError as e:
+            error = e
+
+    # A writer that failed closed the queue, which is what stopped the loop.
+    error = writer.error or error
+    if error is not None:
+        reason = catalog.WRITE_ERROR
+        if on_error:
+            on_error(str(error))
+
+    return reason
+
 class Download(Thread):
-    def __init__(self, parent, streamer: dict, dir: str, session, options):
+    def __init__(self, parent, streamer: dict, dir: str, session, options, chunk_size: int = DEFAULT_CHUNK_SIZE,
+        buffer_size: int = pipeline.DEFAULT_BUFFER_SIZE, buffer_policy: str = pipeline.BLOCK):
         Thread.__init__(self)
 
         self.parent = parent
@@ -20,94 +95,256 @@ class Download(Thread):
         self.session = session
         self.options = options
 
+        self.streams = None
         self.stream_data = None
         self.streamer = streamer
         self.url = streamer['url']
         self.name = streamer['name']
         self.userQuality = streamer['quality']
         self.dir = dir
-
-        self.dl_total = 0
-        self.dl_temp = 0
+        self.chunk_size = chunk_size
+        self.buffer_size = buffer_size
+        self.buffer_policy = buffer_policy
+        self.progress = None
+        self.recording = None
+        self.account = None
+        self.granted = 0
 
     def run(self):
         ''' Runs the thread. '''
         
-        self.stopwatch = stopwatch.StopWatch()
         pub.subscribe(self.KillDownloadThread, 'kill-download-threads')
 
         time_started = time.strftime("%Y-%m-%d__%H-%M-%S")
         filename = f"{self.name}_{time_started}"
 
-        pub.subscribe(self.OnTimer, 'ping-timer')
-        self.start_download(filename)
+        # In process mode, a worker opens and records the stream. This thread only follows it.
+        path = os.path.join(self.dir, f"{filename}.ts")
+        pool = self.parent.recorders
+        remote = None
+        if not self.admit():
+            opened = False
+        elif pool is not None:
+            remote = self.open_in_worker(pool, path)
+            opened = remote.isOpen
+        else:
+            opened = self.open_stream()
+
+        # If the stream can't be opened, it's handled as if it ended right away.
+        if opened:
+            self.progress = self.parent.progress.register(self.name, self.streamerQuality)
+            self.recording = self.parent.catalog.start(path, self.name, self.url, self.streamerQuality)
+
+            if remote is not None:
+                reason = self.follow_worker(pool, remote)
+            else:
+                reason = self.start_download(path)
+            self.parent.catalog.finish(self.recording, self.progress.total, reason)
+            self.parent.progress.unregister(self.name)
+
+            # A cached resolution of a stream that already ended opens fine, but gives no data.
+            self.parent.resolutions.invalidate(self.url)
+
+        if self.account is not None:
+            self.parent.bandwidth.release(self.account)
+
         CallAfter(pub.sendMessage, topicName='delete-panel', name=self.name)
 
         time_ended = time.strftime("%H:%M:%S")
         CallAfter(pub.sendMessage, topicName='log-stream-ended', streamer=self.name, time=time_ended)
             
-        d = self.GetStreamerFromFile(self.name)
-        domain = urlparse(self.url).netloc
-        pub.sendMessage('add-to-queue', streamer=d, queue_domain=domain)
-        pub.sendMessage('remove-from-thread', name=self.name)
-
-        CallAfter(pub.sendMessage, topicName='remove-from-tree', name=self.name, parent_id=ID.TREE_DOWNLOADING)
-        CallAfter(pub.sendMessage, topicName='add-to-tree', name=self.name, parent_id=ID.TREE_QUEUE)
+        # The streamer may have been edited, renamed or deleted while it was live. Its stored
+        # record is renamed in place, so the current name is always on `self.streamer`.
+        name = self.streamer['name']
+        d = self.parent.store.get_streamer(name)
+        self.parent.Post(self.parent.RemoveFromThread, self.name)
+
+        if d is not None:
+            domain = urlparse(d['url']).netloc
+            self.parent.Post(self.parent.AddToQueue, d, domain)
+            CallAfter(pub.sendMessage, topicName='remove-from-tree', name=name, parent_id=ID.TREE_DOWNLOADING)
+            CallAfter(pub.sendMessage, topicName='add-to-tree', name=name, parent_id=ID.TREE_QUEUE)
 
         sys.exit()
 
-    def fetch_stream(self) -> bool:
-        ''' Check if a stream is online. If so, populates crucial variables and returns True. '''
+    def probe_stream(self) -> bool:
+        ''' Check if a stream is online and which qualities it has, without opening it.
+        If it's online, chooses the quality and returns True. '''
 
         # Will this catch streams end or stream offline? What about hostings? We don't want that.
+        start = time.perf_counter()
         try:
-            #streams = self.session.streams(self.url, self.options)
-            streams = self.session.streams(self.url)
+            # Nothing older than the domain's wait: the stream may have ended since.
+            wait_time = self.parent.store.get('domains', {}).get(urlparse(self.url).netloc, 30)
+            streams = self.parent.resolutions.get(self.url, max_age=wait_time)
+            if streams is None:
+                #streams = self.session.streams(self.url, self.options)
+                streams = self.session.streams(self.url)
+                if streams:
+                    self.parent.resolutions.put(self.url, streams)
+
             quality_list = list(streams.keys())
             self.streamerQuality = self.ChooseQuality(self.userQuality, quality_list)
-            self.stream_data = streams[self.streamerQuality].open()
+            self.streams = streams
         except:
             return False
+        finally:
+            self.parent.AddTiming('probe', time.perf_counter() - start)
+
+        return True
+
+    def admit(self) -> bool:
+        ''' Asks the bandwidth budget for room for the chosen quality. It may downgrade `self.streamerQuality`
+        to a lower resolution that fits. Returns False if the recording was refused. '''
+
+        budget = self.parent.bandwidth
+        if not budget.enabled:
+            return True
+
+        wanted = self.streamerQuality
+        qualities = [(q, self.EstimateRate(q)) for q in self.LowerQualities(wanted)]
+        quality, self.account = budget.admit(self.name, urlparse(self.url).netloc, self.streamer['priority'], qualities)
+
+        if quality != wanted:
+            time_now = time.strftime("%H:%M:%S")
+            CallAfter(pub.sendMessage, topicName='log-bandwidth', streamer=self.name, time=time_now, wanted=wanted,
+                quality=quality)
+
+        if quality is None:
+            return False
 
+        self.streamerQuality = quality
         return True
 
-    def start_download(self, filename: str):
-        file = open(f"{self.dir}/{filename}.ts", "ab+")
-        CallAfter(pub.sendMessage, topicName='update-download-info', 
-            name=self.name, watch=None, quality=self.streamerQuality, size=None, speed=None)
- 
+    def LowerQualities(self, quality: str) -> list:
+        ''' Returns `quality` followed by the video qualities of lower resolution, highest first. '''
+
+        height = bandwidth.height(quality)
+        if height is None:
+            return [quality]
+
+        lower = [(bandwidth.height(q), q) for q in self.streams.keys() if q != quality]
+        lower = sorted([(h, q) for h, q in lower if h is not None and h < height], reverse=True)
+        return [quality] + [q for h, q in lower]
+
+    def EstimateRate(self, quality: str) -> float:
+        ''' Returns the bytes per second `quality` is expected to take: what it took on the last recording, else a typical rate. '''
+
+        bitrate = self.parent.catalog.last_bitrate(self.name, quality)
+        if bitrate:
+            return bitrate / 8
+
+        return bandwidth.typical_rate(quality)
+
+    def open_stream(self) -> bool:
+        ''' Opens the quality chosen by `probe_stream`. Only done when the stream is going to be recorded. '''
+
         start = time.perf_counter()
-        data = self.stream_data.read(1024)
+        try:
+            self.stream_data = self.streams[self.streamerQuality].open()
+        except:
+            self.parent.resolutions.invalidate(self.url)
+            return False
+        finally:
+            self.parent.AddTiming('open', time.perf_counter() - start)
 
-        while data and self.isActive:
-            self.dl_total += len(data)
-            self.dl_temp += len(data)
-            
-            diff = time.perf_counter() - start
-            if diff > 1:
-                size, speed = util.get_progress_text(self.dl_total, self.dl_temp, diff)
-                start = time.perf_counter()
+        return True
 
-                CallAfter(pub.sendMessage, topicName='update-download-info', name=self.name, watch=None, quality=None, size=size, speed=speed)
-                self.dl_temp = 0
+    def open_in_worker(self, pool, path: str):
+        ''' Process mode: submits the recording to a worker and waits until it opened the stream, or failed to.
+        Returns the `recording_workers.RemoteRecording`. '''
 
-            file.write(data)
-            
-            try:
-                data = self.stream_data.read(1024)
-            except:
-                file.close()
-                return
+        options = {'chunk_size': self.chunk_size, 'buffer_size': self.buffer_size, 'buffer_policy': self.buffer_policy,
+            'write_options': self.WriteOptions()}
+
+        # The worker can't take from the bandwidth buckets of this process, so it's given a rate to hold to.
+        if self.account is not None:
+            self.granted = self.parent.bandwidth.grant(self.account)
+            options['rate'] = self.granted
+        remote = pool.submit(self.url, self.streamerQuality, path, options, self.OnBufferDrop, self.OnWriteError)
+
+        stopped = False
+        while not remote.opened.wait(0.5):
+            if not self.isActive and not stopped:
+                pool.stop(remote)
+                stopped = True
+
+        if remote.isOpen:
+            self.parent.AddTiming('open', remote.open_time)
+        else:
+            self.parent.resolutions.invalidate(self.url)
+
+        return remote
+
+    def follow_worker(self, pool, remote) -> str:
+        ''' Process mode: mirrors the progress of `remote` until it ends, and stops it if this thread is stopped.
+        Returns why it ended. '''
+
+        next_update = time.monotonic() + catalog.UPDATE_INTERVAL
+        next_grant = time.monotonic() + bandwidth.GRANT_INTERVAL
+        stopped = False
+        self.progress.buffer = lambda: remote.buffer
+
+        while not remote.done.wait(0.5):
+            self.progress.total = remote.total
+
+            # Its share of the bandwidth changes as other recordings start, end or need less.
+            if self.account is not None:
+                self.parent.bandwidth.measure(self.account, remote.total)
+                if time.monotonic() >= next_grant:
+                    next_grant = time.monotonic() + bandwidth.GRANT_INTERVAL
+                    rate = self.parent.bandwidth.grant(self.account)
+                    if rate and abs(rate - self.granted) > self.granted * 0.05:
+                        pool.set_rate(remote, rate)
+                        self.granted = rate
 
-        file.close()
+            if not self.isActive and not stopped:
+                pool.stop(remote)
+                stopped = True
 
+            now = time.monotonic()
+            if now >= next_update:
+                self.parent.catalog.update(self.recording, remote.total)
+                next_update = now + catalog.UPDATE_INTERVAL
 
-    def OnTimer(self):
-        ''' Called every second. '''
+        self.progress.total = remote.total
+        return remote.reason
 
-        self.stopwatch.ping()
-        CallAfter(pub.sendMessage, topicName='update-download-info', 
-        name=self.name, watch=self.stopwatch.to_str(), quality=None, size=None, speed=None)
+    def start_download(self, path: str) -> str:
+        ''' Records the stream into `path` until it ends or the thread is stopped. Returns why it ended. '''
+
+        shape = None
+        if self.account is not None:
+            shape = lambda size: self.parent.bandwidth.take(self.account, size)
+
+        return copy_stream(self.stream_data, path, self.progress, lambda: self.isActive, self.chunk_size,
+            self.buffer_size, self.buffer_policy, self.OnBufferDrop,
+            lambda total: self.parent.catalog.update(self.recording, total), self.name, shape, self.WriteOptions(),
+            self.parent.diskTimings, self.OnWriteError)
+
+    def WriteOptions(self) -> dict:
+        ''' Returns the `RecordingWriter` settings, with the space to preallocate for the expected rate of the chosen quality. '''
+
+        options = dict(self.parent.write_options)
+        seconds = self.parent.preallocate_seconds
+        if seconds:
+            rate = self.account.estimate if self.account is not None else self.EstimateRate(self.streamerQuality)
+            options['preallocate'] = int(rate * seconds)
+
+        return options
+
+    def OnBufferDrop(self, size: int):
+        ''' Called by the buffer queue when a chunk is dropped because the disk can't keep up. '''
+
+        time_dropped = time.strftime("%H:%M:%S")
+        CallAfter(pub.sendMessage, topicName='log-buffer-drop', streamer=self.name, time=time_dropped, size=size)
+
+
+    def OnWriteError(self, error: str):
+        ''' Called when the recording ended because its file couldn't be written. '''
+
+        time_failed = time.strftime("%H:%M:%S")
+        CallAfter(pub.sendMessage, topicName='log-write-error', streamer=self.name, time=time_failed, error=error)
 
     def KillDownloadThread(self):
         ''' Sets the `self.isActive` to False to end this thread. '''
@@ -176,19 +413,3 @@ class Download(Thread):
                 index = i
 
         return q_list[index]
-
-    def GetStreamerFromFile(self, name: str) -> dict:
-        ''' Search the app file, the dictionary from the streamer `name`. 
-        Getting this info through the file is necessary if the user edited the streamer
-        while he or she was live. '''
-
-        home = os.path.expanduser('~')
-        with open(f'{home}/.streamlink_looper.json', 'r', encoding='utf-8') as f:
-            text = f.read()
-            appData = json.loads(text)
-
-        for s in appData['streamers_data']:
-            if s['name'] == name:
-                return s
-
-        return None
\ No newline at end of file
@@ -0,0 +1,125 @@
+'''
+The entries of the log on the main window. They live in a ring buffer of fixed capacity, so
+the oldest ones are dropped once it's full and the log never grows past it. The log list only
+asks for the rows it shows (see `listctrl.LogListCtrl`).
+
+New entries wait in `pending` until `flush()`, called once per UI tick. The list then changes
+once per second instead of once per message.
+'''
+
+from threading import Lock
+
+DEFAULT_CAPACITY = 10_000
+
+# Kinds of entries.
+CHECK = 'check'
+ENDED = 'ended'
+DROP = 'drop'
+BANDWIDTH = 'bandwidth'
+ERROR = 'error'
+
+# What the status filter can show.
+ALL = 'all'
+ONLINE = 'online'
+OFFLINE = 'offline'
+
+class LogEntry():
+    __slots__ = ('time', 'streamer', 'kind', 'status', 'text')
+
+    def __init__(self, time: str, streamer: str, kind: str, status: bool, text: str):
+        self.time = time
+        self.streamer = streamer
+        self.kind = kind
+        self.status = status
+        self.text = text
+
+    def matches(self, streamer: str, status: str) -> bool:
+        ''' Tells if the entry passes the filters. `streamer` is a lowercase part of the name, or empty. '''
+
+        if streamer and streamer not in self.streamer.lower():
+            return False
+
+        if status == ALL:
+            return True
+        if status == ONLINE:
+            return self.kind == CHECK and self.status
+        if status == OFFLINE:
+            return self.kind == CHECK and not self.status
+
+        return self.kind == status
+
+class EventLog():
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.entries = [None] * capacity
+
+        # Entries are numbered from 0. Entry `n` is at `n % capacity`, while `n >= total - capacity`.
+        self.total = 0
+
+        # Numbers of the entries that pass the filters, oldest first. The ones before `viewStart` were overwritten.
+        self.view = []
+        self.viewStart = 0
+
+        self.streamerFilter = ''
+        self.statusFilter = ALL
+
+        self.pending = []
+        self.lock = Lock()
+
+    def add(self, entry: LogEntry):
+        ''' Queues an entry for the next `flush()`. Safe from any thread. '''
+
+        with self.lock:
+            self.pending.append(entry)
+
+    def flush(self) -> int:
+        ''' Moves the pending entries into the buffer. Returns how many there were. '''
+
+        with self.lock:
+            pending = self.pending
+            self.pending = []
+
+        for entry in pending:
+            self.entries[self.total % self.capacity] = entry
+            if entry.matches(self.streamerFilter, self.statusFilter):
+                self.view.append(self.total)
+            self.total += 1
+
+        # Forgets the entries that were overwritten.
+        oldest = self.total - self.capacity
+        while self.viewStart < len(self.view) and self.view[self.viewStart] < oldest:
+            self.viewStart += 1
+
+        if self.viewStart > len(self.view) // 2:
+            del self.view[:self.viewStart]
+            self.viewStart = 0
+
+        return len(pending)
+
+    def __len__(self) -> int:
+        ''' How many entries pass the filters. '''
+
+        return len(self.view) - self.viewStart
+
+    def __getitem__(self, index: int) -> LogEntry:
+        ''' Returns the entry at `index` among those that pass the filters. '''
+
+        return self.entries[self.view[self.viewStart + index] % self.capacity]
+
+    def set_filter(self, streamer: str, status: str):
+        ''' Shows only the entries of streamers whose name contains `streamer` and of the `status`. '''
+
+        self.streamerFilter = streamer.strip().lower()
+        self.statusFilter = status
+
+        self.view = []
+        self.viewStart = 0
+        for number in range(max(self.total - self.capacity, 0), self.total):
+            if self.entries[number % self.capacity].matches(self.streamerFilter, self.statusFilter):
+                self.view.append(number)
+
+    def clear(self):
+        self.entries = [None] * self.capacity
+        self.total = 0
+        self.view = []
+        self.viewStart = 0
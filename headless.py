@@ -0,0 +1,173 @@
+'''
+Streamlink Looper without a window, for servers. It reads the same configuration as the GUI,
+checks and records the same way, and writes what would go to the log on the main window to
+stdout or to a file.
+
+    python headless.py [--log-file PATH] [--home DIR]
+
+SIGINT and SIGTERM stop the recordings, save what is pending and exit. SIGUSR1 writes the
+statistics to the log.
+'''
+
+import startup
+import os
+import sys
+import signal
+import logging
+import argparse
+from pubsub import pub
+import dispatch
+import utilities as util
+from config_store import ConfigStore, load_config
+from config_writer import ConfigWriter
+from scheduler import Scheduler, CLOSE_TIMEOUT
+
+VERSION = 0.1
+
+class Headless():
+    def __init__(self, home: str, log: logging.Logger):
+        self.home = home
+        self.log = log
+        self.json_path = f'{home}/.streamlink_looper.json'
+        self.configWriter = None
+        self.stopSignal = signal.SIGTERM
+
+        self.loop = dispatch.MainLoop()
+        dispatch.set_call_after(self.loop.call_after)
+
+        self.appData, self.database = load_config(self.json_path, f'{home}/.streamlink_looper.db', self.DefaultConfig)
+        if not os.path.isdir(self.appData['download_dir']):
+            os.makedirs(self.appData['download_dir'])
+
+        if self.database is None:
+            self.configWriter = ConfigWriter(self.json_path, lambda: self.store.dumps(indent=4), log=self.LogConfigError)
+        self.store = ConfigStore(self.appData, self.SaveFile, self.database)
+
+        pub.subscribe(self.Log, 'log')
+        pub.subscribe(self.LogStreamEnded, 'log-stream-ended')
+        pub.subscribe(self.LogBufferDrop, 'log-buffer-drop')
+        pub.subscribe(self.LogBandwidth, 'log-bandwidth')
+        pub.subscribe(self.LogWriteError, 'log-write-error')
+
+        self.scheduler = Scheduler(self, self.store, True)
+
+    def DefaultConfig(self) -> dict:
+        ''' Returns the configuration of a first run. The GUI settings are there for when it's opened. '''
+
+        return {
+            'streamlink_version': -1,
+            'app_version': VERSION,
+            'download_dir': f'{self.home}/Videos/Streamlink Looper',
+            'start_on_scheduler': False,
+            'tray_on_minimized': False,
+            'tray_on_closed': False,
+            'send_notifications': False,
+            'log_scroll_down': True,
+            'twitch_auth': '',
+            'domains': {},
+            'streamers_data': [],
+        }
+
+    def SaveFile(self):
+        ''' Asks the config writer to save the configuration. With the database, the store already did. '''
+
+        if self.configWriter:
+            self.configWriter.request()
+
+    def Run(self):
+        ''' Runs until a signal asks to stop, then shuts everything down. '''
+
+        signal.signal(signal.SIGINT, self.OnSignal)
+        signal.signal(signal.SIGTERM, self.OnSignal)
+        if hasattr(signal, 'SIGUSR1'):
+            signal.signal(signal.SIGUSR1, lambda signum, frame: self.loop.call_after(self.LogStatistics))
+
+        self.log.info(f"Started. {len(self.store.streamers())} streamers in {len(self.appData['domains'])} domains, "
+            f"recording into {self.appData['download_dir']}.")
+
+        self.loop.run()
+
+        self.log.info(f"{signal.Signals(self.stopSignal).name} received, stopping.")
+        self.Shutdown()
+
+    def OnSignal(self, signum, frame):
+        # Nothing that takes a lock, like logging, is safe to do in a signal handler.
+        self.stopSignal = signum
+        self.loop.stop()
+
+    def Shutdown(self):
+        ''' Stops the checks and the recordings, waits for the files to be closed and saves the configuration. '''
+
+        self.scheduler.Shutdown()
+        for name in self.scheduler.Close():
+            self.log.warning(f"{name}: the recording did not stop in {CLOSE_TIMEOUT} s.")
+
+        if self.configWriter:
+            self.configWriter.close()
+
+        if self.database:
+            self.database.close()
+
+        self.log.info('Stopped.')
+
+    def AddStreamer(self, streamer: dict):
+        ''' Called by the scheduler when a recording starts. '''
+
+        self.log.info(f"{streamer['name']}: live, recording.")
+
+    def Log(self, streamer: str, time: str, status: bool):
+        self.log.debug(f"{streamer}: checked, it was {'online' if status else 'offline'}.")
+
+    def LogStreamEnded(self, streamer: str, time: str):
+        self.log.info(f"{streamer}: the stream ended.")
+
+    def LogBufferDrop(self, streamer: str, time: str, size: int):
+        size_text = f"{util.get_downloaded_value(size):.2f} {util.get_unit(size)}"
+        self.log.warning(f"{streamer}: the disk is not keeping up. {size_text} were dropped.")
+
+    def LogWriteError(self, streamer: str, time: str, error: str):
+        self.log.error(f"{streamer}: the recording stopped, its file couldn't be written: {error}")
+
+    def LogConfigError(self, error: str):
+        self.log.error(f"The configuration couldn't be saved: {error}")
+
+    def LogBandwidth(self, streamer: str, time: str, wanted: str, quality: str | None):
+        if quality is None:
+            self.log.warning(f"{streamer}: not recorded, the bandwidth budget can't sustain {wanted}.")
+        else:
+            self.log.warning(f"{streamer}: recorded in {quality} instead of {wanted}, the bandwidth budget can't sustain it.")
+
+    def LogStatistics(self):
+        lines = self.scheduler.GetStatistics()
+
+        if self.configWriter:
+            stats = self.configWriter.stats()
+            count, mean, most = stats['latency']
+            lines.append(f"Config file: {stats['writes']} writes for {stats['requests']} save requests ({stats['coalesced']} coalesced), "
+                f"{mean * 1000:.1f} ms on average, {most * 1000:.1f} ms at most. {stats['errors']} failed.")
+
+        if self.database:
+            count, mean, most = self.database.stats()['latency']
+            lines.append(f"Config database: {count} writes, {mean * 1000:.2f} ms on average, {most * 1000:.2f} ms at most.")
+
+        for line in lines:
+            self.log.info(line)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--log-file', help='Write the log to this file instead of stdout.')
+    parser.add_argument('--home', default=os.path.expanduser('~'), help='Folder of the configuration file.')
+    parser.add_argument('--verbose', action='store_true', help='Also log every check.')
+    args = parser.parse_args()
+    startup.mark('imports')
+
+    handler = logging.FileHandler(args.log_file, encoding='utf-8') if args.log_file else logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter('%(asctime)s %(levelname)s %(message)s', '%Y-%m-%d %H:%M:%S'))
+    log = logging.getLogger('streamlink_looper')
+    log.addHandler(handler)
+    log.setLevel(logging.DEBUG if args.verbose else logging.INFO)
+
+    Headless(args.home, log).Run()
+
+if __name__ == '__main__':
+    main()
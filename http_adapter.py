@@ -0,0 +1,55 @@
+'''
+Sets up the HTTP adapters of each domain session of `session_pool.SessionPool`. It sizes the
+connection pool, retries failed requests, turns TCP keep-alive on and counts how many requests
+got a connection from the pool and how many had to open a new one (and do a TLS handshake).
+
+Only imported when the first session is created, since it imports requests.
+'''
+
+import socket
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+def counting_pool(base, connection, stats):
+    ''' Returns a subclass of the urllib3 pool `base` that counts into `stats` its requests, and the
+    connects of its `connection` class. A connection the server closed connects again when reused,
+    so the connects are counted, not the connection objects. '''
+
+    class CountingConnection(connection):
+        def connect(self):
+            stats.connect()
+            return super().connect()
+
+    class CountingPool(base):
+        ConnectionCls = CountingConnection
+
+        def _get_conn(self, timeout = None):
+            stats.request()
+            return super()._get_conn(timeout)
+
+    return CountingPool
+
+def setup_adapter(adapter: HTTPAdapter, stats, pool_size: int, retries: int, backoff: float, keep_alive: bool):
+    ''' Sets up, in place, an adapter streamlink mounted on a session. The pool is made again with `pool_size`
+    connections and the counting pools, and the retries get `retries` and `backoff`. What streamlink set
+    up stays: the TLS context, the source address and socket options, and the rest of its retry policy. '''
+
+    adapter.max_retries = adapter.max_retries.new(total=retries, backoff_factor=backoff, status_forcelist=RETRY_STATUSES,
+        raise_on_status=False)
+
+    pool_kw = dict(adapter.poolmanager.connection_pool_kw)
+    pool_kw.pop('maxsize', None)
+    pool_kw.pop('block', None)
+    if keep_alive:
+        options = pool_kw.get('socket_options') or HTTPConnection.default_socket_options
+        pool_kw['socket_options'] = list(options) + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+
+    adapter.poolmanager.clear()
+    adapter.init_poolmanager(pool_size, pool_size, adapter._pool_block, **pool_kw)
+    adapter.poolmanager.pool_classes_by_scheme = {
+        'http': counting_pool(HTTPConnectionPool, HTTPConnection, stats),
+        'https': counting_pool(HTTPSConnectionPool, HTTPSConnection, stats),
+    }
@@ -1,11 +1,23 @@
 import wx
 from wx.lib.mixins.listctrl import ListCtrlAutoWidthMixin
+from event_log import EventLog, CHECK, ONLINE, OFFLINE
 
 class ListCtrl(wx.ListCtrl, ListCtrlAutoWidthMixin):
+    ''' The downloads list. A virtual list: the texts live in a row model keyed by streamer name,
+    and the control asks only for the rows on screen. '''
+
     def __init__(self, parent):
-        wx.ListCtrl.__init__(self, parent, -1, style=wx.LC_REPORT)
+        wx.ListCtrl.__init__(self, parent, -1, style=wx.LC_REPORT | wx.LC_VIRTUAL)
         ListCtrlAutoWidthMixin.__init__(self)
 
+        # Row -> name, name -> row and name -> the texts of its columns.
+        self.names = []
+        self.rows = {}
+        self.texts = {}
+
+        self.evenAttr = wx.ItemAttr()
+        self.evenAttr.SetBackgroundColour('#f1e6ff')
+
         self.SetupColumns()
 
     def SetupColumns(self):
@@ -16,11 +28,113 @@ class ListCtrl(wx.ListCtrl, ListCtrlAutoWidthMixin):
         self.InsertColumn(2, 'Quality', wx.LIST_FORMAT_CENTRE)
         self.InsertColumn(3, 'Size', wx.LIST_FORMAT_CENTRE)
         self.InsertColumn(4, 'Speed', wx.LIST_FORMAT_CENTRE)
+        self.InsertColumn(5, '10s avg', wx.LIST_FORMAT_CENTRE)
+        self.InsertColumn(6, '60s avg', wx.LIST_FORMAT_CENTRE)
 
         self.SetColumnWidth(0, 150)
         self.SetColumnWidth(1, 90)
         self.SetColumnWidth(2, 90)
         self.SetColumnWidth(3, 90)
         self.SetColumnWidth(4, 90)
+        self.SetColumnWidth(5, 90)
+        self.SetColumnWidth(6, 90)
+
+        self.setResizeColumn(0)
+
+    def AddRow(self, name: str, texts: tuple):
+        ''' Adds a row at the bottom. '''
+
+        if name in self.rows:
+            return
+
+        self.rows[name] = len(self.names)
+        self.names.append(name)
+        self.texts[name] = texts
+
+        self.SetItemCount(len(self.names))
+        self.RefreshItem(self.rows[name])
+
+    def UpdateRow(self, name: str, texts: tuple) -> bool:
+        ''' Changes the texts of the row of `name`. Only that row is redrawn, and only if something changed. '''
+
+        row = self.rows.get(name)
+        if row is None or self.texts[name] == texts:
+            return False
+
+        self.texts[name] = texts
+        self.RefreshItem(row)
+        return True
+
+    def DeleteRow(self, name: str):
+        ''' Deletes the row of `name`. The rows below move up and are redrawn. '''
+
+        row = self.rows.pop(name, None)
+        if row is None:
+            return
+
+        del self.names[row]
+        del self.texts[name]
+        for index in range(row, len(self.names)):
+            self.rows[self.names[index]] = index
+
+        self.SetItemCount(len(self.names))
+        if row < len(self.names):
+            self.RefreshItems(row, len(self.names) - 1)
+
+    def HasRow(self, name: str) -> bool:
+        return name in self.rows
+
+    def OnGetItemText(self, item: int, column: int) -> str:
+        return self.texts[self.names[item]][column]
+
+    def OnGetItemAttr(self, item: int):
+        return self.evenAttr if item % 2 == 0 else None
+
+class LogListCtrl(wx.ListCtrl, ListCtrlAutoWidthMixin):
+    ''' The log on the main window. A virtual list, so only the rows on screen are ever drawn. '''
+
+    def __init__(self, parent, log: EventLog, colors: dict):
+        wx.ListCtrl.__init__(self, parent, -1, style=wx.LC_REPORT | wx.LC_VIRTUAL | wx.LC_NO_HEADER | wx.LC_SINGLE_SEL)
+        ListCtrlAutoWidthMixin.__init__(self)
+
+        self.log = log
+
+        # One text colour per kind of row: online and offline checks, ended streams, dropped data, the bandwidth budget and errors.
+        self.attrs = {}
+        for key, color in colors.items():
+            attr = wx.ItemAttr()
+            attr.SetTextColour(color)
+            self.attrs[key] = attr
+
+        self.InsertColumn(0, 'Time')
+        self.InsertColumn(1, 'Streamer')
+        self.InsertColumn(2, 'Event')
+
+        self.SetColumnWidth(0, 80)
+        self.SetColumnWidth(1, 150)
+
+    def ShowEntries(self, scroll: bool):
+        ''' Shows the entries flushed into the log. If `scroll`, the last one is made visible. '''
+
+        count = len(self.log)
+        self.SetItemCount(count)
+        self.Refresh()
+
+        if scroll and count:
+            self.EnsureVisible(count - 1)
+
+    def OnGetItemText(self, item: int, column: int) -> str:
+        entry = self.log[item]
+        if column == 0:
+            return entry.time
+        if column == 1:
+            return entry.streamer
+
+        return entry.text
+
+    def OnGetItemAttr(self, item: int):
+        entry = self.log[item]
+        if entry.kind == CHECK:
+            return self.attrs[ONLINE if entry.status else OFFLINE]
 
-        self.setResizeColumn(0)
\ No newline at end of file
+        return self.attrs.get(entry.kind)
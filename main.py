@@ -1,8 +1,14 @@
-from wx import App
+import startup
+from wx import App, CallAfter
 import main_wxframe
 
 if __name__ == "__main__":
+    startup.mark('imports')
+
     app = App()
     frame = main_wxframe.MainFrame(None)
     frame.Show()
+
+    # Runs once the events queued by Show(), like the first paint, are handled.
+    CallAfter(startup.mark, 'window shown')
     app.MainLoop()
\ No newline at end of file
@@ -1,21 +1,25 @@
 import os
+import time
 import wx
 from sys import exit
-import wx.richtext as rt
 import wx.adv
-import subprocess
 from pubsub import pub
-import json
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from scheduler import Scheduler
-import settings
-import about
+from config_writer import ConfigWriter
+from config_store import ConfigStore, load_config
+import dispatch
 import listctrl
+import event_log as el
+import utilities as util
 from enums import ID
 
 class MainFrame(wx.Frame):
     def __init__(self, parent):
         super().__init__(parent)
+        dispatch.set_call_after(wx.CallAfter)
+
         self.STREAMER_COLOR = '#a970ff'
         self.STATUS_ON_COLOR = '#46734d'
         self.STATUS_OFF_COLOR = '#cc3535'
@@ -28,10 +32,19 @@ class MainFrame(wx.Frame):
         self.verion = 0.1
         self.version = 0.1
         self.appData = {}
+        self.database = None
+        self.configWriter = None
 
         self.home_path = os.path.expanduser('~')
         self.default_download_path = f"{self.home_path}/Videos/Streamlink Looper"
         self.nameOnPopup = ''
+
+        self.speedText = ''
+
+        # name (lowercase) -> {section ID: wx.TreeItemId}. A streamer is briefly in two sections while it moves.
+        self.treeItems = {}
+        self.treeBatch = 0
+
         self.Bind(wx.EVT_ICONIZE, self.OnClose)
 
         self.timer = wx.Timer(self)
@@ -39,20 +52,24 @@ class MainFrame(wx.Frame):
         self.timer.Start(1000)
 
         self.LoadJsonFile()
+        if self.database is None:
+            self.configWriter = ConfigWriter(f'{self.home_path}/.streamlink_looper.json', lambda: self.store.dumps(indent=4), wx.CallAfter,
+                log=self.LogConfigError)
+        self.store = ConfigStore(self.appData, self.SaveFile, self.database)
         self.InitUI()
         self.CenterOnScreen()
 
         self.taskBarIcon = TaskBarIcon(self)
-        self.scheduler_thread = Scheduler(self, self.appData, self.appData['start_on_scheduler'])
+        self.scheduler_thread = Scheduler(self, self.store, self.appData['start_on_scheduler'])
 
         self.menu.Check(ID.MENU_LOG_CHECKBOX, self.appData['log_scroll_down'])
         
-        pub.subscribe(self.UpdateDownloadInfo, 'update-download-info')
-        pub.subscribe(self.UpdateWaitUntilOnFile, 'update-wait-until')
         pub.subscribe(self.DeleteRow, 'delete-panel')
-        pub.subscribe(self.SaveFile, 'save-file')
         pub.subscribe(self.Log, 'log')
         pub.subscribe(self.LogStreamEnded, 'log-stream-ended')
+        pub.subscribe(self.LogBufferDrop, 'log-buffer-drop')
+        pub.subscribe(self.LogBandwidth, 'log-bandwidth')
+        pub.subscribe(self.LogWriteError, 'log-write-error')
 
         pub.subscribe(self.AddToTree, 'add-to-tree')
         pub.subscribe(self.EditInTree, 'edit-in-tree')
@@ -62,45 +79,55 @@ class MainFrame(wx.Frame):
         self.Bind(wx.EVT_CLOSE, self.OnClose)
 
     def LoadJsonFile(self) -> None:
-        ''' Loads the .json configuration file. '''
-
-        if not os.path.isfile(f'{self.home_path}/.streamlink_looper.json'):
-            try:
-                proc = subprocess.run(['streamlink', '--version'], stdout=subprocess.PIPE, text=True)
-                streamlink_version = proc.stdout.split()[1]
-                self.appData['streamlink_version'] = streamlink_version
-            except:
-                self.appData['streamlink_version'] = -1
-
-            self.appData['app_version'] = self.version
-            self.appData['download_dir'] = self.default_download_path
-            self.appData['start_on_scheduler'] = False
-            self.appData['tray_on_minimized'] = False
-            self.appData['tray_on_closed'] = False
-            self.appData['send_notifications'] = False
-            self.appData['log_scroll_down'] = True
-            self.appData['twitch_auth'] = ''
-
-            self.appData['domains'] = {}
-            self.appData['streamers_data'] = []
-
-            with open(f'{self.home_path}/.streamlink_looper.json', 'w') as f:
-                json.dump(self.appData, f, indent=4)
+        ''' Loads the .json configuration file, or the SQLite database if there is one. '''
 
-        else:
-            with open(f'{self.home_path}/.streamlink_looper.json', 'r', encoding='utf-8') as f:
-                text = f.read()
-                self.appData = json.loads(text)
+        json_path = f'{self.home_path}/.streamlink_looper.json'
+        db_path = f'{self.home_path}/.streamlink_looper.db'
+        self.appData, self.database = load_config(json_path, db_path, self.DefaultConfig)
 
         if not os.path.isdir(self.appData['download_dir']):
             os.makedirs(self.appData['download_dir'])
 
+    def DefaultConfig(self) -> dict:
+        ''' Returns the configuration of a first run. '''
+
+        appData = {}
+        appData['streamlink_version'] = util.package_version('streamlink')
+
+        appData['app_version'] = self.version
+        appData['download_dir'] = self.default_download_path
+        appData['start_on_scheduler'] = False
+        appData['tray_on_minimized'] = False
+        appData['tray_on_closed'] = False
+        appData['send_notifications'] = False
+        appData['log_scroll_down'] = True
+        appData['twitch_auth'] = ''
+
+        appData['domains'] = {}
+        appData['streamers_data'] = []
+
+        return appData
+
     def SaveFile(self) -> None:
-        ''' Saves self.appData to json. '''
+        ''' Asks the config writer to save self.appData to json. The write happens in the background.
+        With the database, every change is already saved by the store. '''
+
+        if self.configWriter:
+            self.configWriter.request()
+
+    def CloseConfig(self) -> None:
+        ''' Stops the recordings, saves what is pending and closes the config file or database. Called on exit. '''
+
+        # The scheduler loop goes first, so nothing changes the config once it's closed.
+        # Then the recordings, in this process and in the workers, close their files and catalog entries.
+        self.scheduler_thread.Shutdown()
+        self.scheduler_thread.Close()
 
-        home = os.path.expanduser('~')
-        with open(f'{home}/.streamlink_looper.json', 'w') as f:
-            json.dump(self.appData, f, indent=4)
+        if self.configWriter:
+            self.configWriter.close()
+
+        if self.database:
+            self.database.close()
 
     def InitUI(self):
         ''' Initializes the GUI. '''
@@ -112,11 +139,30 @@ class MainFrame(wx.Frame):
         upperSizer = wx.BoxSizer(wx.HORIZONTAL)
 
         self.listCtrl = listctrl.ListCtrl(self.panel)
-        self.listCtrl.Bind(wx.EVT_LIST_INSERT_ITEM, self.OnListCtrlModified)
-        self.listCtrl.Bind(wx.EVT_LIST_DELETE_ITEM, self.OnListCtrlModified)
 
-        self.rt = rt.RichTextCtrl(self.panel, -1, style=wx.TE_READONLY)
-        self.rt.GetCaret().Hide()
+        # The log keeps its last entries only. They are shown by a virtual list, and can be filtered.
+        self.eventLog = el.EventLog(self.appData.get('log_capacity', el.DEFAULT_CAPACITY))
+        colors = {el.ONLINE: self.STATUS_ON_COLOR, el.OFFLINE: self.STATUS_OFF_COLOR, el.ENDED: self.STREAMER_COLOR,
+            el.DROP: self.STATUS_OFF_COLOR, el.BANDWIDTH: self.STATUS_OFF_COLOR, el.ERROR: self.STATUS_OFF_COLOR}
+        self.logCtrl = listctrl.LogListCtrl(self.panel, self.eventLog, colors)
+
+        logSizer = wx.BoxSizer(wx.VERTICAL)
+        filterSizer = wx.BoxSizer(wx.HORIZONTAL)
+
+        self.logSearch = wx.SearchCtrl(self.panel, -1, size=(200, -1))
+        self.logSearch.SetDescriptiveText('Filter by streamer')
+        self.logSearch.Bind(wx.EVT_TEXT, self.OnLogFilter)
+
+        self.logStatuses = [el.ALL, el.ONLINE, el.OFFLINE, el.ENDED, el.DROP, el.BANDWIDTH, el.ERROR]
+        self.logStatus = wx.Choice(self.panel, -1, choices=['Everything', 'Online', 'Offline', 'Stream ended', 'Dropped data',
+            'Bandwidth', 'Errors'])
+        self.logStatus.SetSelection(0)
+        self.logStatus.Bind(wx.EVT_CHOICE, self.OnLogFilter)
+
+        filterSizer.Add(self.logSearch, flag=wx.RIGHT, border=5)
+        filterSizer.Add(self.logStatus)
+        logSizer.Add(filterSizer, flag=wx.BOTTOM, border=5)
+        logSizer.Add(self.logCtrl, proportion=1, flag=wx.EXPAND)
 
         self.tree = wx.TreeCtrl(self.panel, -1)
         self.Bind(wx.EVT_TREE_ITEM_RIGHT_CLICK, self.OnTreeRightClick, self.tree)
@@ -125,6 +171,8 @@ class MainFrame(wx.Frame):
         self.tree_downloading = self.tree.AppendItem(self.tree_root, 'Being downloaded')
         self.tree_queue = self.tree.AppendItem(self.tree_root, 'On the queue')
         self.tree_fridge = self.tree.AppendItem(self.tree_root, 'On the fridge')
+        self.treeSections = {ID.TREE_DOWNLOADING: self.tree_downloading, ID.TREE_QUEUE: self.tree_queue,
+            ID.TREE_FRIDGE: self.tree_fridge}
 
         self.AppendsItemsOnTreeAtStart()
         self.tree.ExpandAll()
@@ -133,7 +181,7 @@ class MainFrame(wx.Frame):
         upperSizer.Add(self.tree, proportion=1, flag=wx.ALL | wx.EXPAND, border=5)
 
         masterSizer.Add(upperSizer, proportion=2, flag=wx.ALL | wx.EXPAND, border=5)
-        masterSizer.Add(self.rt, proportion=1, flag=wx.LEFT | wx.RIGHT | wx.BOTTOM| wx.EXPAND, border=10)
+        masterSizer.Add(logSizer, proportion=1, flag=wx.LEFT | wx.RIGHT | wx.BOTTOM| wx.EXPAND, border=10)
 
         self.panel.SetSizerAndFit(masterSizer)
 
@@ -155,6 +203,8 @@ class MainFrame(wx.Frame):
         start = scheduler_menu.Append(-1, 'Start', 'Start the scheduler.')
         pause = scheduler_menu.Append(-1, 'Pause', 'Pause the scheduler. The ongoing downloads remains active.')
         stop = scheduler_menu.Append(-1, 'Stop', 'Stop the scheduler and all ongoing downloads.')
+        scheduler_menu.AppendSeparator()
+        statistics = scheduler_menu.Append(-1, 'Statistics', 'Show how long checks and downloads take to start.')
         
         self.log_scroll = log.Append(ID.MENU_LOG_CHECKBOX, 'Keep scrolled down', 'Keep the log scrolled down with every new message.', kind=wx.ITEM_CHECK)
         log_clear = log.Append(-1, 'Clear log', 'Clear all the text in the log.')
@@ -165,6 +215,7 @@ class MainFrame(wx.Frame):
         self.Bind(wx.EVT_MENU, self.OnStart, start)
         self.Bind(wx.EVT_MENU, self.OnPause, pause)
         self.Bind(wx.EVT_MENU, self.OnStop, stop)
+        self.Bind(wx.EVT_MENU, self.OnStatistics, statistics)
 
         self.Bind(wx.EVT_MENU, self.OnLogScroll, self.log_scroll)
         self.Bind(wx.EVT_MENU, self.OnLogClear, log_clear)
@@ -183,165 +234,175 @@ class MainFrame(wx.Frame):
     def AppendsItemsOnTreeAtStart(self):
         """ Appends items on the Tree on app start. """
 
-        isAppDataChanged = False
+        with self.TreeBatch():
+            for streamer in self.store.streamers():
+                name = streamer['name']
 
-        for i in range (0, len(self.appData['streamers_data'])):
-            name = self.appData['streamers_data'][i]['name']
+                if streamer['wait_until']:
+                    now = datetime.now()
+                    until = datetime.strptime(streamer['wait_until'], "%Y-%m-%d %H:%M:%S")
 
-            if self.appData['streamers_data'][i]['wait_until']:
-                now = datetime.now()
-                until = datetime.strptime(self.appData['streamers_data'][i]['wait_until'], "%Y-%m-%d %H:%M:%S")
+                    if now < until:
+                        self.AddToTree(name, ID.TREE_FRIDGE)
+                    else:
+                        self.store.set_wait_until(name, '')
+                        self.AddToTree(name, ID.TREE_QUEUE)
 
-                if now < until:
-                    self.tree.AppendItem(self.tree_fridge, name)
                 else:
-                    self.appData['streamers_data'][i]['wait_until'] = ''
-                    self.tree.AppendItem(self.tree_queue, name)
-                    isAppDataChanged = True
-
-            else:
-                self.tree.AppendItem(self.tree_queue, name)
-
-        if isAppDataChanged:
-            self.SaveFile()
+                    self.AddToTree(name, ID.TREE_QUEUE)
 
     def AddStreamer(self, streamer: dict):
         """ Adds the streamer to the wx.ListCtrl. """
         
-        self.listCtrl.Append([streamer['name'], '00:00:00', '1080p60', '0 B', '0 B/s'])
+        texts = (streamer['name'], '00:00:00', '', '0 B', '0 B/s', '0 B/s', '0 B/s')
+        self.listCtrl.AddRow(streamer['name'], texts)
         self.AddToTree(streamer['name'], ID.TREE_DOWNLOADING)
 
     def Log(self, streamer: str, time: str, status: bool):
         ''' Adds to the log on the main window. '''
 
-        self.rt.WriteText("The streamer ") 
-        self.WriteStreamerName(streamer)
-        self.rt.WriteText(f" was checked at {time} and it was ")
-        self.WriteStreamerStatus(status)
-        self.rt.WriteText(".\n")
+        text = 'Checked, it was online.' if status else 'Checked, it was offline.'
+        self.eventLog.add(el.LogEntry(time, streamer, el.CHECK, status, text))
 
-        if self.appData['log_scroll_down']:
-            self.rt.ShowPosition(self.rt.GetLastPosition())
+    def LogStreamEnded(self, streamer: str, time: str):
+        ''' Adds to the log notifying about the ended stream. '''
 
-        if status:
-            self.OnListCtrlModified(None)
+        self.eventLog.add(el.LogEntry(time, streamer, el.ENDED, False, 'The stream ended.'))
 
+    def LogBufferDrop(self, streamer: str, time: str, size: int):
+        ''' Adds to the log notifying that part of a recording was dropped because the disk is too slow. '''
 
-    def LogStreamEnded(self, streamer: str, time: str):
-        ''' Adds to the log notifying about the ended stream. '''
+        size_text = f"{util.get_downloaded_value(size):.2f} {util.get_unit(size)}"
+        text = f"The disk is not keeping up. {size_text} were dropped."
+        self.eventLog.add(el.LogEntry(time, streamer, el.DROP, False, text))
 
-        self.rt.WriteText("The ") 
-        self.WriteStreamerName(streamer)
-        self.rt.WriteText(f" stream ended at {time}")
-        self.rt.WriteText(".\n")
+    def LogWriteError(self, streamer: str, time: str, error: str):
+        ''' Adds to the log notifying that a recording stopped because its file couldn't be written. '''
 
-        if self.appData['log_scroll_down']:
-            self.rt.ShowPosition(self.rt.GetLastPosition())
+        text = f"The recording stopped, its file couldn't be written: {error}"
+        self.eventLog.add(el.LogEntry(time, streamer, el.ERROR, False, text))
 
-        self.OnListCtrlModified(None)
+    def LogConfigError(self, error: str):
+        ''' Adds to the log notifying that the configuration file couldn't be saved. '''
 
+        text = f"The configuration couldn't be saved: {error}"
+        self.eventLog.add(el.LogEntry(time.strftime("%H:%M:%S"), 'Config file', el.ERROR, False, text))
 
-    def WriteStreamerName(self, name: str):
+    def LogBandwidth(self, streamer: str, time: str, wanted: str, quality: str | None):
+        ''' Adds to the log notifying that the bandwidth budget refused or downgraded a recording. '''
 
-        self.rt.BeginTextColour(self.STREAMER_COLOR)
-        self.rt.BeginBold()
+        if quality is None:
+            text = f"Not recorded, the bandwidth budget can't sustain {wanted}."
+        else:
+            text = f"Recorded in {quality} instead of {wanted}, the bandwidth budget can't sustain it."
+        self.eventLog.add(el.LogEntry(time, streamer, el.BANDWIDTH, False, text))
 
-        self.rt.WriteText(name)
+    def FlushLog(self):
+        ''' Shows the log entries added since the last tick, all at once. '''
 
-        self.rt.EndTextColour()
-        self.rt.EndBold()
+        if self.eventLog.flush():
+            self.logCtrl.ShowEntries(self.appData['log_scroll_down'])
 
-    def WriteStreamerStatus(self, status: bool):
-        
-        self.rt.BeginBold()
+    def OnLogFilter(self, event):
+        ''' Called when the streamer or status filter of the log changes. '''
 
-        if status:
-            self.rt.BeginTextColour(self.STATUS_ON_COLOR)
-            self.rt.WriteText('online')
-        else:
-            self.rt.BeginTextColour(self.STATUS_OFF_COLOR)
-            self.rt.WriteText('offline')
-        
-        self.rt.EndTextColour()
-        self.rt.EndBold()
+        status = self.logStatuses[self.logStatus.GetSelection()]
+        self.eventLog.set_filter(self.logSearch.GetValue(), status)
+        self.logCtrl.ShowEntries(self.appData['log_scroll_down'])
 
     def OnSettings(self, event) -> None:
         ''' Opens the settings window. '''
 
-        frame = settings.Settings(self, self.appData)
+        # The dialogs are imported when first opened, not at startup.
+        import settings
+
+        frame = settings.Settings(self, self.store)
         frame.ShowWindowModal()            
 
     def OnStart(self, event):
         ''' Starts the scheduler. '''
 
-        self.scheduler_thread.Restart()
+        self.scheduler_thread.Start()
 
     def OnPause(self, event):
         ''' Stops the scheduler (the thread remains active). The ongoing downloads remains active. '''
 
-        self.scheduler_thread.isActive = False
+        self.scheduler_thread.Pause()
 
     def OnStop(self, event):
         ''' Stop the scheduler (the thread remains active) and all ongoing downloads. '''
 
-        pub.sendMessage('kill-download-threads')
-        self.scheduler_thread.isActive = False
+        self.scheduler_thread.Stop()
+
+    def OnStatistics(self, event):
+        ''' Shows the scheduler statistics. '''
+
+        lines = self.scheduler_thread.GetStatistics()
+
+        if self.configWriter:
+            stats = self.configWriter.stats()
+            count, mean, most = stats['latency']
+            lines.append(f"Config file: {stats['writes']} writes for {stats['requests']} save requests ({stats['coalesced']} coalesced), "
+                f"{mean * 1000:.1f} ms on average, {most * 1000:.1f} ms at most. {stats['errors']} failed.")
+
+        if self.database:
+            count, mean, most = self.database.stats()['latency']
+            lines.append(f"Config database: {count} writes, {mean * 1000:.2f} ms on average, {most * 1000:.2f} ms at most.")
+        wx.MessageBox('\n\n'.join(lines), 'Statistics', wx.ICON_INFORMATION)
 
     def OnTimer(self, event):
         ''' Called every second. '''
 
-        pub.sendMessage('ping-timer')
+        self.UpdateDownloadInfo()
+        self.FlushLog()
 
-    def UpdateDownloadInfo(self, name: str, watch: str, quality: str, size: float, speed: float):
-        ''' Updates a wx.Panel with a download info on `self.scrolled`. '''
+    def UpdateDownloadInfo(self):
+        ''' Reads a snapshot of every download progress and updates the downloads list.
+        Only the rows whose text changed are redrawn. '''
 
-        for i in range (0, self.listCtrl.GetItemCount()):
-            if self.listCtrl.GetItemText(i, 0) == name:
-                if watch:
-                    self.listCtrl.SetItem(i, 1, watch)
-                if quality:
-                    self.listCtrl.SetItem(i, 2, quality)
-                if size:
-                    self.listCtrl.SetItem(i, 3, size)
-                if speed:
-                    self.listCtrl.SetItem(i, 4, speed)
+        now = time.monotonic()
 
-                return
+        progress = self.scheduler_thread.progress
+        for name, (quality, started, total, rates) in progress.snapshot(now).items():
+            if not self.listCtrl.HasRow(name):
+                continue
 
-    def DeleteRow(self, name: str):
-        ''' Deletes a row in the wx.ListCtrl. '''
+            instant, avg_10, avg_60 = rates
+            size, speed = util.get_progress_text(total, instant)
 
-        for i in range (0, self.listCtrl.GetItemCount()):
-            if self.listCtrl.GetItemText(i, 0) == name:
-                self.listCtrl.DeleteItem(i)
-                break
+            texts = (name, util.get_elapsed_text(now - started), quality, size, speed,
+                util.get_speed_text(avg_10), util.get_speed_text(avg_60))
+            self.listCtrl.UpdateRow(name, texts)
 
-    def OnListCtrlModified(self, event):
-        """ Called when an item is inserted or deleted from the wx.ListCtrl. """
+        instant, avg_10, avg_60 = progress.global_rates()
+        speedText = f"Total speed: {util.get_speed_text(instant)} (10s: {util.get_speed_text(avg_10)}, 60s: {util.get_speed_text(avg_60)})"
+        if speedText != self.speedText:
+            self.speedText = speedText
+            self.status_bar.SetStatusText(speedText)
 
-        lenght = self.listCtrl.GetItemCount()
-        for i in range(0, lenght):
-            if i % 2 == 0:
-                self.listCtrl.SetItemBackgroundColour(i, '#f1e6ff')
-            else:
-                self.listCtrl.SetItemBackgroundColour(i, wx.NullColour)
+    def DeleteRow(self, name: str):
+        ''' Deletes a row in the wx.ListCtrl. '''
+
+        self.listCtrl.DeleteRow(name)
 
     def OnLogScroll(self, event):
         """ Called when the user click on the log scroll menu. """
 
         obj = event.GetEventObject()
         value = obj.IsChecked(ID.MENU_LOG_CHECKBOX)
-        self.appData['log_scroll_down'] = value
-        pub.sendMessage('save-file')
+        self.store.set('log_scroll_down', value)
 
     def OnLogClear(self, event):
         """ Called when the user click on the clear log menu. """
 
-        self.rt.Clear()
+        self.eventLog.clear()
+        self.logCtrl.ShowEntries(False)
 
     def OnAbout(self, event):
         """ Called when the user clicks on Help -> About. """
 
+        import about
+
         frame = about.About(self)
         frame.ShowModal()
 
@@ -377,6 +438,7 @@ class MainFrame(wx.Frame):
             self.Hide()
 
         else:
+            self.CloseConfig()
             self.taskBarIcon.Destroy()
             self.Destroy()
             exit()
@@ -384,6 +446,7 @@ class MainFrame(wx.Frame):
     def OnExit(self, event):
         """ Truly exits the program, no matter what settings is on. """
 
+        self.CloseConfig()
         self.taskBarIcon.Destroy()
         self.Destroy()
 
@@ -443,17 +506,16 @@ class MainFrame(wx.Frame):
     def AddToTree(self, name: str, parent_id):
         """ Add a node to the Tree. """
 
-        match parent_id:
-            case ID.TREE_DOWNLOADING:
-                self.tree.AppendItem(self.tree_downloading, name)
+        section = self.treeSections.get(parent_id)
+        if section is None:
+            return
 
-            case ID.TREE_QUEUE:
-                self.tree.AppendItem(self.tree_queue, name)
+        items = self.treeItems.setdefault(name.lower(), {})
+        if parent_id in items:
+            return
 
-            case ID.TREE_FRIDGE:
-                self.tree.AppendItem(self.tree_fridge, name)
-        
-        self.tree.Refresh()
+        items[parent_id] = self.tree.AppendItem(section, name)
+        self.RefreshTree()
 
     def EditInTree(self, oldName: str, newName: str):
         """ Edit a node in the Tree. """
@@ -461,138 +523,119 @@ class MainFrame(wx.Frame):
         if oldName == newName:
             return
 
-        item = self.GetItemByName(oldName, self.tree_root)
-        if item.IsOk():
+        items = self.treeItems.pop(oldName.lower(), None)
+        if items is None:
+            return
+
+        for item in items.values():
             self.tree.SetItemText(item, newName)
 
-        self.tree.Refresh()
+        self.treeItems[newName.lower()] = items
+        self.RefreshTree()
 
     def RemoveFromTree(self, name: str, parent_id):
         """ Removes a node from the tree by name. """
 
-        match parent_id:
-            case ID.TREE_DOWNLOADING:
-                parent_node = self.tree_downloading
-
-            case ID.TREE_QUEUE:
-                parent_node = self.tree_queue
+        key = name.lower()
+        items = self.treeItems.get(key)
+        if items is None:
+            return
 
-            case ID.TREE_FRIDGE:
-                parent_node = self.tree_fridge
+        if parent_id == ID.TREE_ALL:
+            removed = list(items.values())
+            items.clear()
+        else:
+            item = items.pop(parent_id, None)
+            removed = [item] if item is not None else []
 
-            case ID.TREE_ALL:
-                parent_node = self.tree_root
+        if not items:
+            del self.treeItems[key]
 
-        item = self.GetItemByName(name, parent_node)
-        if item.IsOk():
+        for item in removed:
             self.tree.Delete(item)
-            self.tree.Refresh()
 
-    def GetItemByName(self, name, root_item):
-        item, cookie = self.tree.GetFirstChild(root_item)
+        if removed:
+            self.RefreshTree()
 
-        while item.IsOk():
-            text = self.tree.GetItemText(item)
-            if text.lower() == name.lower():
-                return item
-            if self.tree.ItemHasChildren(item):
-                match = self.GetItemByName(name, item)
-                if match.IsOk():
-                    return match
-            item, cookie = self.tree.GetNextChild(root_item, cookie)
+    @contextmanager
+    def TreeBatch(self):
+        """ Groups tree changes, so the tree is frozen while they happen and redrawn once at the end. Can be nested. """
 
-        return wx.TreeItemId()
+        self.treeBatch += 1
+        if self.treeBatch == 1:
+            self.tree.Freeze()
 
-    def UpdateWaitUntilOnFile(self, name: str, date_time: str = None):
-        """ Updates a streamer's ['wait_until'] key on file. """
+        try:
+            yield
+        finally:
+            self.treeBatch -= 1
+            if self.treeBatch == 0:
+                self.tree.Thaw()
+                self.tree.Refresh()
 
-        for i in range(0, len(self.appData['streamers_data'])):
-            if self.appData['streamers_data'][i]['name'] == name:
-                if date_time:
-                    self.appData['streamers_data'][i]['wait_until'] = date_time
-                else:
-                    self.appData['streamers_data'][i]['wait_until'] = ''
-                
-                self.SaveFile()
-                return
+    def RefreshTree(self):
+        """ Redraws the tree, unless a batch of changes is going on. """
+
+        if self.treeBatch == 0:
+            self.tree.Refresh()
 
     def OnPopupMenu(self, event):
         """ Called when the user clicks on something on the PopupMenu. """
 
         id = event.GetId()
 
-        match self.parent_tree:
-
-            case 'Being downloaded':
-                if id == ID.PUT_BACK:
-                    self.scheduler_thread.RemoveFromThread(self.nameOnPopup)
-                    self.RemoveFromTree(self.nameOnPopup, ID.TREE_DOWNLOADING)
-                    self.tree.AppendItem(self.tree_queue, self.nameOnPopup)
-
-                elif id == ID.WAIT_8:
-                    self.tree.AppendItem(self.tree_fridge, self.nameOnPopup)
-                    self.ProcessFridgeTime(id)
-
-                elif id == ID.WAIT_16:
-                    self.tree.AppendItem(self.tree_fridge, self.nameOnPopup)
-                    self.ProcessFridgeTime(id)
-
-                elif id == ID.WAIT_24:
-                    self.tree.AppendItem(self.tree_fridge, self.nameOnPopup)
-                    self.ProcessFridgeTime(id)
-                    
-
-            case 'On the queue':
-                if id == ID.CHECK_NOW:
-                    if self.scheduler_thread.isActive:
-                        streamer = self.scheduler_thread.GetStreamerByName(self.nameOnPopup)
-                        self._CheckStreamerNow(streamer)
-                    else:
-                        wx.MessageBox('Please, start the scheduler before checking streamers',
-                        'Scheduler stopped', wx.ICON_ERROR)
+        # A move is a removal and an addition. They are drawn together.
+        with self.TreeBatch():
+            match self.parent_tree:
 
-                else:
-                    self.RemoveFromTree(self.nameOnPopup, ID.TREE_QUEUE)
-                    self.tree.AppendItem(self.tree_fridge, self.nameOnPopup)
-                    self.ProcessFridgeTime(id)
+                case 'Being downloaded':
+                    if id == ID.PUT_BACK:
+                        self.scheduler_thread.PutBack(self.nameOnPopup)
+                        self.RemoveFromTree(self.nameOnPopup, ID.TREE_DOWNLOADING)
+                        self.AddToTree(self.nameOnPopup, ID.TREE_QUEUE)
 
-            case 'On the fridge':
-                
-                self.RemoveFromTree(self.nameOnPopup, ID.TREE_FRIDGE)
-                self.tree.AppendItem(self.tree_queue, self.nameOnPopup)
+                    elif id == ID.WAIT_8:
+                        self.AddToTree(self.nameOnPopup, ID.TREE_FRIDGE)
+                        self.ProcessFridgeTime(id)
 
-                if id == ID.REMOVE_FROM_FRIDGE:
-                    self.scheduler_thread.TransferFromFridgeToQueue(self.nameOnPopup)
+                    elif id == ID.WAIT_16:
+                        self.AddToTree(self.nameOnPopup, ID.TREE_FRIDGE)
+                        self.ProcessFridgeTime(id)
 
-                elif id == ID.REMOVE_FROM_FRIDGE_CHECK:
-                    self.scheduler_thread.TransferFromFridgeToQueue(self.nameOnPopup)
-                    streamer = self.scheduler_thread.GetStreamerByName(self.nameOnPopup)
-                    self._CheckStreamerNow(streamer)
+                    elif id == ID.WAIT_24:
+                        self.AddToTree(self.nameOnPopup, ID.TREE_FRIDGE)
+                        self.ProcessFridgeTime(id)
                     
 
-    def _CheckStreamerNow(self, streamer: dict):
-        """ Check if's a streamer is online now. Meant to be called only in the MainFrame. 
-        It does everything else. """
+                case 'On the queue':
+                    if id == ID.CHECK_NOW:
+                        if self.scheduler_thread.isActive:
+                            self.scheduler_thread.CheckNow(self.nameOnPopup)
+                        else:
+                            wx.MessageBox('Please, start the scheduler before checking streamers',
+                            'Scheduler stopped', wx.ICON_ERROR)
 
-        now = datetime.now()
-        status = self.scheduler_thread.CheckStreamer(streamer)
-        name = streamer['name']
+                    else:
+                        self.RemoveFromTree(self.nameOnPopup, ID.TREE_QUEUE)
+                        self.AddToTree(self.nameOnPopup, ID.TREE_FRIDGE)
+                        self.ProcessFridgeTime(id)
 
-        if status:
-            self.AddStreamer(streamer)
+                case 'On the fridge':
+                
+                    self.RemoveFromTree(self.nameOnPopup, ID.TREE_FRIDGE)
+                    self.AddToTree(self.nameOnPopup, ID.TREE_QUEUE)
 
-            self.scheduler_thread.RemoveFromQueue(name)
-            self.RemoveFromTree(name, parent_id=ID.TREE_QUEUE)  
-            self.RemoveFromTree(name, parent_id=ID.TREE_FRIDGE)
+                    if id == ID.REMOVE_FROM_FRIDGE:
+                        self.scheduler_thread.Unfreeze(self.nameOnPopup)
 
-        time = now.strftime("%H:%M:%S")
-        self.Log(name, time, status)
+                    elif id == ID.REMOVE_FROM_FRIDGE_CHECK:
+                        # The result comes back like any other check, through the log and the lists.
+                        self.scheduler_thread.CheckNow(self.nameOnPopup, unfreeze=True)
 
     def ProcessFridgeTime(self, id: ID):
         """ Process the time a streamer will be on the fridge. It also removes the
         streamer from the scheduler thread and saves the file. """
 
-        self.scheduler_thread.RemoveFromThread(self.nameOnPopup)
         self.RemoveFromTree(self.nameOnPopup, ID.TREE_DOWNLOADING)
 
         wait = 0
@@ -606,7 +649,8 @@ class MainFrame(wx.Frame):
 
         until = datetime.now() + timedelta(hours=wait)
         until_str = datetime.strftime(until, "%Y-%m-%d %H:%M:%S")
-        self.UpdateWaitUntilOnFile(self.nameOnPopup, until_str)
+        self.store.set_wait_until(self.nameOnPopup, until_str)
+        self.scheduler_thread.Freeze(self.nameOnPopup, until_str)
 
 class TaskBarIcon(wx.adv.TaskBarIcon):
     def __init__(self, parent):
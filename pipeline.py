@@ -0,0 +1,235 @@
+'''
+Splits a recording in two stages: the `Download` thread reads from the network and
+a `Writer` thread writes to disk. They are connected by a `BufferQueue`, capped in bytes,
+so a slow disk doesn't stall the network read until the buffer is full. What happens then
+depends on the policy:
+
+ - block: the reader waits for the writer (backpressure).
+ - spill: the overflow goes to a temporary file and is written later, in order. The file is in
+   the system's temporary folder, not next to the recording, which is on the slow disk. Its
+   reads and writes happen outside of the queue's lock, so neither side waits for the other's I/O.
+ - drop: the chunk is thrown away and `on_drop` is called.
+'''
+
+import time
+import tempfile
+from collections import deque
+from threading import Thread, Condition, Lock
+
+BLOCK = 'block'
+SPILL = 'spill'
+DROP = 'drop'
+POLICIES = (BLOCK, SPILL, DROP)
+
+DEFAULT_BUFFER_SIZE = 32 * 1_048_576
+
+# Size of the pieces read back from the spill file.
+SPILL_READ_SIZE = 1_048_576
+
+class BufferQueue():
+    def __init__(self, max_bytes: int = DEFAULT_BUFFER_SIZE, policy: str = BLOCK, spill_dir: str = None, on_drop = None):
+        ''' `spill_dir` is where the spill file goes, the system's temporary folder by default. '''
+
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown buffer policy: {policy}")
+
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.spill_dir = spill_dir
+        self.on_drop = on_drop
+
+        self.cond = Condition()
+        self.buffers = deque()
+        self.size = 0
+        self.isClosed = False
+
+        # Only the reader writes to the spill file and only the writer reads from it. `spill_lock`
+        # keeps their seeks apart. While the reader is at it, the file isn't started over.
+        self.spill_file = None
+        self.spill_lock = Lock()
+        self.spill_read = 0
+        self.spill_write = 0
+        self.isSpilling = False
+
+        self.high_water = 0
+        self.blocked_time = 0.0
+        self.spilled_bytes = 0
+        self.dropped_bytes = 0
+        self.dropped_chunks = 0
+
+    def put(self, data: bytes) -> bool:
+        ''' Queues `data` for the writer. Returns False if the queue was closed and the reader should stop. '''
+
+        size = len(data)
+        with self.cond:
+            if self.isClosed:
+                return False
+
+            # Once something was spilled, everything after it goes to the spill file as well,
+            # until the writer catches up. Otherwise the file would be written out of order.
+            spill = self.spill_write > self.spill_read
+
+            if not spill and self.size + size > self.max_bytes and self.size > 0:
+                if self.policy == BLOCK:
+                    start = time.perf_counter()
+                    while self.size + size > self.max_bytes and self.size > 0 and not self.isClosed:
+                        self.cond.wait()
+
+                    self.blocked_time += time.perf_counter() - start
+                    if self.isClosed:
+                        return False
+
+                elif self.policy == SPILL:
+                    spill = True
+
+                else:
+                    self.dropped_bytes += size
+                    self.dropped_chunks += 1
+                    if self.on_drop:
+                        self.on_drop(size)
+
+                    return True
+
+            if not spill:
+                self.buffers.append(data)
+                self.size += size
+                if self.size > self.high_water:
+                    self.high_water = self.size
+
+                self.cond.notify_all()
+                return True
+
+            self.isSpilling = True
+            offset = self.spill_write
+
+        self._spill(data, offset)
+        return True
+
+    def get(self, timeout: float = None) -> bytes | None:
+        ''' Returns the next piece of data to be written, waiting for one if needed.
+        Returns None when the queue is closed and there is nothing left, and b'' if nothing came within `timeout` seconds. '''
+
+        with self.cond:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while not self.buffers and self.spill_write == self.spill_read and (not self.isClosed or self.isSpilling):
+                if deadline is None:
+                    self.cond.wait()
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return b''
+
+                    self.cond.wait(remaining)
+
+            if self.buffers:
+                data = self.buffers.popleft()
+                self.size -= len(data)
+                self.cond.notify_all()
+                return data
+
+            if self.spill_write == self.spill_read:
+                return None
+
+            offset = self.spill_read
+            size = min(SPILL_READ_SIZE, self.spill_write - self.spill_read)
+
+        return self._unspill(offset, size)
+
+    def close(self):
+        ''' No more data will be put. The writer still gets everything already queued. '''
+
+        with self.cond:
+            self.isClosed = True
+            self.cond.notify_all()
+
+    def stats(self) -> dict:
+        ''' Returns the buffer metrics. '''
+
+        with self.cond:
+            return {
+                'buffered': self.size + self.spill_write - self.spill_read,
+                'high_water': self.high_water,
+                'blocked_time': self.blocked_time,
+                'spilled_bytes': self.spilled_bytes,
+                'dropped_bytes': self.dropped_bytes,
+                'dropped_chunks': self.dropped_chunks,
+            }
+
+    def _spill(self, data: bytes, offset: int):
+        ''' Writes `data` at `offset` of the spill file, then hands it to the writer. Called by the reader, without `self.cond`. '''
+
+        written = False
+        try:
+            with self.spill_lock:
+                if self.spill_file is None:
+                    self.spill_file = tempfile.TemporaryFile(dir=self.spill_dir)
+
+                self.spill_file.seek(offset)
+                self.spill_file.write(data)
+            written = True
+        finally:
+            with self.cond:
+                self.isSpilling = False
+                if written:
+                    self.spill_write += len(data)
+                    self.spilled_bytes += len(data)
+                self.cond.notify_all()
+
+    def _unspill(self, offset: int, size: int) -> bytes:
+        ''' Reads `size` bytes at `offset` of the spill file. Called by the writer, without `self.cond`. '''
+
+        data = b''
+        try:
+            with self.spill_lock:
+                self.spill_file.seek(offset)
+                data = self.spill_file.read(size)
+        finally:
+            with self.cond:
+                self.spill_read += len(data)
+
+                # Everything was written, so the file can start over. Its space is kept until `release`.
+                if self.spill_read == self.spill_write and not self.isSpilling:
+                    self.spill_read = 0
+                    self.spill_write = 0
+
+                self.cond.notify_all()
+
+        return data
+
+    def release(self):
+        ''' Deletes the spill file, if any. '''
+
+        with self.cond:
+            if self.spill_file is not None:
+                self.spill_file.close()
+                self.spill_file = None
+
+class Writer(Thread):
+    def __init__(self, file, queue: BufferQueue, name: str = None):
+        ''' `file` is a `recording_writer.RecordingWriter`. '''
+
+        Thread.__init__(self, name=name, daemon=True)
+
+        self.file = file
+        self.queue = queue
+        self.written = 0
+        self.error = None
+
+    def run(self):
+        ''' Writes everything from the queue into the file until the queue is closed. '''
+
+        while True:
+            data = self.queue.get(self.file.timeout())
+            if data is None:
+                break
+
+            try:
+                if data:
+                    self.file.write(data)
+                self.file.tick()
+            except OSError as e:
+                self.error = e
+                self.queue.close()
+                break
+
+            self.written += len(data)
@@ -0,0 +1,90 @@
+'''
+A central place where download threads publish their progress. Each `Download` owns
+one `Progress` entry and is the only thread writing to it, so no lock is needed for updates.
+The entries dictionary is copied on every register/unregister, which are rare,
+so the UI can read a snapshot once per tick without locking the download threads.
+The speed of each download, and of all of them together, is measured when the snapshot is taken.
+'''
+
+import time
+from threading import Lock
+from throughput import ThroughputMeter
+
+class Progress():
+    __slots__ = ('name', 'quality', 'started', 'total', 'buffer')
+
+    def __init__(self, name: str, quality: str):
+        self.name = name
+        self.quality = quality
+        self.started = time.monotonic()
+        self.total = 0
+
+        # Returns the metrics of the recording's buffer queue, as in `pipeline.BufferQueue.stats`. Set once it's recording.
+        self.buffer = None
+
+class ProgressRegistry():
+    def __init__(self):
+        self.entries = {}
+        self.lock = Lock()
+
+        # name -> (entry, meter). Only touched by the thread taking the snapshots.
+        self.meters = {}
+        self.global_meter = ThroughputMeter()
+        self.global_total = 0
+
+    def register(self, name: str, quality: str) -> Progress:
+        ''' Creates the progress entry for the download `name`. '''
+
+        entry = Progress(name, quality)
+        with self.lock:
+            entries = dict(self.entries)
+            entries[name] = entry
+            self.entries = entries
+
+        return entry
+
+    def unregister(self, name: str):
+        ''' Removes the progress entry for the download `name`. '''
+
+        with self.lock:
+            if name in self.entries:
+                entries = dict(self.entries)
+                del entries[name]
+                self.entries = entries
+
+    def snapshot(self, now: float = None) -> dict:
+        ''' Returns a dictionary `name -> (quality, started, total, rates)` with the current progress of every download.
+        `rates` is the tuple returned by `ThroughputMeter.rates`. Should be called from one thread only, once per tick. '''
+
+        if now is None:
+            now = time.monotonic()
+
+        entries = self.entries
+        result = {}
+        added = 0
+
+        for name, e in entries.items():
+            # A streamer that went live again gets a new entry, and so a new meter.
+            entry, meter = self.meters.get(name, (None, None))
+            if entry is not e:
+                meter = ThroughputMeter()
+                meter.sample(0, e.started)
+                self.meters[name] = (e, meter)
+
+            total = e.total
+            added += total - meter.last_total
+            meter.sample(total, now)
+            result[name] = (e.quality, e.started, total, meter.rates())
+
+        for name in [n for n in self.meters if n not in entries]:
+            del self.meters[name]
+
+        self.global_total += added
+        self.global_meter.sample(self.global_total, now)
+
+        return result
+
+    def global_rates(self) -> tuple:
+        ''' Returns the speed of all downloads together, as in `ThroughputMeter.rates`. Updated by `snapshot`. '''
+
+        return self.global_meter.rates()
@@ -0,0 +1,188 @@
+'''
+An index of the recordings, kept in a SQLite database. Every Download adds its file when it
+starts, updates the byte count every `UPDATE_INTERVAL` seconds and closes the entry with the
+reason it ended. Questions like "every recording of X last week and how big they are" are then
+an indexed query instead of a walk over the download folder.
+
+Files recorded before the catalog existed, or while the app was closed, are picked up by
+`reconcile()`. It scans the folder once and brings the catalog in line with it.
+'''
+
+import os
+import re
+import time
+import sqlite3
+from datetime import datetime
+from threading import Lock
+
+UPDATE_INTERVAL = 30
+
+# Why a recording ended.
+ENDED = 'ended'
+KILLED = 'killed'
+READ_ERROR = 'read error'
+WRITE_ERROR = 'write error'
+UNKNOWN = 'unknown'
+
+# `{name}_{%Y-%m-%d__%H-%M-%S}.ts`, as named by Download.
+FILE_PATTERN = re.compile(r'^(.+)_(\d{4}-\d{2}-\d{2}__\d{2}-\d{2}-\d{2})\.ts$')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS recordings (
+    id INTEGER PRIMARY KEY,
+    file TEXT NOT NULL UNIQUE,
+    streamer TEXT NOT NULL,
+    url TEXT NOT NULL,
+    quality TEXT NOT NULL,
+    started REAL NOT NULL,
+    ended REAL,
+    bytes INTEGER NOT NULL DEFAULT 0,
+    bitrate REAL NOT NULL DEFAULT 0,
+    end_reason TEXT
+);
+CREATE INDEX IF NOT EXISTS recordings_streamer ON recordings(streamer, started);
+CREATE INDEX IF NOT EXISTS recordings_started ON recordings(started);
+'''
+
+CLOSE = 'UPDATE recordings SET ended = ?, bytes = ?, bitrate = ? * 8 / MAX(? - started, 1), end_reason = ? WHERE id = ?'
+
+COLUMNS = ('id', 'file', 'streamer', 'url', 'quality', 'started', 'ended', 'bytes', 'bitrate', 'end_reason')
+
+class RecordingCatalog():
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = Lock()
+
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+
+    def start(self, file: str, streamer: str, url: str, quality: str) -> int:
+        ''' Adds a recording that just started. Returns its id. '''
+
+        with self.lock:
+            cursor = self.conn.execute('INSERT OR REPLACE INTO recordings (file, streamer, url, quality, started) '
+                'VALUES (?, ?, ?, ?, ?)', (file, streamer, url, quality, time.time()))
+            return cursor.lastrowid
+
+    def update(self, recording: int, size: int):
+        ''' Saves how many bytes a recording has so far. '''
+
+        now = time.time()
+        with self.lock:
+            self.conn.execute('UPDATE recordings SET bytes = ?, bitrate = ? * 8 / MAX(? - started, 1) WHERE id = ?',
+                (size, size, now, recording))
+
+    def finish(self, recording: int, size: int, reason: str):
+        ''' Closes a recording with its final size and the reason it ended. '''
+
+        now = time.time()
+        with self.lock:
+            self.conn.execute(CLOSE, (now, size, size, now, reason, recording))
+
+    def recordings(self, streamer: str = None, since: float = None, until: float = None) -> list:
+        ''' Returns the recordings, newest first, as dictionaries. `streamer`, and the epoch times
+        `since` and `until` of their start, narrow them down. '''
+
+        where, params = self._filter(streamer, since, until)
+        with self.lock:
+            rows = self.conn.execute(f"SELECT {', '.join(COLUMNS)} FROM recordings{where} ORDER BY started DESC", params)
+            return [dict(zip(COLUMNS, row)) for row in rows]
+
+    def summary(self, streamer: str = None, since: float = None, until: float = None) -> tuple:
+        ''' Returns how many recordings there are and their total size in bytes, with the same filters as `recordings()`. '''
+
+        where, params = self._filter(streamer, since, until)
+        with self.lock:
+            return self.conn.execute(f"SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM recordings{where}", params).fetchone()
+
+    def last_bitrate(self, streamer: str, quality: str) -> float | None:
+        ''' Returns the bitrate, in bits per second, of the last recording of `streamer` in `quality`
+        that ran for at least a minute, or None if there's none. '''
+
+        with self.lock:
+            row = self.conn.execute('SELECT bitrate FROM recordings WHERE streamer = ? AND quality = ? AND bitrate > 0 '
+                'AND ended - started >= 60 ORDER BY started DESC LIMIT 1', (streamer, quality)).fetchone()
+
+        return row[0] if row else None
+
+    def reconcile(self, directory: str, stale: float = UPDATE_INTERVAL * 4) -> dict:
+        ''' Brings the catalog in line with the .ts files in `directory`. Unknown files are added, sizes are
+        corrected and entries of deleted files are dropped. An entry left open, because the app was closed
+        in the middle of a recording, is closed once its file hasn't changed for `stale` seconds.
+        Returns how many entries were added, updated, removed and closed. '''
+
+        counts = {'added': 0, 'updated': 0, 'removed': 0, 'closed': 0}
+        files = {}
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.endswith('.ts'):
+                    files[entry.path] = entry.stat()
+
+        now = time.time()
+        with self.lock:
+            self.conn.execute('BEGIN')
+            try:
+                # Every file path in `directory` sorts between these two, so the unique index on `file` is used.
+                # The range also has the files of its subfolders, which aren't scanned, so they're left out.
+                prefix = os.path.join(directory, '')
+                known = self.conn.execute('SELECT id, file, started, ended, bytes, end_reason FROM recordings WHERE file >= ? AND file < ?',
+                    (prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1))).fetchall()
+                known = [row for row in known if os.path.dirname(row[1]) == os.path.dirname(prefix)]
+
+                for recording, file, started, ended, size, reason in known:
+                    stat = files.pop(file, None)
+                    if stat is None:
+                        if ended is not None or now - started > stale:
+                            self.conn.execute('DELETE FROM recordings WHERE id = ?', (recording,))
+                            counts['removed'] += 1
+
+                    elif ended is None:
+                        if now - stat.st_mtime > stale:
+                            self.conn.execute(CLOSE, (stat.st_mtime, stat.st_size, stat.st_size, stat.st_mtime, UNKNOWN, recording))
+                            counts['closed'] += 1
+
+                    elif size != stat.st_size:
+                        self.conn.execute(CLOSE, (ended, stat.st_size, stat.st_size, ended, reason, recording))
+                        counts['updated'] += 1
+
+                for file, stat in files.items():
+                    match = FILE_PATTERN.match(os.path.basename(file))
+                    if match is None:
+                        continue
+
+                    streamer = match.group(1)
+                    started = datetime.strptime(match.group(2), "%Y-%m-%d__%H-%M-%S").timestamp()
+                    ended = max(stat.st_mtime, started)
+                    self.conn.execute('INSERT INTO recordings (file, streamer, url, quality, started, ended, bytes, bitrate, end_reason) '
+                        'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', (file, streamer, '', '', started, ended, stat.st_size,
+                        stat.st_size * 8 / max(ended - started, 1), UNKNOWN))
+                    counts['added'] += 1
+
+                self.conn.execute('COMMIT')
+            except:
+                self.conn.execute('ROLLBACK')
+                raise
+
+        return counts
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def _filter(self, streamer: str, since: float, until: float) -> tuple:
+        conditions = []
+        params = []
+        if streamer is not None:
+            conditions.append('streamer = ?')
+            params.append(streamer)
+        if since is not None:
+            conditions.append('started >= ?')
+            params.append(since)
+        if until is not None:
+            conditions.append('started < ?')
+            params.append(until)
+
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ''
+        return where, params
@@ -0,0 +1,349 @@
+'''
+Recording in worker processes. With many recordings at once, reading, decrypting and copying
+the streams in one interpreter keeps them all behind the same GIL. In process mode
+(`recording_processes` > 0 in the settings), the recordings are spread over that many worker
+processes, each with its own `session_pool.SessionPool`.
+
+A `Download` thread still exists for each recording, so the scheduler and the UI don't see a
+difference. It submits the recording to the `RecordingPool` and waits for it. The worker opens the
+stream again, by url and quality, and records it with `download_thread.copy_stream`.
+
+Each worker has a command queue. All of them share one result queue, read by a listener thread:
+
+    commands:  ('start', id, url, quality, path, options)   ('stop', id)   ('rate', id, bytes per second)   None to exit
+    results:   ('opened', id, seconds)   ('failed', id)   ('drop', id, size)   ('write-error', id, text)
+               ('progress', {id: total}, {id: buffer stats})  ('ended', id, reason, total, latencies)
+
+Progress is sent in one message per worker every `PROGRESS_INTERVAL` seconds, not per chunk.
+The write and sync times of a recording are sent when it ends, and added to `RecordingPool.latencies`.
+'''
+
+import time
+import itertools
+import traceback
+import multiprocessing
+from threading import Thread, Event, Lock
+from queue import Empty
+from urllib.parse import urlparse
+import recording_catalog as catalog
+from session_pool import SessionPool
+from download_thread import copy_stream
+from progress import Progress
+from utilities import LatencyHistogram
+from bandwidth import TokenBucket, Account
+
+PROGRESS_INTERVAL = 0.5
+
+# How long the workers get to close their files when the pool shuts down, in seconds.
+SHUTDOWN_TIMEOUT = 10
+
+# How long a worker waits for its recordings to close before exiting anyway. Less than the above, so it exits by itself.
+CLOSE_TIMEOUT = 8
+
+def open_with_streamlink(sessions: SessionPool, url: str, quality: str):
+    ''' Opens `quality` of the stream at `url`, on the session of its domain. The worker opener used by the app. '''
+
+    return sessions.get(urlparse(url).netloc).streams(url)[quality].open()
+
+class RemoteRecording():
+    ''' A recording submitted to the pool, as seen from the main process. Updated by the listener thread. '''
+
+    def __init__(self, id: int, worker: int, on_drop = None, on_error = None):
+        self.id = id
+        self.worker = worker
+        self.on_drop = on_drop
+        self.on_error = on_error
+
+        self.opened = Event()
+        self.done = Event()
+        self.isOpen = False
+        self.open_time = 0.0
+        self.total = 0
+        self.buffer = None
+        self.reason = None
+
+class RecordingPool():
+    def __init__(self, workers: int, opener = open_with_streamlink, session_settings: dict = None):
+        ''' `opener(sessions, url, quality)` opens a stream in a worker, where `sessions` is a `SessionPool`
+        with `session_settings`. It must be an importable function, since the workers are started with spawn. '''
+
+        self.size = workers
+        self.opener = opener
+        self.session_settings = {key: value for key, value in (session_settings or {}).items() if key.startswith('http_')}
+
+        self.context = multiprocessing.get_context('spawn')
+        self.results = None
+        self.processes = []
+        self.commands = []
+        self.load = [0] * workers
+
+        self.recordings = {}
+        self.ids = itertools.count()
+        self.lock = Lock()
+        self.listener = None
+        self.isClosed = False
+
+        self.messages = 0
+
+        # The write and sync times of the recordings that ended.
+        self.latencies = {'write': LatencyHistogram(), 'sync': LatencyHistogram()}
+
+    def start(self):
+        ''' Starts the workers. Done by the first `submit`, so the processes only exist when used. '''
+
+        self.results = self.context.Queue()
+        for i in range(self.size):
+            commands = self.context.Queue()
+            process = self.context.Process(target=worker_main, name=f'recording-worker-{i}', daemon=True,
+                args=(commands, self.results, self.opener, self.session_settings))
+            process.start()
+
+            self.commands.append(commands)
+            self.processes.append(process)
+
+        self.listener = Thread(target=self._listen, name='recording-pool', daemon=True)
+        self.listener.start()
+
+    def submit(self, url: str, quality: str, path: str, options: dict, on_drop = None, on_error = None) -> RemoteRecording:
+        ''' Records `quality` of `url` into `path` in the worker with the fewest recordings.
+        `options` are the keyword arguments of `copy_stream` (chunk_size, buffer_size, buffer_policy, write_options),
+        and `rate`, the bytes per second the recording is held to, if it's under the bandwidth budget. '''
+
+        with self.lock:
+            if self.isClosed:
+                raise RuntimeError('The recording pool is closed.')
+
+            if not self.processes:
+                self.start()
+
+            worker = min(range(self.size), key=lambda i: self.load[i])
+            recording = RemoteRecording(next(self.ids), worker, on_drop, on_error)
+            self.recordings[recording.id] = recording
+            self.load[worker] += 1
+
+        self.commands[worker].put(('start', recording.id, url, quality, path, options))
+        return recording
+
+    def stop(self, recording: RemoteRecording):
+        ''' Asks the worker to stop `recording`. It's done when `recording.done` is set. '''
+
+        if not recording.done.is_set():
+            self.commands[recording.worker].put(('stop', recording.id))
+
+    def set_rate(self, recording: RemoteRecording, rate: float):
+        ''' Holds `recording` to `rate` bytes per second. Only for recordings submitted with a `rate` option. '''
+
+        if not recording.done.is_set():
+            self.commands[recording.worker].put(('rate', recording.id, rate))
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {'workers': len(self.processes), 'recordings': len(self.recordings), 'load': list(self.load),
+                'messages': self.messages}
+
+    def shutdown(self):
+        ''' Stops every recording and the workers. '''
+
+        with self.lock:
+            self.isClosed = True
+
+        for commands in self.commands:
+            commands.put(None)
+
+        for process in self.processes:
+            process.join(SHUTDOWN_TIMEOUT)
+            if process.is_alive():
+                process.terminate()
+
+        if self.listener is not None:
+            self.listener.join(SHUTDOWN_TIMEOUT)
+        self._fail_all(lambda recording: True)
+
+    def _listen(self):
+        ''' Applies the results of the workers. A worker that died ends its recordings with a read error. '''
+
+        next_check = time.monotonic() + 1
+        while True:
+            try:
+                message = self.results.get(timeout=1)
+            except Empty:
+                message = None
+            except (EOFError, OSError):
+                return
+
+            if message is None:
+                dead = {i for i, process in enumerate(self.processes) if not process.is_alive()}
+
+                # Everything the workers sent before exiting was applied.
+                if self.isClosed and len(dead) == len(self.processes):
+                    return
+
+            now = time.monotonic()
+            if now >= next_check:
+                next_check = now + 1
+                dead = {i for i, process in enumerate(self.processes) if not process.is_alive()}
+                if dead and not self.isClosed:
+                    self._fail_all(lambda recording: recording.worker in dead)
+
+            if message is None:
+                continue
+
+            self.messages += 1
+            kind = message[0]
+
+            if kind == 'progress':
+                for id, total in message[1].items():
+                    recording = self.recordings.get(id)
+                    if recording is not None:
+                        recording.total = total
+                        recording.buffer = message[2].get(id)
+                continue
+
+            recording = self.recordings.get(message[1])
+            if recording is None:
+                continue
+
+            if kind == 'opened':
+                recording.open_time = message[2]
+                recording.isOpen = True
+                recording.opened.set()
+
+            elif kind == 'drop':
+                if recording.on_drop:
+                    self._notify(recording.on_drop, message[2])
+
+            elif kind == 'write-error':
+                if recording.on_error:
+                    self._notify(recording.on_error, message[2])
+
+            elif kind in ('failed', 'ended'):
+                if kind == 'ended':
+                    recording.reason = message[2]
+                    recording.total = message[3]
+                    for name, snapshot in message[4].items():
+                        self.latencies[name].merge(*snapshot)
+                self._finish(recording)
+
+    def _notify(self, callback, *args):
+        ''' Calls a callback of a recording. One that raises prints its traceback, the listener goes on. '''
+
+        try:
+            callback(*args)
+        except Exception:
+            traceback.print_exc()
+
+    def _finish(self, recording: RemoteRecording):
+        with self.lock:
+            if self.recordings.pop(recording.id, None) is None:
+                return
+            self.load[recording.worker] -= 1
+
+        if recording.reason is None:
+            recording.reason = catalog.READ_ERROR
+
+        recording.opened.set()
+        recording.done.set()
+
+    def _fail_all(self, which):
+        with self.lock:
+            recordings = [r for r in self.recordings.values() if which(r)]
+
+        for recording in recordings:
+            self._finish(recording)
+
+def worker_main(commands, results, opener, session_settings: dict):
+    ''' The loop of a worker process. Each recording gets a thread, like in thread mode. '''
+
+    sessions = SessionPool(session_settings)
+    active = {}
+    lock = Lock()
+
+    def record(id: int, url: str, quality: str, path: str, options: dict):
+        start = time.perf_counter()
+        try:
+            stream_data = opener(sessions, url, quality)
+        except Exception:
+            results.put(('failed', id))
+            with lock:
+                del active[id]
+            return
+
+        results.put(('opened', id, time.perf_counter() - start))
+
+        progress, flags = active[id]
+        options = dict(options)
+        options.pop('rate', None)
+
+        shape = None
+        if flags['limit'] is not None:
+            bucket, account = flags['limit']
+            shape = lambda size: bucket.take(account, size)
+
+        latencies = {'write': LatencyHistogram(), 'sync': LatencyHistogram()}
+        reason = copy_stream(stream_data, path, progress, lambda: flags['active'],
+            on_drop=lambda size: results.put(('drop', id, size)), name=f'recording-{id}', latencies=latencies,
+            on_error=lambda text: results.put(('write-error', id, text)), shape=shape, **options)
+
+        try:
+            stream_data.close()
+        except Exception:
+            pass
+
+        with lock:
+            del active[id]
+        results.put(('ended', id, reason, progress.total, {name: h.snapshot() for name, h in latencies.items()}))
+
+    def report():
+        while True:
+            time.sleep(PROGRESS_INTERVAL)
+            with lock:
+                totals = {id: progress.total for id, (progress, _) in active.items()}
+                buffers = {id: progress.buffer() for id, (progress, _) in active.items() if progress.buffer}
+            if totals:
+                results.put(('progress', totals, buffers))
+
+    Thread(target=report, name='progress', daemon=True).start()
+    threads = []
+
+    while True:
+        command = commands.get()
+        if command is None:
+            break
+
+        if command[0] == 'start':
+            _, id, url, quality, path, options = command
+
+            # A recording under the bandwidth budget gets a bucket of its own, at the rate it was granted.
+            limit = None
+            if options.get('rate'):
+                limit = (TokenBucket(options['rate']), Account(str(id), '', 1, options['rate']))
+
+            with lock:
+                active[id] = (Progress(str(id), quality), {'active': True, 'limit': limit})
+            t = Thread(target=record, args=(id, url, quality, path, options), name=f'recording-{id}', daemon=True)
+            t.start()
+            threads.append(t)
+
+        elif command[0] == 'stop':
+            with lock:
+                entry = active.get(command[1])
+            if entry is not None:
+                entry[1]['active'] = False
+
+        elif command[0] == 'rate':
+            with lock:
+                entry = active.get(command[1])
+            if entry is not None and entry[1]['limit'] is not None:
+                entry[1]['limit'][0].set_rate(command[2])
+
+        threads = [t for t in threads if t.is_alive()]
+
+    # Closes every file before exiting. A recording stuck in a read doesn't keep the worker alive,
+    # the pool ends it with a read error.
+    with lock:
+        for _, flags in active.values():
+            flags['active'] = False
+
+    deadline = time.monotonic() + CLOSE_TIMEOUT
+    for t in threads:
+        t.join(max(deadline - time.monotonic(), 0))
@@ -0,0 +1,218 @@
+'''
+The file a recording is written to, used by the `pipeline.Writer` thread. The chunks of the
+stream are coalesced into writes of `write_size` bytes, ending on a 4 KiB block boundary of the
+file, so the disk gets few large writes instead of many small ones. Coalesced data waits at most
+`FLUSH_INTERVAL` seconds, so a slow stream still reaches the file.
+
+The settings, all optional:
+
+    write_size          1 MiB  bytes coalesced into one write
+    write_preallocate   0      seconds of the expected rate reserved on disk ahead of the data, 0 for none
+    write_sync_mb       0      fsync after this many MB written, 0 for never
+    write_sync_seconds  0      fsync this many seconds after the first unsynced write, 0 for never
+
+Without a sync setting, what's written is left to the OS cache, and a power loss loses what it
+hadn't flushed yet. With one, at most that much is lost, and the file is also synced when it's closed.
+
+Preallocation uses `fallocate` without changing the file size, so players and the catalog see
+the real size while recording. It's Linux only, and skipped where the file system doesn't support
+it. What wasn't used is given back when the file is closed.
+
+Once a write or a sync fails (a full disk, an I/O error), the error is kept in `error` and raised,
+and the data still waiting is dropped: nothing more is written, and `close` only closes the file.
+
+How long each write and each sync take is added to `latencies`, a dict of
+`utilities.LatencyHistogram` by 'write' and 'sync'.
+'''
+
+import os
+import sys
+import time
+import ctypes
+
+DEFAULT_WRITE_SIZE = 1_048_576
+BLOCK_SIZE = 4096
+
+# Coalesced data is written after waiting this long, in seconds, even if there's less than `write_size`.
+FLUSH_INTERVAL = 2.0
+
+FALLOC_FL_KEEP_SIZE = 1
+
+def _load_fallocate():
+    ''' Returns the `fallocate` of libc, or None where there's none. '''
+
+    if not sys.platform.startswith('linux'):
+        return None
+
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        fallocate = getattr(libc, 'fallocate64', None) or libc.fallocate
+    except (OSError, AttributeError):
+        return None
+
+    fallocate.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_int64, ctypes.c_int64]
+    fallocate.restype = ctypes.c_int
+    return fallocate
+
+_fallocate = _load_fallocate()
+
+class RecordingWriter():
+    def __init__(self, path: str, write_size: int = DEFAULT_WRITE_SIZE, preallocate: int = 0, sync_bytes: int = 0,
+        sync_seconds: float = 0, latencies: dict = None):
+        ''' Opens `path` to append to it. `preallocate` is how many bytes to keep reserved ahead of the data. '''
+
+        self.fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND | getattr(os, 'O_BINARY', 0), 0o644)
+        self.offset = os.fstat(self.fd).st_size
+
+        self.write_size = max(-(-write_size // BLOCK_SIZE) * BLOCK_SIZE, BLOCK_SIZE)
+        self.sync_bytes = sync_bytes
+        self.sync_seconds = sync_seconds
+        self.latencies = latencies
+
+        self.pending = bytearray()
+        self.pendingSince = None
+
+        self.unsynced = 0
+        self.unsyncedSince = None
+        self.syncs = 0
+        self.error = None
+
+        self.preallocate = preallocate if _fallocate is not None else 0
+        self.reserved = self.offset
+        self._reserve()
+
+    def write(self, data: bytes):
+        ''' Adds `data` to the file. It's written once there's `write_size` of it, or on `tick`. '''
+
+        if self.error is not None:
+            return
+
+        if not self.pending:
+            self.pendingSince = time.monotonic()
+
+        self.pending += data
+        if len(self.pending) >= self.write_size:
+            self._flush(aligned=True)
+
+    def timeout(self) -> float | None:
+        ''' Returns in how many seconds `tick` has something to do, or None if nothing is waiting. '''
+
+        if self.error is not None:
+            return None
+
+        due = []
+        if self.pending:
+            due.append(self.pendingSince + FLUSH_INTERVAL)
+        if self.sync_seconds and self.unsynced:
+            due.append(self.unsyncedSince + self.sync_seconds)
+
+        if not due:
+            return None
+
+        return max(min(due) - time.monotonic(), 0)
+
+    def tick(self):
+        ''' Writes the coalesced data that waited too long, and syncs if it's time to. '''
+
+        if self.error is not None:
+            return
+
+        now = time.monotonic()
+        if self.pending and now >= self.pendingSince + FLUSH_INTERVAL:
+            self._flush(aligned=False)
+
+        if self.sync_seconds and self.unsynced and now >= self.unsyncedSince + self.sync_seconds:
+            self._sync()
+
+    def close(self):
+        ''' Writes what's left, syncs if there's a sync setting and closes the file. Raises the error
+        of that last write or sync, but not one that was already raised. '''
+
+        try:
+            if self.error is None:
+                self._flush(aligned=False)
+                if self.unsynced and (self.sync_bytes or self.sync_seconds):
+                    self._sync()
+        finally:
+            try:
+                # Gives back the space reserved past the end of the data.
+                if self.reserved > self.offset:
+                    os.ftruncate(self.fd, self.offset)
+            finally:
+                os.close(self.fd)
+
+    def _flush(self, aligned: bool):
+        ''' Writes the pending data. If `aligned`, only up to the last block boundary it reaches. '''
+
+        size = len(self.pending)
+        if aligned:
+            size = (self.offset + size) // BLOCK_SIZE * BLOCK_SIZE - self.offset
+            if size <= 0:
+                size = len(self.pending)
+
+        if size == 0:
+            return
+
+        view = memoryview(self.pending)
+        written = 0
+        try:
+            while written < size:
+                start = time.perf_counter()
+                n = os.write(self.fd, view[written:size])
+                if self.latencies is not None:
+                    self.latencies['write'].add(time.perf_counter() - start)
+                written += n
+        except OSError as e:
+            self.error = e
+            raise
+        finally:
+            view.release()
+            if self.error is None:
+                del self.pending[:written]
+            else:
+                # The failed write may still hold a view of the old buffer.
+                self.pending = bytearray()
+            self.offset += written
+
+        self.pendingSince = time.monotonic() if self.pending else None
+        if not self.unsynced:
+            self.unsyncedSince = time.monotonic()
+        self.unsynced += written
+
+        if self.sync_bytes and self.unsynced >= self.sync_bytes:
+            self._sync()
+
+        self._reserve()
+
+    def _sync(self):
+        start = time.perf_counter()
+        try:
+            if hasattr(os, 'fdatasync'):
+                os.fdatasync(self.fd)
+            else:
+                os.fsync(self.fd)
+        except OSError as e:
+            self.error = e
+            raise
+
+        if self.latencies is not None:
+            self.latencies['sync'].add(time.perf_counter() - start)
+
+        self.syncs += 1
+        self.unsynced = 0
+        self.unsyncedSince = None
+
+    def _reserve(self):
+        ''' Keeps `preallocate` bytes reserved ahead of the data, in steps of half of it. '''
+
+        if not self.preallocate or self.reserved - self.offset > self.preallocate // 2:
+            return
+
+        start = max(self.reserved, self.offset)
+        size = self.offset + self.preallocate - start
+        if _fallocate(self.fd, FALLOC_FL_KEEP_SIZE, start, size) != 0:
+            # Not supported here, or the disk is full. The writes will tell which.
+            self.preallocate = 0
+            return
+
+        self.reserved = start + size
@@ -0,0 +1,68 @@
+'''
+Remembers, for a short time, the streams that `session.streams(url)` resolved for a URL:
+the quality map, with the playlist URL of each quality. A check that runs right after
+another one, or a download restarted after the stream dropped, can skip the plugin
+matching, the API calls and the playlist fetch. Only online results are kept. An entry
+is removed when opening its stream fails or its recording ends, so a stream that ended is
+resolved again. A check also passes its domain's wait time as `max_age`, so it never gets
+an "online" older than the last time the streamer could have been checked.
+'''
+
+import time
+from collections import OrderedDict
+from threading import Lock
+
+class ResolutionCache():
+    def __init__(self, ttl: float = 60, max_size: int = 256):
+        self.ttl = ttl
+        self.max_size = max_size
+
+        self.entries = OrderedDict()
+        self.lock = Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, url: str, max_age: float = None) -> dict | None:
+        ''' Returns the streams resolved for `url`, or None if they are not cached, expired or, if given,
+        older than `max_age` seconds. '''
+
+        with self.lock:
+            entry = self.entries.get(url)
+            if entry is not None:
+                resolved, streams = entry
+                age = time.monotonic() - resolved
+                if age < self.ttl and (max_age is None or age < max_age):
+                    self.entries.move_to_end(url)
+                    self.hits += 1
+                    return streams
+
+                # Expired, or too old for this caller. It's resolved again either way.
+                del self.entries[url]
+
+            self.misses += 1
+            return None
+
+    def put(self, url: str, streams: dict):
+        ''' Caches the streams resolved for `url`. The least recently used entry is evicted when full. '''
+
+        with self.lock:
+            self.entries[url] = (time.monotonic(), streams)
+            self.entries.move_to_end(url)
+
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, url: str):
+        ''' Forgets the streams resolved for `url`. '''
+
+        with self.lock:
+            if self.entries.pop(url, None) is not None:
+                self.invalidations += 1
+
+    def stats(self) -> dict:
+        ''' Returns the hit, miss and invalidation counters and the current size. '''
+
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses, 'invalidations': self.invalidations, 'size': len(self.entries)}
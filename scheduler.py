@@ -1,232 +1,589 @@
-import streamlink
-from streamlink.options import Options
-from wx import CallAfter
-from threading import Thread
+import dispatch
+from dispatch import CallAfter
+from threading import Thread, Lock
+import os
+import time
 import download_thread as dt
+import pipeline
+import recording_writer
+import bandwidth
+import startup
+from progress import ProgressRegistry
+from check_engine import CheckEngine
+from utilities import LatencyStats, LatencyHistogram
+import utilities as util
+from resolution_cache import ResolutionCache
+from recording_catalog import RecordingCatalog
+from recording_workers import RecordingPool
+from session_pool import SessionPool
+from bandwidth import BandwidthBudget
+from check_history import CheckHistory
+from check_policy import StaticPolicy, AdaptivePolicy
+from domain_queue import IndexedHeap
+from config_store import ConfigStore
 from pubsub import pub
 from datetime import datetime
 from urllib.parse import urlparse
 from enums import ID
 
+# How long the recordings get to close their files on exit, in seconds.
+CLOSE_TIMEOUT = 10
+
 class Scheduler(Thread):
-    def __init__(self, parent, appData: dict, startNow: bool):
-        Thread.__init__(self)
-
-        self.session = streamlink.Streamlink()
-        
-        self.options = Options()
-        # self.options.set("api-header", [("Authorization", appData['twitch_auth'])])
-        
+    ''' The scheduler runs on its own thread, in a loop that owns the queues, the fridge and the download
+    threads. Other threads don't touch them: they send commands (`Start`, `Pause`, `Stop`, `CheckNow`, ...),
+    which the loop runs in order between its ticks. What the UI shows is sent back with `CallAfter`. '''
+
+    def __init__(self, parent, store: ConfigStore, startNow: bool):
+        Thread.__init__(self, name='scheduler', daemon=True)
+
         self.isActive = startNow
         self.wasOnBefore = False
         self.parent = parent
+        self.store = store
+        appData = store.data
         self.appData = appData
 
-        self.threads = []
-        self.scheduler = []
+        self.progress = ProgressRegistry()
+        self.loop = dispatch.MainLoop(self.OnTimer)
         self.sec = 0
+
+        # Indexes, so nothing has to be found by scanning:
+        # domain -> queue, name -> active Download, name -> queued streamer and name -> its queue.
+        # The records on appData['streamers_data'] are indexed by the store.
+        self.scheduler = {}
+        self.threads = {}
+        self.streamers = {}
+        self.queueOf = {}
+
+        # Streamers on the fridge, ordered by the epoch time they leave it.
+        self.fridge = IndexedHeap()
+
         self.dir = appData['download_dir']
+        self.chunk_size = appData.get('chunk_size', dt.DEFAULT_CHUNK_SIZE)
+        self.buffer_size = appData.get('buffer_size', pipeline.DEFAULT_BUFFER_SIZE)
+        self.buffer_policy = appData.get('buffer_policy', pipeline.BLOCK)
+
+        # How the recordings write to disk. See `recording_writer`.
+        self.write_options = {
+            'write_size': appData.get('write_size', recording_writer.DEFAULT_WRITE_SIZE),
+            'sync_bytes': int(appData.get('write_sync_mb', 0) * 1_048_576),
+            'sync_seconds': appData.get('write_sync_seconds', 0),
+        }
+        self.preallocate_seconds = appData.get('write_preallocate', 0)
+
+        self.engine = CheckEngine(appData.get('check_workers', 8), appData.get('checks_per_domain', 2),
+            appData.get('check_timeout', 30))
+
+        # In process mode, the recordings run in this many worker processes instead of this one.
+        processes = appData.get('recording_processes', 0)
+        self.recorders = RecordingPool(processes, session_settings=appData) if processes > 0 else None
+
+        # One streamlink session per domain, shared by its checks and recordings. Made on the first check.
+        self.sessions = SessionPool(appData)
+
+        # The bandwidth the recordings share, weighted by priority, and whether a new one fits in it.
+        self.bandwidth = BandwidthBudget(appData.get('bandwidth_limit', 0), appData.get('bandwidth_domains', {}),
+            appData.get('bandwidth_admission', bandwidth.DOWNGRADE))
+
+        self.resolutions = ResolutionCache(appData.get('resolution_ttl', 60), appData.get('resolution_cache_size', 256))
+
+        # Every recording, indexed. Files it doesn't know yet are found in the background.
+        home = os.path.expanduser('~')
+        self.catalog = RecordingCatalog(appData.get('catalog_path', f'{home}/.streamlink_looper_recordings.db'))
+        Thread(target=self.ReconcileCatalog, name='catalog-reconcile', daemon=True).start()
+
+        # Every check result, and the policy that learns from them how long each streamer waits.
+        self.history = CheckHistory(appData.get('history_path', f'{home}/.streamlink_looper_history.bin'))
+        if appData.get('check_policy', 'adaptive') == 'adaptive':
+            self.policy = AdaptivePolicy(self.history.histograms)
+        else:
+            self.policy = StaticPolicy()
+        self.replanAt = time.monotonic() + (self.policy.replan_interval or 0)
+
+        self.checks = 0
+        self.detections = 0
+
+        # How long resolving (probe) and opening (open) streams take.
+        self.timings = {'probe': LatencyStats(), 'open': LatencyStats()}
+        self.timingsLock = Lock()
+
+        # How long the writes and syncs of the recordings in this process take.
+        self.diskTimings = {'write': LatencyHistogram(), 'sync': LatencyHistogram()}
 
         self.PrepareData()
 
-        pub.subscribe(self.OnTimer, 'ping-timer')
-        pub.subscribe(self.AddToQueue, 'add-to-queue')
-        pub.subscribe(self.RemoveFromQueue, 'remove-from-queue')
+        pub.subscribe(self.OnAddToQueue, 'add-to-queue')
+        pub.subscribe(self.OnRemove, 'remove-from-queue')
         pub.subscribe(self.OnEdit, 'scheduler-edit')
-        pub.subscribe(self.RemoveFromThread, 'remove-from-thread')
-        pub.subscribe(self.UpdateDomainsWaitTime, 'update-domain-wait-time')
+        pub.subscribe(self.OnRemoveFromThread, 'remove-from-thread')
+        pub.subscribe(self.OnDomainsWaitTime, 'update-domain-wait-time')
 
+        startup.mark('scheduler built')
         self.start()
 
     def run(self):
-        ''' Starts this thread's activity. '''
+        ''' The scheduler loop. Runs the commands and, every second, `OnTimer`, until `Shutdown()`. '''
 
         if self.isActive:
             self.ChooseOneFromEachDomain()
             self.wasOnBefore = True
 
+        self.loop.run()
+
+    def Post(self, function, *args, **kwargs):
+        ''' Runs `function(*args, **kwargs)` on the scheduler loop. Safe from any thread. '''
+
+        self.loop.call_after(function, *args, **kwargs)
+
+    def Start(self):
+        ''' Command: starts, or resumes, the checks. '''
+
+        self.Post(self.Restart)
+
+    def Pause(self):
+        ''' Command: stops the checks. The ongoing downloads go on. '''
+
+        self.Post(self.Deactivate)
+
+    def Stop(self):
+        ''' Command: stops the checks and every ongoing download. '''
+
+        self.Post(self.Deactivate, True)
+
+    def CheckNow(self, name: str, unfreeze: bool = False):
+        ''' Command: checks `name` right away. If `unfreeze`, it's taken out of the fridge first. '''
+
+        if unfreeze:
+            self.Post(self.TransferFromFridgeToQueue, name)
+        self.Post(self.CheckOne, name)
+
+    def Edit(self, oldName: str, inData: dict):
+        ''' Command: the streamer `oldName` was edited. '''
+
+        self.Post(self.EditStreamer, oldName, inData)
+
+    def Freeze(self, name: str, until: str):
+        ''' Command: stops the download of `name`, if any, and puts it in the fridge until the date `until`. '''
+
+        self.Post(self.RemoveFromThread, name)
+        self.Post(self.PutInFridge, name, until)
+
+    def Unfreeze(self, name: str):
+        ''' Command: takes `name` out of the fridge. '''
+
+        self.Post(self.TransferFromFridgeToQueue, name)
+
+    def PutBack(self, name: str):
+        ''' Command: stops the download of `name`. It goes back to the queue when the thread ends. '''
+
+        self.Post(self.RemoveFromThread, name)
+
+    def Shutdown(self, timeout: float = 5):
+        ''' Stops the loop and the checks. The downloads are left alone, `Close` stops them. '''
+
+        self.isActive = False
+        self.loop.stop()
+        if self.is_alive():
+            self.join(timeout)
+
+        self.engine.shutdown()
+
+    def Close(self, timeout: float = CLOSE_TIMEOUT) -> list:
+        ''' Called on exit, after `Shutdown`. Stops the recordings, gives them `timeout` seconds in all to close
+        their files, stops the recording workers and closes the catalog and the history.
+        Returns the names of the recordings that didn't stop in time. '''
+
+        threads = list(self.threads.values())
+        for t in threads:
+            t.isActive = False
+
+        deadline = time.monotonic() + timeout
+        for t in threads:
+            t.join(max(deadline - time.monotonic(), 0))
+
+        if self.recorders:
+            self.recorders.shutdown()
+
+        self.history.close()
+        self.catalog.close()
+
+        return [t.name for t in threads if t.is_alive()]
+
     def Restart(self):
-        """ Starts the thread and check if it's the first time it being turned on to choose streams from each domain. """
+        """ Starts the checks, and checks one streamer of each domain if it's the first time they are started. """
 
         self.isActive = True
         if not self.wasOnBefore:
             self.ChooseOneFromEachDomain()
+            self.wasOnBefore = True
+
+    def Deactivate(self, stopDownloads: bool = False):
+        ''' Stops the checks. If `stopDownloads`, every download thread is stopped too. '''
+
+        self.isActive = False
+        if stopDownloads:
+            for t in self.threads.values():
+                t.isActive = False
 
     def ChooseOneFromEachDomain(self):
         """ Choose one streamer to be checked from each domain. """
 
         if self.isActive:
-            for queue in self.scheduler:
-                self.ChooseOne(queue['domain'])
+            for domain in list(self.scheduler):
+                self.ChooseOne(domain)
 
     def PrepareData(self):
         ''' Prepares the data for the scheduler. Everybody gets their wait time. 
-        The closest the wait_time reaches or surpasses the limit `(wait_time * 3 * priority)`, the streamer
-        becomes more prioritized to be checked for availability. When the streamer gets checked,
-        their wait_time is set to zero.
+        The closest the time waited since the last check reaches or surpasses the limit given by `self.policy`
+        (`wait_time * 3 * priority`, stretched by the adaptive policy at the hours the streamer is rarely live),
+        the streamer becomes more prioritized to be checked for availability. Each domain keeps its streamers
+        in a heap ordered by `checked_at + limit`, so the most overdue one is always on top.
         '''
     
         for domain, wait_time in self.appData['domains'].items():
-            dic = {}
-            dic['domain'] = domain
-            dic['wait_time'] = wait_time
-            dic['queue_waited'] = 0
-                        
-            streamers = []
-            for s in self.appData['streamers_data']:
-                if urlparse(s['url']).netloc == domain:
-                    s_dic = {}
-                    s_dic = s
-                    s_dic['waited'] = 0
-                    streamers.append(s_dic)
-
-            dic['streamers'] = streamers
-            self.scheduler.append(dic)
+            self.CreateQueue(domain, wait_time)
+
+        for s in self.store.streamers():
+            domain = urlparse(s['url']).netloc
+            if domain in self.scheduler:
+                self.AddToQueue(s, domain)
+
+    def CreateQueue(self, domain: str, wait_time: int) -> dict:
+        ''' Creates the queue for `domain`. Its streamers are kept by name. '''
+
+        dic = {}
+        dic['domain'] = domain
+        dic['wait_time'] = wait_time
+        dic['queue_waited'] = 0
+        dic['heap'] = IndexedHeap()
+        dic['streamers'] = {}
+
+        self.scheduler[domain] = dic
+        return dic
+
+    def NextCheck(self, queue: dict, streamer: dict) -> float:
+        ''' Returns the monotonic time when `streamer` reaches its waiting limit. '''
+
+        return streamer['checked_at'] + self.policy.interval(streamer, queue['wait_time'], time.time())
 
     def ChooseOne(self, domain: str):
         ''' Chooses one stream from `domain` queue to be checked. '''
 
-        if not self.scheduler:
+        queue = self.scheduler.get(domain)
+        if queue is None:
             return
-        
-        queue_index = 0
-        for queue in self.scheduler:
-            if queue['domain'] == domain:
-                break
-            else:
-                queue_index += 1
-
-        queue = self.scheduler[queue_index]
-        wait_time = queue['wait_time']
-
-        # We check first how the wait is for everybody in the queue.
-        wait_queue = []
-        i = 0
-        for streamer in queue['streamers']:
-            waited = streamer['waited']
-            limit = wait_time * 3 * streamer['priority']
-            wait_queue.append((i, waited - limit))
-            i += 1
-
-        # Now we need the one who waited more.
-        wait_queue.sort(reverse=True, key=lambda x: x[1])
-        
-        chosen = -1
-        # Choosing the one
-        for index in wait_queue:
-            i = index[0]
-            if queue['streamers'][i]['wait_until'] == '':
-                chosen = i
-                break
-
-        if chosen < 0:
+
+        heap = queue['heap']
+        now = time.monotonic()
+
+        # The one who waited more is on top. Streamers put in the fridge since they were
+        # pushed are dropped here, they go back to the heap when they leave the fridge.
+        # With the adaptive policy, the ones with a learned wait that isn't over are stepped
+        # past, and the next one is checked. The chosen one stays out of the heap until its check is done.
+        streamer_dict = None
+        skipped = []
+        while heap:
+            name, due, streamer = heap.pop()
+            if streamer['wait_until'] != '':
+                continue
+
+            if due > now and self.policy.only_when_due(streamer, time.time()):
+                skipped.append((name, due, streamer))
+                continue
+
+            streamer_dict = streamer
+            break
+
+        for name, due, streamer in skipped:
+            heap.push(name, due, streamer)
+
+        if streamer_dict is None:
+            return
+
+        self.engine.submit(domain, streamer_dict, self.ProbeStreamer, self.OnCheckDone)
+
+    def CheckOne(self, name: str):
+        ''' Checks a queued streamer now, out of its turn. Nothing happens if it's being checked already. '''
+
+        queue = self.queueOf.get(name)
+        if queue is None or name not in queue['heap']:
             return
 
-        streamer_dict = queue['streamers'][chosen]
-        is_live = self.CheckStreamer(streamer_dict)
+        streamer = self.streamers[name]
+        queue['heap'].remove(name)
+        self.engine.submit(queue['domain'], streamer, self.ProbeStreamer, self.OnCheckDone)
+
+    def OnCheckDone(self, check):
+        ''' Called from a check engine thread when a check finishes or times out. '''
+
+        self.Post(self.OnCheckResult, check)
+
+    def OnCheckResult(self, check):
+        ''' Handles the result of a check, on the scheduler loop. '''
+
+        startup.mark('first check')
+        streamer_dict = check.data
+        name = streamer_dict['name']
+
+        # The streamer may have been removed or put in the fridge while it was being checked.
+        isQueued = self.GetStreamerByName(name) is streamer_dict and streamer_dict['wait_until'] == ''
+        t = check.result
+        is_live = t is not None
+
+        # A check that timed out or failed says nothing about when the streamer is live.
+        if not check.timed_out and check.error is None:
+            self.history.record(name, time.time(), is_live, check.latency())
+            self.checks += 1
+            if is_live:
+                self.detections += 1
+
+        if t and not isQueued:
+            return
 
-        # We need to be careful. When we removed from the queue, our index
-        # is no longer valid. It should be done last.
         if is_live:
-            name = streamer_dict['name']
+            self.StartDownload(t)
 
-            CallAfter(self.parent.AddStreamer, streamer_dict)
-            CallAfter(self.AddToLog, name, is_live)
+            CallAfter(self.parent.AddStreamer, dict(streamer_dict))
+            self.AddToLog(name, is_live)
             self.RemoveFromQueue(name)
-            
-            CallAfter(pub.sendMessage, topicName='remove-from-tree', name=name, parent_id=ID.TREE_FRIDGE)  
-            CallAfter(pub.sendMessage, topicName='remove-from-tree', name=name, parent_id=ID.TREE_QUEUE)  
+
+            CallAfter(pub.sendMessage, topicName='remove-from-tree', name=name, parent_id=ID.TREE_FRIDGE)
+            CallAfter(pub.sendMessage, topicName='remove-from-tree', name=name, parent_id=ID.TREE_QUEUE)
 
         else:
-            streamer_dict['waited'] = 0
-            CallAfter(self.AddToLog, streamer_dict['name'], is_live)
+            if isQueued:
+                self.PushToHeap(streamer_dict, checked=True)
 
+            self.AddToLog(name, is_live)
 
-    def CheckStreamer(self, streamer: dict) -> bool:
-        ''' Checks if a streamer is online. If so, starts it's download thread. '''
+    def PushToHeap(self, streamer: dict, checked: bool = False):
+        ''' Puts `streamer` back in its domain heap. If it was just `checked`, its wait starts over. '''
 
-        t = dt.Download(self, streamer, self.dir, self.session, self.options)
+        if checked:
+            streamer['checked_at'] = time.monotonic()
 
-        if t.fetch_stream():
-            t.start()
-            self.threads.append(t)
-            return True
-        else:
-            del t
-            return False
+        queue = self.queueOf.get(streamer['name'])
+        if queue is not None:
+            queue['heap'].push(streamer['name'], self.NextCheck(queue, streamer), streamer)
+
+    def ProbeStreamer(self, streamer: dict) -> dt.Download | None:
+        ''' Checks if a streamer is online. If so, returns its download thread, not started yet.
+        The stream itself is only opened when the thread starts. '''
+
+        session = self.sessions.get(urlparse(streamer['url']).netloc)
+        t = dt.Download(self, streamer, self.dir, session, self.sessions.options, self.chunk_size,
+            self.buffer_size, self.buffer_policy)
+
+        if t.probe_stream():
+            return t
+
+        return None
+
+    def StartDownload(self, t: dt.Download):
+        ''' Starts a download thread returned by `ProbeStreamer`. '''
+
+        t.start()
+        self.threads[t.name] = t
+
+    def AddTiming(self, kind: str, seconds: float):
+        ''' Records how long a `probe` or an `open` took. Called from the check and download threads. '''
+
+        with self.timingsLock:
+            self.timings[kind].add(seconds)
+
+    def GetStatistics(self) -> list:
+        ''' Returns the scheduler statistics as a list of lines of text. '''
+
+        lines = [startup.summary()]
+        with self.timingsLock:
+            for kind, stats in self.timings.items():
+                lines.append(f"Stream {kind}: {stats.count} times, {stats.mean():.2f} s on average, {stats.max:.2f} s at most.")
+
+        for kind in self.diskTimings:
+            histogram = self.MergedDiskTimings(kind)
+            if histogram.count():
+                lines.append(f"Disk {kind}s: {histogram.count()} times, {histogram.percentile(0.5) * 1000:.1f} ms or less for half, "
+                    f"{histogram.percentile(0.99) * 1000:.1f} ms or less for 99%, {histogram.max * 1000:.1f} ms at most.")
+
+        cache = self.resolutions.stats()
+        lines.append(f"Resolution cache: {cache['hits']} hits, {cache['misses']} misses, {cache['invalidations']} invalidated, "
+            f"{cache['size']} entries.")
+
+        rate = f"{self.checks / self.detections:.1f} checks per live stream found" if self.detections else 'no live stream found yet'
+        lines.append(f"Checks: {self.checks}, {rate}. Policy: {type(self.policy).__name__}.")
+
+        for domain, (requests, connections, reused) in self.sessions.connection_stats().items():
+            share = f"{reused / requests:.0%}" if requests else '-'
+            lines.append(f"{domain} HTTP: {requests} requests, {connections} new connections (TLS handshakes on https), "
+                f"{share} on a reused connection.")
+
+        if self.recorders:
+            pool = self.recorders.stats()
+            lines.append(f"Recording workers: {pool['workers']} processes, {pool['recordings']} recordings "
+                f"({', '.join(map(str, pool['load']))} each), {pool['messages']} messages received.")
+
+        if self.bandwidth.enabled:
+            budget = self.bandwidth.stats()
+            limit = f"of {budget['limit'] / 1000:.0f} kB/s" if budget['limit'] else 'with per-domain limits only'
+            lines.append(f"Bandwidth: {budget['recordings']} recordings using {budget['rate'] / 1000:.0f} kB/s {limit}. "
+                f"{budget['admitted']} admitted, {budget['downgraded']} downgraded, {budget['refused']} refused, "
+                f"{budget['waited']:.1f} s spent waiting for their share.")
+
+        for name, entry in self.progress.entries.items():
+            buffer = entry.buffer() if entry.buffer else None
+            if buffer:
+                lines.append(f"{name} buffer: {self.FormatSize(buffer['buffered'])} queued, {self.FormatSize(buffer['high_water'])} at most, "
+                    f"{buffer['blocked_time']:.1f} s blocked, {self.FormatSize(buffer['spilled_bytes'])} spilled, "
+                    f"{self.FormatSize(buffer['dropped_bytes'])} dropped in {buffer['dropped_chunks']} chunks.")
+
+        count, size = self.catalog.summary()
+        lines.append(f"Recordings: {count} files, {util.get_downloaded_value(size):.2f} {util.get_unit(size)}.")
+
+        for domain, stats in self.engine.stats().items():
+            count, mean, most = stats['latency']
+            lines.append(f"{domain}: {count} checks, {mean:.2f} s on average until the result ({most:.2f} s at most), "
+                f"{stats['queued'][1]:.2f} s of it waiting. {stats['timeouts']} timed out.")
+
+        return lines
+
+    def FormatSize(self, size: int) -> str:
+        return f"{util.get_downloaded_value(size):.2f} {util.get_unit(size)}"
+
+    def MergedDiskTimings(self, kind: str) -> LatencyHistogram:
+        ''' Returns the disk timings of `kind` of this process and, in process mode, of the workers. '''
+
+        histogram = LatencyHistogram()
+        histogram.merge(*self.diskTimings[kind].snapshot())
+        if self.recorders:
+            histogram.merge(*self.recorders.latencies[kind].snapshot())
+
+        return histogram
+
+    def ReconcileCatalog(self):
+        ''' Brings the recording catalog in line with the download folder. '''
+
+        if os.path.isdir(self.dir):
+            self.catalog.reconcile(self.dir)
 
     def GetStreamerByName(self, name: str) -> dict | None:
-        """ Returns a streamer dictionary. """
+        """ Returns a queued streamer dictionary. """
 
-        for queue in self.scheduler:
-            for streamer in queue['streamers']:
-                if streamer['name'] == name:
-                    return streamer
+        return self.streamers.get(name)
 
     def RemoveFromThread(self, name: str) -> bool:
         ''' `pubsub('remove-from-thread')` -> Removes the thread named with corresponding `name` from the self.threads. '''
 
-        for i in range (0, len(self.threads)):
-            if self.threads[i].name == name:
-                self.threads[i].isActive = False
-                del self.threads[i]
-                return True
+        t = self.threads.pop(name, None)
+        if t is None:
+            return False
 
-        return False
+        t.isActive = False
+        return True
 
     def RemoveFromQueue(self, name: str):
         ''' Removes a stream from the queue. '''
 
-        for queue in self.scheduler:
-            for i in range (0, len(queue['streamers'])):
-                if queue['streamers'][i]['name'] == name:
-                    del queue['streamers'][i]
-                    return
+        if self.streamers.pop(name, None) is None:
+            return
+
+        queue = self.queueOf.pop(name)
+        del queue['streamers'][name]
+        queue['heap'].remove(name)
+        self.fridge.remove(name)
+
+    def OnRemove(self, name: str):
+        ''' pubsub('remove-from-queue') -> The streamer was deleted in the settings menu. '''
+
+        self.Post(self.RemoveFromQueue, name)
+
+    def OnRemoveFromThread(self, name: str):
+        ''' pubsub('remove-from-thread') -> The streamer was deleted in the settings menu, or its download ended. '''
+
+        self.Post(self.RemoveFromThread, name)
+
+    def OnAddToQueue(self, streamer: dict, queue_domain: str):
+        ''' pubsub('add-to-queue') -> A streamer was added in the settings menu. '''
+
+        self.Post(self.AddToQueue, streamer, queue_domain)
+
+    def OnEdit(self, oldName: str, inData: dict):
+        ''' pubsub('scheduler-edit') -> A streamer has been edited through the settings menu. '''
+
+        self.Edit(oldName, inData)
+
+    def OnDomainsWaitTime(self):
+        ''' pubsub('update-domain-wait-time') -> The wait time of the domains changed in the settings menu. '''
+
+        self.Post(self.UpdateDomainsWaitTime)
 
     def AddToQueue(self, streamer: dict, queue_domain: str):
         ''' Adds a stream to the queue. '''
 
-        found = False
-        for dic in self.scheduler:
-            if dic['domain'] == queue_domain:
-                found = True
-
         # If the domain for this streamer does not exists yet, we create it.
-        if not found:
-            dic = {}
-            dic['domain'] = queue_domain
-            dic['wait_time'] = 30
-            dic['queue_waited'] = 0
-            dic['streamers'] = []
-            self.scheduler.append(dic)
-
-        for queue in self.scheduler:
-            if queue['domain'] == queue_domain:
-                streamer['waited'] = 0
-                queue['streamers'].append(streamer)
+        queue = self.scheduler.get(queue_domain)
+        if queue is None:
+            queue = self.CreateQueue(queue_domain, 30)
+
+        # The queue works on the stored record, so edits and the fridge reach both at once.
+        name = streamer['name']
+        streamer = self.store.record(name) or streamer
+
+        # When only the streamers that are due get checked, a new one is due right away.
+        # The key may be new, and the record is shared with the store, so the store can't be saving it meanwhile.
+        checked_at = time.monotonic()
+        if self.policy.only_when_due(streamer, time.time()):
+            checked_at -= self.policy.interval(streamer, queue['wait_time'], time.time())
+        with self.store.lock:
+            streamer['checked_at'] = checked_at
+
+        queue['streamers'][name] = streamer
+        self.streamers[name] = streamer
+        self.queueOf[name] = queue
+
+        if streamer['wait_until'] == '':
+            queue['heap'].push(name, self.NextCheck(queue, streamer), streamer)
+        else:
+            self.AddToFridge(streamer)
+
+    def AddToFridge(self, streamer: dict):
+        ''' Puts a queued streamer with a `wait_until` in the fridge heap. The date is parsed only here. '''
+
+        until = datetime.strptime(streamer['wait_until'], "%Y-%m-%d %H:%M:%S").timestamp()
+        self.fridge.push(streamer['name'], until, streamer)
+
+    def PutInFridge(self, name: str, until: str):
+        ''' Called when the user puts a streamer in the fridge until the date `until`. If the streamer is being
+        downloaded, it isn't queued yet. It goes in the fridge when the download ends and it's queued again. '''
+
+        streamer = self.GetStreamerByName(name)
+        if streamer:
+            streamer['wait_until'] = until
+            self.AddToFridge(streamer)
 
     def OnTimer(self):
-        """ Gets called every second. """
+        """ Gets called every second by the scheduler loop. """
 
         if not self.isActive:
             return
-        
-        for queue in self.scheduler:
-            queue['queue_waited'] += 1
 
-            for streamer in queue['streamers']:
-                if streamer['wait_until'] != '':
-                    now = datetime.now()
-                    until = datetime.strptime(streamer['wait_until'], "%Y-%m-%d %H:%M:%S")
+        # Only the streamers whose time on the fridge is over are touched.
+        now = time.time()
+        while self.fridge and self.fridge.peek()[1] <= now:
+            name, _, streamer = self.fridge.pop()
+            self.store.set_wait_until(name, '')
+            streamer['wait_until'] = ''
+            self.PushToHeap(streamer)
 
-                    if now >= until:
-                        streamer['wait_until'] = ''
-                        pub.sendMessage('update-wait-until', name=streamer['wait_until'], date_time=None)
+        # The adaptive waits change with the hour and the history, so the heaps are reordered now and then.
+        if self.policy.replan_interval and time.monotonic() >= self.replanAt:
+            self.replanAt = time.monotonic() + self.policy.replan_interval
+            self.Replan()
 
-                else:
-                    streamer['waited'] += 1
+        for queue in self.scheduler.values():
+            queue['queue_waited'] += 1
 
-        for queue in self.scheduler:
+        for queue in list(self.scheduler.values()):
             if queue['queue_waited'] == queue['wait_time']:
                 queue['queue_waited'] = 0
                 self.ChooseOne(queue['domain'])
@@ -236,40 +593,67 @@ class Scheduler(Thread):
 
         now = datetime.now()
         time = now.strftime("%H:%M:%S")
-        pub.sendMessage('log', streamer=name, time=time, status=status)
+        CallAfter(pub.sendMessage, topicName='log', streamer=name, time=time, status=status)
 
-    def OnEdit(self, oldName: str, inData: dict):
-        ''' pubsub('scheduler-edit) -> A streamer has been edit though the setings menu. 
-        If this stremaer thread is active, the changes will remain unchanged there. '''
+    def EditStreamer(self, oldName: str, inData: dict):
+        ''' A streamer has been edited through the settings menu.
+        If this streamer thread is active, the changes will remain unchanged there. '''
 
-        for queue in self.scheduler:
-            for streamer in queue['streamers']:
-                if streamer['name'] == oldName:
-                    streamer['name'] = inData['name']
-                    streamer['url'] = inData['url']
-                    streamer['priority'] = inData['priority']
-                    streamer['quality'] = inData['quality']
+        newName = inData['name']
 
-                    CallAfter(pub.sendMessage, topicName='edit-in-tree', oldName=oldName, newName=inData['name'])  
-                    return
+        # What was learned about the streamer goes with them, even if they're being recorded now.
+        if oldName != newName:
+            self.history.rename(oldName, newName)
+            self.policy.rename(oldName, newName)
+
+        streamer = self.streamers.get(oldName)
+        if streamer is None:
+            return
+
+        queue = self.queueOf[oldName]
+        streamer['name'] = newName
+        streamer['url'] = inData['url']
+        streamer['priority'] = inData['priority']
+        streamer['quality'] = inData['quality']
+
+        # A new URL may belong to another domain, and so to another queue.
+        domain = urlparse(inData['url']).netloc
+        if oldName != newName or domain != queue['domain']:
+            checked_at = streamer['checked_at']
+            self.RemoveFromQueue(oldName)
+            self.AddToQueue(streamer, domain)
+
+            streamer['checked_at'] = checked_at
+            if streamer['wait_until'] == '':
+                self.PushToHeap(streamer)
+
+        elif streamer['wait_until'] == '' and oldName in queue['heap']:
+            queue['heap'].update(newName, self.NextCheck(queue, streamer))
+
+        CallAfter(pub.sendMessage, topicName='edit-in-tree', oldName=oldName, newName=newName)
 
     def TransferFromFridgeToQueue(self, name: str):
         """ Gives a empty string value to the 'wait_until' key on the queue and the file. """
 
-        for queue in self.scheduler:
-            for streamer in queue['streamers']:
-                if streamer['name'] == name:
-                    streamer['wait_until'] = ''
+        self.store.set_wait_until(name, '')
+
+        streamer = self.streamers.get(name)
+        if streamer is not None:
+            streamer['wait_until'] = ''
+            self.fridge.remove(name)
+            self.PushToHeap(streamer)
+
+    def Replan(self):
+        ''' Recomputes when every queued streamer is due, with the policy as it is now. '''
 
-        for i in range(0, len(self.appData['streamers_data'])):
-            if self.appData['streamers_data'][i]['name'] == name:
-                self.appData['streamers_data'][i]['wait_until'] = ''
-                pub.sendMessage('save-file')
+        for queue in self.scheduler.values():
+            queue['heap'].rebuild(lambda name, streamer, queue=queue: self.NextCheck(queue, streamer))
 
     def UpdateDomainsWaitTime(self):
         """ Updates the wait time for domains. """
 
-        for domain, wait in self.appData['domains'].items():
-            for queue in self.scheduler:
-                if queue['domain'] == domain:
-                    queue['wait_time'] = wait
\ No newline at end of file
+        for domain, wait in self.store.get('domains').items():
+            queue = self.scheduler.get(domain)
+            if queue is not None and queue['wait_time'] != wait:
+                queue['wait_time'] = wait
+                queue['heap'].rebuild(lambda name, streamer: self.NextCheck(queue, streamer))
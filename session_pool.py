@@ -0,0 +1,111 @@
+'''
+One streamlink session per domain. The probes and the recordings of a domain share its session
+and, through it, a pool of open connections to that domain, so a new check doesn't pay for a
+new TLS handshake. A session is created the first time its domain is used, which is also when
+streamlink gets imported.
+
+The settings, with their defaults:
+
+    http_pool_size   10     connections kept open per host
+    http_keep_alive  true   false sends `Connection: close` and every request opens a connection
+    http_retries     3      retries of a failed connection or a 429/5xx response
+    http_backoff     0.5    the retries wait 0.5, 1, 2... seconds
+    http_domains     {}     per-domain overrides, e.g. {"twitch.tv": {"http_pool_size": 20}}
+
+Sessions are safe to share between threads: requests and its connection pools are.
+'''
+
+from threading import Lock
+import startup
+
+DEFAULTS = {
+    'http_pool_size': 10,
+    'http_keep_alive': True,
+    'http_retries': 3,
+    'http_backoff': 0.5,
+}
+
+class ConnectionStats():
+    ''' Requests made and connections opened on a domain. Updated from any thread. '''
+
+    def __init__(self):
+        self.lock = Lock()
+        self.requests = 0
+        self.connections = 0
+
+    def request(self):
+        with self.lock:
+            self.requests += 1
+
+    def connect(self):
+        with self.lock:
+            self.connections += 1
+
+    def reused(self) -> int:
+        ''' How many requests got a connection that was already open. '''
+
+        with self.lock:
+            return max(self.requests - self.connections, 0)
+
+class SessionPool():
+    def __init__(self, settings: dict = None):
+        ''' `settings` has the keys of `DEFAULTS` and `http_domains`, as in the app settings. Missing ones get the default. '''
+
+        settings = settings or {}
+        self.defaults = {key: settings.get(key, value) for key, value in DEFAULTS.items()}
+        self.overrides = settings.get('http_domains', {})
+
+        self.sessions = {}
+        self.stats = {}
+        self.lock = Lock()
+        self.options = None
+
+    def get(self, domain: str):
+        ''' Returns the session of `domain`, creating it if needed. Safe from any thread. '''
+
+        with self.lock:
+            session = self.sessions.get(domain)
+            if session is None:
+                session = self._create(domain)
+                self.sessions[domain] = session
+
+        return session
+
+    def settings(self, domain: str) -> dict:
+        ''' Returns the settings used for `domain`. '''
+
+        return {**self.defaults, **self.overrides.get(domain, {})}
+
+    def connection_stats(self) -> dict:
+        ''' Returns `domain -> (requests, new connections, reused connections)`. '''
+
+        with self.lock:
+            stats = dict(self.stats)
+
+        return {domain: (s.requests, s.connections, s.reused()) for domain, s in stats.items()}
+
+    def _create(self, domain: str):
+        ''' Creates the session of `domain`. Must be called with `self.lock` held. '''
+
+        import streamlink
+        from streamlink.options import Options
+        from http_adapter import setup_adapter
+
+        if self.options is None:
+            self.options = Options()
+            # self.options.set("api-header", [("Authorization", appData['twitch_auth'])])
+
+        settings = self.settings(domain)
+        stats = ConnectionStats()
+        session = streamlink.Streamlink()
+        # Streamlink's own adapters are kept, so their TLS and connection settings carry over.
+        for prefix in ('https://', 'http://'):
+            setup_adapter(session.http.adapters[prefix], stats, settings['http_pool_size'], settings['http_retries'],
+                settings['http_backoff'], settings['http_keep_alive'])
+        if not settings['http_keep_alive']:
+            session.http.headers['Connection'] = 'close'
+
+        self.stats[domain] = stats
+        startup.mark('session ready')
+
+        return session
@@ -7,14 +7,16 @@ from urllib.parse import urlparse
 import webbrowser
 from enums import ID
 import tooltips
+from config_store import ConfigStore
 
 class Settings(wx.Dialog):
-    def __init__(self, parent, appData: list):
+    def __init__(self, parent, store: ConfigStore):
         super().__init__(parent)
 
         self.SetTitle('Settings')
         self.parent = parent
-        self.appData = appData
+        self.store = store
+        self.appData = store.data
         self.domains_dict  = {}
         self.isDomainModified = False
 
@@ -50,7 +52,8 @@ class Settings(wx.Dialog):
             self.listBox.SetSelection(0)
             self.OnListBox(None)
 
-            self.domains_dict = self.appData['domains']
+            # A copy: the config writer may be serializing `appData` from its own thread.
+            self.domains_dict = dict(self.appData['domains'])
             self.UpdateDomainComboBox()
         
         self.startCheckBox.SetValue(self.appData['start_on_scheduler'])
@@ -314,10 +317,9 @@ class Settings(wx.Dialog):
         if res == wx.ID_YES:
             self.listBox.Delete(index)
             self.DeleteDomainsDict(url)
-            del self.appData['streamers_data'][index]
+            self.store.remove_streamer(name)
             self.UpdateDomainComboBox()
 
-            pub.sendMessage('save-file')
             pub.sendMessage('remove-from-thread', name=name)
             pub.sendMessage('remove-from-queue', name=name)
             wx.CallAfter(pub.sendMessage, topicName='remove-from-tree', name=name, parent_id=ID.TREE_ALL)
@@ -331,21 +333,19 @@ class Settings(wx.Dialog):
 
         data = self.GetFieldsData()
 
-        for streamer in self.appData['streamers_data']:
-            if streamer['name'] == data['name']:
-                wx.MessageBox('A streamer with this name already exists. Please, choose another one.', 
-                'Streamer already exists', wx.ICON_ERROR)
-                return
+        if self.store.record(data['name']) is not None:
+            wx.MessageBox('A streamer with this name already exists. Please, choose another one.', 
+            'Streamer already exists', wx.ICON_ERROR)
+            return
         
         data['wait_until'] = ''
-        self.appData['streamers_data'].append(data)
+        self.store.add_streamer(data)
         domain = urlparse(data['url']).netloc
         
         wx.CallAfter(pub.sendMessage, topicName='add-to-tree', name=data['name'], parent_id=ID.TREE_QUEUE)
         self.AddToDomainsDict(data)
         self.UpdateDomainComboBox()
         
-        pub.sendMessage('save-file')
         pub.sendMessage('add-to-queue', streamer=data, queue_domain=domain)
         self.listBox.Append(data['name'])
 
@@ -363,25 +363,20 @@ class Settings(wx.Dialog):
             return
 
         oldName = self.listBox.GetString(index)
-        # If the user is editing without changing the name, we need a exception for cheking
-        # that. Hence, i != index.
-        found = -1
-        for i in range (0, len(self.appData['streamers_data'])):
-            if self.appData['streamers_data'][i]['name'] == data['name']:
-                found = i
-
-                if i != index:
-                    wx.MessageBox('A streamer with this name already exists. Please, choose another one.', 
-                    'Streamer already exists', wx.ICON_ERROR)
-                    return
+        # If the user is editing without changing the name, the name is already taken by this same streamer.
+        if data['name'] != oldName and self.store.record(data['name']) is not None:
+            wx.MessageBox('A streamer with this name already exists. Please, choose another one.', 
+            'Streamer already exists', wx.ICON_ERROR)
+            return
         
-        data['wait_until'] = self.appData['streamers_data'][found]['wait_until']
+        current = self.store.record(oldName)
+        data['wait_until'] = current['wait_until']
 
-        oldUrl = self.appData['streamers_data'][found]['url']
+        oldUrl = current['url']
         newUrl = data['url']
         self.EditDomainsDict(oldUrl, newUrl)
 
-        self.EditStreamerOnFile(index, oldName, data)
+        self.EditStreamerOnFile(oldName, data)
         self.UpdateDomainComboBox()
         self.listBox.SetString(index, data['name'])
 
@@ -390,17 +385,11 @@ class Settings(wx.Dialog):
 
         wx.MessageBox(f"{data['name']} was successfully saved.", 'Success', wx.ICON_INFORMATION)
 
-    def EditStreamerOnFile(self, index: int, oldName: str, inData: dict):
-        ''' Edit the stream in the given index with inData. '''
+    def EditStreamerOnFile(self, oldName: str, inData: dict):
+        ''' Edit the streamer `oldName` with inData. '''
 
-        self.appData['streamers_data'][index]['url'] = inData['url']
-        self.appData['streamers_data'][index]['name'] = inData['name']
-        self.appData['streamers_data'][index]['quality'] = inData['quality']
-        self.appData['streamers_data'][index]['priority'] = inData['priority']
-        self.appData['streamers_data'][index]['wait_until'] = inData['wait_until']
-        
-        pub.sendMessage('save-file')
-        pub.sendMessage('scheduler-edit', oldName=oldName, inData=inData)
+        fields = {key: inData[key] for key in ('url', 'name', 'quality', 'priority', 'wait_until')}
+        self.store.update_streamer(oldName, fields)
 
     def OnChooseDir(self, event):
         """ Called when the user clicks the Choose Dir button. """
@@ -410,8 +399,7 @@ class Settings(wx.Dialog):
         if dialog.ShowModal() == wx.ID_OK:
             user_path = dialog.GetPath()
             self.dirCtrl.SetValue(user_path)
-            self.appData['download_dir'] = user_path
-            pub.sendMessage('save-file')
+            self.store.set('download_dir', user_path)
 
     def OnAuthInfo(self, event):
         ''' Called when the user clicks info the info button about the authentication. '''
@@ -423,32 +411,28 @@ class Settings(wx.Dialog):
 
         obj = event.GetEventObject()
         value = obj.GetValue()
-        self.appData['tray_on_closed'] = value
-        pub.sendMessage('save-file')
+        self.store.set('tray_on_closed', value)
     
     def OnMinimizeTrayCheckBox(self, event):
         """ Called when user clicks on minimize to system tray checkbox. """
 
         obj = event.GetEventObject()
         value = obj.GetValue()
-        self.appData['tray_on_minimized'] = value
-        pub.sendMessage('save-file')
+        self.store.set('tray_on_minimized', value)
 
     def OnStartCheckBox(self, event):
         """ Called when user clicks on start the scheduler when the app is opened checkbox. """
 
         obj = event.GetEventObject()
         value = obj.GetValue()
-        self.appData['start_on_scheduler'] = value
-        pub.sendMessage('save-file')
+        self.store.set('start_on_scheduler', value)
 
     def OnNotificationCheckBox(self, event):
         """ Called when user clicks on the notification checkbox. """
 
         obj = event.GetEventObject()
         value = obj.GetValue()
-        self.appData['send_notifications'] = value
-        pub.sendMessage('save-file')
+        self.store.set('send_notifications', value)
 
     def UpdateDomainComboBox(self):
         """ Updates the domain wx.ComboBox using `self.domains_dict`. """
@@ -492,7 +476,7 @@ class Settings(wx.Dialog):
         domain = urlparse(streamer['url']).netloc
         if domain not in self.domains_dict:
             self.domains_dict[domain] = 30
-            self.appData['domains'] = self.domains_dict
+            self.store.set('domains', self.domains_dict)
 
             return domain
 
@@ -513,12 +497,13 @@ class Settings(wx.Dialog):
         # Dealing with the old domain.
         oldCount = 0
         for streamer in self.appData['streamers_data']:
-            if streamer['url'] == oldUrl:
-                count += 1
+            if urlparse(streamer['url']).netloc == oldDomain:
+                oldCount += 1
 
         # If there are one of this domain in the file, there's no need to keep it.
         if oldCount == 1:
             del self.domains_dict[oldDomain]
+            self.store.set('domains', self.domains_dict)
         
         # Dealing with the new domain.
         if newDomain not in self.domains_dict.keys():
@@ -540,14 +525,14 @@ class Settings(wx.Dialog):
         # was the only one with that domain. So, we need to remove it.
         if count == 1:
             del self.domains_dict[domain]
+            self.store.set('domains', self.domains_dict)
 
     def OnClose(self, event):
         """ Called when the user tries to close the window. """
 
         if self.isDomainModified and len(self.domains_dict) > 0:
-            self.appData['domains'] = self.domains_dict
+            self.store.set('domains', self.domains_dict)
             pub.sendMessage('update-domain-wait-time')
-            pub.sendMessage('save-file')
 
         auth = self.twitchAuthCtrl.GetValue().strip()
         isThereInvalidCh = False
@@ -560,9 +545,7 @@ class Settings(wx.Dialog):
             
             if isThereInvalidCh is False:
                 wx.MessageBox('Twitch authentication sucessfully added. You need to restart the application for changes to take effect.', 'Sucess', wx.ICON_INFORMATION)
-                self.appData['twitch_auth'] = auth
-
-                pub.sendMessage('save-file')
+                self.store.set('twitch_auth', auth)
 
         self.Unbind(wx.EVT_CLOSE)
 
@@ -0,0 +1,53 @@
+'''
+Startup timing. The entry points import this first, so `START` is as close to the start of the
+process as Python code gets. Each phase is marked once, the first time it's reached, with the
+seconds since `START`:
+
+    imports          the modules of the entry point are imported
+    scheduler built  the queues are ready, streamlink isn't imported yet
+    window shown     the main window handled its first events (GUI only)
+    session ready    streamlink is imported and the first domain session created, on the first check
+    first check      the result of the first check arrived
+
+`BUDGET` is how long each phase may take on a warm cache. `benchmarks/startup_report.py`
+measures them over several runs and fails when one is over.
+'''
+
+import time
+from threading import Lock
+
+START = time.perf_counter()
+
+BUDGET = {
+    'imports': 0.5,
+    'scheduler built': 1.0,
+    'window shown': 1.5,
+    'session ready': 3.0,
+    'first check': 5.0,
+}
+
+_phases = {}
+_lock = Lock()
+
+def mark(name: str):
+    ''' Marks that the phase `name` was reached. Only the first time counts. Safe from any thread. '''
+
+    now = time.perf_counter() - START
+    with _lock:
+        _phases.setdefault(name, now)
+
+def phases() -> dict:
+    ''' Returns the phases reached so far, with the seconds since the start, in order. '''
+
+    with _lock:
+        return dict(sorted(_phases.items(), key=lambda item: item[1]))
+
+def summary() -> str:
+    ''' Returns the phases as one line of text. Those over budget are flagged. '''
+
+    parts = []
+    for name, seconds in phases().items():
+        over = ' (over budget)' if seconds > BUDGET.get(name, float('inf')) else ''
+        parts.append(f"{name} {seconds:.2f} s{over}")
+
+    return 'Startup: ' + ', '.join(parts) + '.'
@@ -0,0 +1,175 @@
+'''
+Keeps the configuration in a SQLite database instead of the json file. With the json file,
+any change rewrites every streamer. Here a change is a single row update: a fridge date, one
+preference, one streamer. Its cost doesn't grow with the number of streamers.
+
+The database is used when `~/.streamlink_looper.db` exists. To switch, set "storage": "sqlite"
+in the json file. On the next start it's imported into the database once, and the json file is
+renamed to `.streamlink_looper.json.migrated`.
+
+The database runs in WAL mode, so a write doesn't block readers and is a single append to the log.
+'''
+
+import json
+import sqlite3
+import time
+from threading import Lock
+from utilities import LatencyStats
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS settings (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS domains (
+    domain TEXT PRIMARY KEY,
+    wait_time INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS streamers (
+    name TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    quality TEXT NOT NULL,
+    priority INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS fridge (
+    name TEXT PRIMARY KEY REFERENCES streamers(name) ON UPDATE CASCADE ON DELETE CASCADE,
+    wait_until TEXT NOT NULL
+);
+'''
+
+class StateDatabase():
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = Lock()
+        self.latency = LatencyStats()
+
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('PRAGMA foreign_keys=ON')
+        self.conn.executescript(SCHEMA)
+
+    def load(self) -> dict:
+        ''' Returns the configuration in the same shape as the json file. '''
+
+        with self.lock:
+            data = {key: json.loads(value) for key, value in self.conn.execute('SELECT key, value FROM settings')}
+            data['domains'] = dict(self.conn.execute('SELECT domain, wait_time FROM domains ORDER BY rowid'))
+
+            data['streamers_data'] = []
+            rows = self.conn.execute('SELECT s.name, s.url, s.quality, s.priority, f.wait_until FROM streamers s '
+                'LEFT JOIN fridge f ON f.name = s.name ORDER BY s.rowid')
+            for name, url, quality, priority, wait_until in rows:
+                data['streamers_data'].append({'name': name, 'url': url, 'quality': quality, 'priority': priority,
+                    'wait_until': wait_until or ''})
+
+        return data
+
+    def import_data(self, data: dict):
+        ''' Replaces everything in the database with `data`, the contents of the json file. '''
+
+        with self.lock:
+            self.conn.execute('BEGIN')
+            try:
+                for table in ('fridge', 'streamers', 'domains', 'settings'):
+                    self.conn.execute(f'DELETE FROM {table}')
+
+                for key, value in data.items():
+                    if key not in ('domains', 'streamers_data'):
+                        self.conn.execute('INSERT INTO settings VALUES (?, ?)', (key, json.dumps(value)))
+
+                self.conn.executemany('INSERT INTO domains VALUES (?, ?)', data['domains'].items())
+                for streamer in data['streamers_data']:
+                    self._insert_streamer(streamer)
+
+                self.conn.execute('COMMIT')
+            except:
+                self.conn.execute('ROLLBACK')
+                raise
+
+    def set_setting(self, key: str, value):
+        self._write('INSERT OR REPLACE INTO settings VALUES (?, ?)', (key, json.dumps(value)))
+
+    def set_domains(self, domains: dict):
+        ''' Replaces the domains and their wait times. There are only a handful of them. '''
+
+        start = time.perf_counter()
+        with self.lock:
+            self.conn.execute('BEGIN')
+            try:
+                self.conn.execute('DELETE FROM domains')
+                self.conn.executemany('INSERT INTO domains VALUES (?, ?)', domains.items())
+                self.conn.execute('COMMIT')
+            except:
+                self.conn.execute('ROLLBACK')
+                raise
+
+            self.latency.add(time.perf_counter() - start)
+
+    def add_streamer(self, streamer: dict):
+        start = time.perf_counter()
+        with self.lock:
+            self.conn.execute('BEGIN')
+            try:
+                self._insert_streamer(streamer)
+                self.conn.execute('COMMIT')
+            except:
+                self.conn.execute('ROLLBACK')
+                raise
+
+            self.latency.add(time.perf_counter() - start)
+
+    def update_streamer(self, name: str, streamer: dict):
+        ''' Saves the fields of streamer `name`. If `streamer['name']` is different, it's renamed. '''
+
+        start = time.perf_counter()
+        with self.lock:
+            self.conn.execute('BEGIN')
+            try:
+                self.conn.execute('UPDATE streamers SET name = ?, url = ?, quality = ?, priority = ? WHERE name = ?',
+                    (streamer['name'], streamer['url'], streamer['quality'], streamer['priority'], name))
+                self._set_wait_until(streamer['name'], streamer['wait_until'])
+                self.conn.execute('COMMIT')
+            except:
+                self.conn.execute('ROLLBACK')
+                raise
+
+            self.latency.add(time.perf_counter() - start)
+
+    def remove_streamer(self, name: str):
+        self._write('DELETE FROM streamers WHERE name = ?', (name,))
+
+    def set_wait_until(self, name: str, wait_until: str):
+        start = time.perf_counter()
+        with self.lock:
+            self._set_wait_until(name, wait_until)
+            self.latency.add(time.perf_counter() - start)
+
+    def stats(self) -> dict:
+        ''' Returns the write count and latency (count, mean, max). '''
+
+        with self.lock:
+            return {'writes': self.latency.count, 'latency': (self.latency.count, self.latency.mean(), self.latency.max)}
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+    def _write(self, sql: str, params: tuple):
+        start = time.perf_counter()
+        with self.lock:
+            self.conn.execute(sql, params)
+            self.latency.add(time.perf_counter() - start)
+
+    def _insert_streamer(self, streamer: dict):
+        self.conn.execute('INSERT INTO streamers VALUES (?, ?, ?, ?)',
+            (streamer['name'], streamer['url'], streamer['quality'], streamer['priority']))
+        self._set_wait_until(streamer['name'], streamer['wait_until'])
+
+    def _set_wait_until(self, name: str, wait_until: str):
+        ''' The fridge only has the streamers that are in it. Must be called with `self.lock` held. '''
+
+        if wait_until:
+            self.conn.execute('INSERT OR REPLACE INTO fridge VALUES (?, ?)', (name, wait_until))
+        else:
+            self.conn.execute('DELETE FROM fridge WHERE name = ?', (name,))
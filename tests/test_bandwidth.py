@@ -0,0 +1,107 @@
+import time
+from threading import Thread
+import pytest
+import bandwidth
+from bandwidth import BandwidthBudget, TokenBucket, Account, HEADROOM
+
+def test_typical_rate():
+    assert bandwidth.height('720p60') == 720
+    assert bandwidth.height('audio_only') is None
+    assert bandwidth.typical_rate('720p60') == bandwidth.TYPICAL_RATES[720]
+    assert bandwidth.typical_rate('900p') == bandwidth.TYPICAL_RATES[1080]
+    assert bandwidth.typical_rate('best') == bandwidth.UNKNOWN_RATE
+
+def test_no_budget():
+    budget = BandwidthBudget()
+    assert not budget.enabled
+    quality, account = budget.admit('a', 'twitch.tv', 1, [('1080p', 10**9)])
+    assert quality == '1080p'
+    assert budget.grant(account) == 0
+
+def test_downgrade_and_refuse():
+    budget = BandwidthBudget(1000)
+    assert budget.admit('a', 'twitch.tv', 1, [('1080p', 800)])[0] == '1080p'
+    assert budget.admit('b', 'twitch.tv', 1, [('1080p', 800), ('480p', 150)])[0] == '480p'
+    assert budget.admit('c', 'twitch.tv', 1, [('720p', 450)]) == (None, None)
+
+    stats = budget.stats()
+    assert (stats['admitted'], stats['downgraded'], stats['refused'], stats['recordings']) == (1, 1, 1, 2)
+
+def test_refuse_doesnt_downgrade():
+    budget = BandwidthBudget(1000, policy=bandwidth.REFUSE)
+    budget.admit('a', 'twitch.tv', 1, [('1080p', 800)])
+    assert budget.admit('b', 'twitch.tv', 1, [('1080p', 800), ('480p', 150)]) == (None, None)
+
+def test_off_admits_everything():
+    budget = BandwidthBudget(1000, policy=bandwidth.OFF)
+    budget.admit('a', 'twitch.tv', 1, [('1080p', 800)])
+    assert budget.admit('b', 'twitch.tv', 1, [('1080p', 800)])[0] == '1080p'
+
+def test_lower_priorities_give_way():
+    budget = BandwidthBudget(1000)
+    budget.admit('low', 'twitch.tv', 5, [('1080p', 800)])
+    assert budget.admit('high', 'twitch.tv', 1, [('1080p', 800)])[0] == '1080p'
+    assert budget.admit('low2', 'twitch.tv', 5, [('1080p', 800)]) == (None, None)
+
+def test_domain_limit_and_release():
+    budget = BandwidthBudget(domains={'twitch.tv': 1000})
+    _, account = budget.admit('a', 'twitch.tv', 1, [('1080p', 800)])
+    assert budget.admit('b', 'youtube.com', 1, [('1080p', 800)])[0] == '1080p'
+    assert budget.admit('c', 'twitch.tv', 1, [('1080p', 800)]) == (None, None)
+
+    budget.release(account)
+    assert budget.admit('c', 'twitch.tv', 1, [('1080p', 800)])[0] == '1080p'
+
+def test_grant_splits_by_weight():
+    budget = BandwidthBudget(1000, policy=bandwidth.OFF)
+    _, high = budget.admit('high', 'twitch.tv', 1, [('1080p', 2000)])
+    _, low = budget.admit('low', 'twitch.tv', 4, [('1080p', 2000)])
+
+    assert budget.grant(high) == pytest.approx(800)
+    assert budget.grant(low) == pytest.approx(200)
+
+def test_grant_gives_what_small_recordings_dont_use():
+    budget = BandwidthBudget(1000, policy=bandwidth.OFF)
+    _, small = budget.admit('small', 'twitch.tv', 1, [('480p', 100)])
+    _, big = budget.admit('big', 'twitch.tv', 1, [('1080p', 2000)])
+
+    assert budget.grant(small) == pytest.approx(100 * HEADROOM)
+    assert budget.grant(big) == pytest.approx(1000 - 100 * HEADROOM)
+
+def test_grant_is_the_smallest_share():
+    budget = BandwidthBudget(1000, {'twitch.tv': 300}, policy=bandwidth.OFF)
+    _, a = budget.admit('a', 'twitch.tv', 1, [('1080p', 2000)])
+    _, b = budget.admit('b', 'youtube.com', 1, [('1080p', 2000)])
+
+    assert budget.grant(a) == pytest.approx(300)
+    assert budget.grant(b) == pytest.approx(500)
+
+def test_bucket_holds_the_rate():
+    bucket = TokenBucket(1_000_000)
+    account = Account('a', 'twitch.tv', 1, 0)
+
+    start = time.monotonic()
+    for _ in range(4):
+        bucket.take(account, 500_000)
+
+    # The first second is in the full bucket, the rest comes at the rate.
+    assert time.monotonic() - start == pytest.approx(1.0, abs=0.25)
+
+def test_bucket_shares_by_weight():
+    bucket = TokenBucket(2_000_000, 20_000)
+    accounts = [Account('high', 'twitch.tv', 1, 0), Account('low', 'twitch.tv', 4, 0)]
+    taken = {'high': 0, 'low': 0}
+    deadline = time.monotonic() + 0.5
+
+    def read(account):
+        while time.monotonic() < deadline:
+            bucket.take(account, 10_000)
+            taken[account.name] += 10_000
+
+    threads = [Thread(target=read, args=(account,)) for account in accounts]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert 2.5 < taken['high'] / taken['low'] < 6
@@ -0,0 +1,88 @@
+import time
+import pytest
+from queue import Queue
+from threading import Event
+from check_engine import CheckEngine
+
+@pytest.fixture
+def engine():
+    engines = []
+    def make(**kwargs) -> CheckEngine:
+        engine = CheckEngine(**kwargs)
+        engines.append(engine)
+        return engine
+
+    yield make
+    for engine in engines:
+        engine.shutdown()
+
+def test_results_reach_the_callback(engine):
+    checks = Queue()
+    e = engine(max_workers=2)
+    e.submit('a.tv', 2, lambda x: x * 10, checks.put)
+    e.submit('a.tv', 0, lambda x: 1 / x, checks.put)
+
+    results = sorted([checks.get(timeout=5) for _ in range(2)], key=lambda c: c.data)
+    assert results[0].error is not None and results[0].result is None
+    assert results[1].result == 20 and results[1].error is None
+    assert not any(c.timed_out for c in results)
+    assert e.stats()['a.tv']['latency'][0] == 2
+
+def test_timeout_reports_right_away_and_discards_the_late_result(engine):
+    release = Event()
+    checks = Queue()
+    discarded = Queue()
+    e = engine(max_workers=2, timeout=0.2)
+
+    def job(data):
+        release.wait(5)
+        return data
+
+    started = time.monotonic()
+    e.submit('a.tv', 'late', job, checks.put, discarded.put)
+
+    check = checks.get(timeout=5)
+    assert check.timed_out and check.result is None
+    assert 0.15 <= time.monotonic() - started < 2
+    assert e.stats()['a.tv']['timeouts'] == 1
+
+    # The job finishing later doesn't call the callback a second time.
+    release.set()
+    assert discarded.get(timeout=5) == 'late'
+    assert checks.empty()
+
+    # Its slot is freed for the next check.
+    e.submit('a.tv', 'next', lambda x: x, checks.put)
+    assert checks.get(timeout=5).result == 'next'
+    assert e.in_flight('a.tv') == 0
+
+def test_domain_limit(engine):
+    release = Event()
+    checks = Queue()
+    e = engine(max_workers=8, domain_limit=2)
+
+    for i in range(5):
+        e.submit('a.tv', i, lambda x: release.wait(5) and x, checks.put)
+    e.submit('b.tv', 'b', lambda x: x, checks.put)
+
+    # b.tv isn't held back by the checks of a.tv.
+    assert checks.get(timeout=5).result == 'b'
+    assert e.running['a.tv'] == 2 and len(e.pending['a.tv']) == 3
+
+    release.set()
+    assert sorted(checks.get(timeout=5).result for _ in range(5)) == [0, 1, 2, 3, 4]
+
+def test_shutdown_drops_pending_checks(engine):
+    release = Event()
+    checks = Queue()
+    e = engine(max_workers=1, domain_limit=1)
+    e.submit('a.tv', 0, lambda x: release.wait(5) and x, checks.put)
+    e.submit('a.tv', 1, lambda x: x, checks.put)
+
+    e.shutdown()
+    e.submit('a.tv', 2, lambda x: x, checks.put)
+    release.set()
+
+    assert checks.get(timeout=5).data == 0
+    time.sleep(0.1)
+    assert checks.empty()
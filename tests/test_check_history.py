@@ -0,0 +1,126 @@
+import time
+from check_history import CheckHistory, CHECK, hour_of_week
+from check_policy import StaticPolicy, AdaptivePolicy, MIN_SHARE, MIN_CHECKS
+
+# Monday, 10h, local time.
+MONDAY_10 = time.mktime((2026, 1, 5, 10, 0, 0, 0, 0, -1))
+HOUR = 3600
+WEEK = 168 * HOUR
+
+def streamer(name: str) -> dict:
+    return {'name': name, 'priority': 2}
+
+def test_hour_of_week():
+    assert hour_of_week(MONDAY_10) == 10
+    assert hour_of_week(MONDAY_10 + 24 * HOUR + 5 * HOUR) == 39
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / 'history.bin')
+    history = CheckHistory(path)
+    history.record('a', MONDAY_10, True, 0.5)
+    history.record('b', MONDAY_10 + HOUR, False, 0.25)
+    history.record('a', MONDAY_10 + WEEK, True, 0.125)
+    history.close()
+
+    reopened = CheckHistory(path)
+    assert list(reopened.records()) == [('a', MONDAY_10, True, 0.5), ('b', MONDAY_10 + HOUR, False, 0.25),
+        ('a', MONDAY_10 + WEEK, True, 0.125)]
+    assert (reopened.histogram('a').checks[10], reopened.histogram('a').online[10]) == (2, 2)
+    assert (reopened.histogram('b').checks[11], reopened.histogram('b').online[11]) == (1, 0)
+    assert reopened.histogram('c') is None
+
+    # Names already in the file aren't written again.
+    reopened.record('b', MONDAY_10, True, 0)
+    reopened.close()
+    assert [name for name, *_ in CheckHistory(path, read_only=True).records()] == ['a', 'b', 'a', 'b']
+
+def test_half_written_record_is_dropped(tmp_path):
+    path = tmp_path / 'history.bin'
+    history = CheckHistory(str(path))
+    history.record('a', MONDAY_10, True, 0)
+    history.close()
+
+    complete = path.stat().st_size
+    with open(path, 'ab') as f:
+        f.write(CHECK.pack(b'C', 0, MONDAY_10, 1, 0)[:7])
+
+    # Read only, the file is left as it is.
+    assert len(list(CheckHistory(str(path), read_only=True).records())) == 1
+    assert path.stat().st_size == complete + 7
+
+    history = CheckHistory(str(path))
+    assert path.stat().st_size == complete
+    history.record('a', MONDAY_10 + HOUR, False, 0)
+    history.close()
+    assert len(list(CheckHistory(str(path)).records())) == 2
+
+def test_read_only_doesnt_create_the_file(tmp_path):
+    path = tmp_path / 'history.bin'
+    history = CheckHistory(str(path), read_only=True)
+    history.close()
+    assert not path.exists()
+
+def learned_history(tmp_path) -> CheckHistory:
+    ''' 'a' is always live on Monday at 10h and never on Thursday at 10h. '''
+
+    history = CheckHistory(str(tmp_path / 'history.bin'))
+    for week in range(MIN_CHECKS):
+        history.record('a', MONDAY_10 + week * WEEK, True, 0)
+        history.record('a', MONDAY_10 + 3 * 24 * HOUR + week * WEEK, False, 0)
+
+    return history
+
+def test_static_policy():
+    policy = StaticPolicy()
+    assert policy.interval(streamer('a'), 30, MONDAY_10) == 30 * 3 * 2
+    assert not policy.only_when_due(streamer('a'), MONDAY_10)
+    assert policy.replan_interval is None
+
+def test_adaptive_policy_without_history_is_static(tmp_path):
+    policy = AdaptivePolicy(learned_history(tmp_path).histograms)
+
+    assert policy.interval(streamer('b'), 30, MONDAY_10) == 180
+    assert not policy.only_when_due(streamer('b'), MONDAY_10)
+
+    # Too few checks at this hour.
+    assert policy.factor('a', MONDAY_10 + 12 * HOUR) == 1.0
+    assert not policy.learned('a', MONDAY_10 + 12 * HOUR)
+
+def test_adaptive_policy_stretches_unlikely_hours(tmp_path):
+    policy = AdaptivePolicy(learned_history(tmp_path).histograms)
+    thursday_10 = MONDAY_10 + 3 * 24 * HOUR
+
+    assert policy.interval(streamer('a'), 30, MONDAY_10) == 180
+    assert policy.interval(streamer('a'), 30, thursday_10) == 180 / MIN_SHARE
+    assert policy.only_when_due(streamer('a'), thursday_10)
+
+def test_adaptive_policy_sees_new_checks(tmp_path):
+    history = learned_history(tmp_path)
+    policy = AdaptivePolicy(history.histograms)
+    sunday_10 = MONDAY_10 + 6 * 24 * HOUR
+    assert policy.factor('a', sunday_10) == 1.0
+
+    for week in range(MIN_CHECKS):
+        history.record('a', sunday_10 + week * WEEK, False, 0)
+
+    assert policy.factor('a', sunday_10) == 1 / MIN_SHARE
+
+def test_rename_moves_the_history(tmp_path):
+    path = str(tmp_path / 'history.bin')
+    history = CheckHistory(path)
+    history.record('a', MONDAY_10, True, 0)
+    history.record('b', MONDAY_10, False, 0)
+    history.rename('a', 'b')
+    history.record('b', MONDAY_10 + HOUR, True, 0)
+    history.record('a', MONDAY_10, False, 0)
+
+    assert history.histogram('b').online[10] == 1
+    assert history.histogram('b').checks[11] == 1
+    assert history.histogram('a').online[10] == 0
+    history.close()
+
+    reopened = CheckHistory(path)
+    for name in ('a', 'b'):
+        assert list(reopened.histogram(name).checks) == list(history.histogram(name).checks)
+        assert list(reopened.histogram(name).online) == list(history.histogram(name).online)
+    reopened.close()
@@ -0,0 +1,70 @@
+import json
+from config_store import ConfigStore
+
+def streamer(name: str, **fields) -> dict:
+    return {'name': name, 'url': f"https://twitch.tv/{name}", 'quality': 'best', 'priority': 1, 'wait_until': '', **fields}
+
+def make_store(*names):
+    changes = []
+    data = {'download_dir': '/tmp', 'domains': {'twitch.tv': 60}, 'streamers_data': [streamer(name) for name in names]}
+    return ConfigStore(data, lambda: changes.append(1)), changes
+
+def test_get_streamer_returns_a_copy():
+    store, _ = make_store('a')
+    copy = store.get_streamer('a')
+    copy['quality'] = 'worst'
+
+    assert store.record('a')['quality'] == 'best'
+    assert store.get_streamer('missing') is None
+
+def test_add_and_remove():
+    store, changes = make_store('a')
+
+    assert store.add_streamer(streamer('b'))
+    assert not store.add_streamer(streamer('b'))
+    assert [s['name'] for s in store.streamers()] == ['a', 'b']
+
+    assert store.remove_streamer('a')['name'] == 'a'
+    assert store.remove_streamer('a') is None
+    assert [s['name'] for s in store.streamers()] == ['b']
+    assert len(changes) == store.version == 2
+
+def test_update_renames():
+    store, _ = make_store('a', 'b')
+
+    assert store.update_streamer('a', {'name': 'c', 'priority': 3})
+    assert store.record('a') is None
+    assert store.record('c')['priority'] == 3
+    assert store.streamers()[0] is store.record('c')
+
+    assert not store.update_streamer('c', {'name': 'b'})
+    assert not store.update_streamer('missing', {'priority': 2})
+
+def test_set_wait_until_only_changes_once():
+    store, changes = make_store('a')
+
+    store.set_wait_until('a', '2026-01-01 00:00:00')
+    store.set_wait_until('a', '2026-01-01 00:00:00')
+    assert store.record('a')['wait_until'] == '2026-01-01 00:00:00'
+    assert len(changes) == 1
+
+def test_set_and_dumps():
+    store, changes = make_store('a')
+    store.set('download_dir', '/recordings')
+
+    assert store.get('download_dir') == '/recordings'
+    assert store.get('missing', 5) == 5
+    assert len(changes) == 1
+
+    data = json.loads(store.dumps())
+    assert data['download_dir'] == '/recordings'
+    assert data['streamers_data'][0]['name'] == 'a'
+    assert '\n' in store.dumps(indent=4) and '\n' not in store.dumps()
+
+def test_set_copies_dictionaries():
+    store, _ = make_store()
+    domains = {'twitch.tv': 30}
+    store.set('domains', domains)
+    domains['youtube.com'] = 60
+
+    assert store.get('domains') == {'twitch.tv': 30}
@@ -0,0 +1,96 @@
+import json
+import time
+import threading
+import config_writer
+from config_writer import ConfigWriter
+
+def wait_for(condition, timeout: float = 2) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+
+    return True
+
+def test_coalesces_requests_into_one_write(tmp_path):
+    path = tmp_path / 'config.json'
+    data = {'value': 0}
+    writer = ConfigWriter(str(path), lambda: json.dumps(data, indent=4), delay=0.1)
+
+    for i in range(1, 11):
+        data['value'] = i
+        writer.request()
+
+    assert wait_for(lambda: writer.stats()['writes'] == 1)
+    writer.close()
+
+    stats = writer.stats()
+    assert (stats['requests'], stats['writes'], stats['coalesced'], stats['errors']) == (10, 1, 9, 0)
+    assert json.loads(path.read_text()) == {'value': 10}
+    assert not (tmp_path / 'config.json.tmp').exists()
+
+def test_writes_the_snapshot_as_it_is(tmp_path):
+    path = tmp_path / 'config.json'
+    text = json.dumps({'a': [1, 2]}, indent=4)
+    writer = ConfigWriter(str(path), lambda: text, delay=0)
+
+    writer.request()
+    writer.close()
+    assert path.read_text() == text
+
+def test_close_saves_what_is_pending(tmp_path):
+    path = tmp_path / 'config.json'
+    writer = ConfigWriter(str(path), lambda: '{"saved": true}', delay=60)
+
+    writer.request()
+    writer.close()
+    assert json.loads(path.read_text()) == {'saved': True}
+
+def test_snapshot_runs_on_the_writer_thread(tmp_path):
+    threads = []
+    main_calls = []
+
+    def snapshot():
+        threads.append(threading.current_thread())
+        return '{}'
+
+    writer = ConfigWriter(str(tmp_path / 'config.json'), snapshot, main_calls.append, delay=0)
+    writer.request()
+    assert wait_for(lambda: writer.stats()['writes'] == 1)
+    writer.close()
+
+    assert threads == [writer]
+    assert not main_calls
+
+def test_errors_are_logged_through_call_in_main(tmp_path):
+    errors = []
+    main_calls = []
+
+    def call_in_main(function):
+        main_calls.append(function)
+        function()
+
+    writer = ConfigWriter(str(tmp_path / 'missing' / 'config.json'), lambda: '{}', call_in_main, delay=0.01, log=errors.append)
+    writer.request()
+    assert wait_for(lambda: errors)
+    writer.close()
+    assert len(main_calls) == 1
+
+def test_gives_up_after_max_retries_and_logs(tmp_path):
+    errors = []
+    path = tmp_path / 'missing' / 'config.json'
+    writer = ConfigWriter(str(path), lambda: '{}', delay=0.01, log=errors.append)
+
+    writer.request()
+    assert wait_for(lambda: errors)
+    time.sleep(0.1)
+    assert writer.stats()['errors'] == config_writer.MAX_RETRIES
+    assert len(errors) == 1 and str(path) in errors[0]
+
+    # A new request tries again, and a write that works ends the failures.
+    path.parent.mkdir()
+    writer.request()
+    assert wait_for(lambda: writer.stats()['writes'] == 1)
+    writer.close()
+    assert writer.stats()['errors'] == config_writer.MAX_RETRIES
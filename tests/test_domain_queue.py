@@ -0,0 +1,84 @@
+import random
+from domain_queue import IndexedHeap
+
+def pop_all(heap: IndexedHeap) -> list:
+    return [heap.pop() for _ in range(len(heap))]
+
+def check_positions(heap: IndexedHeap):
+    assert len(heap.pos) == len(heap.heap)
+    for name, index in heap.pos.items():
+        assert heap.heap[index][2] == name
+
+def test_pops_in_priority_order():
+    heap = IndexedHeap()
+    for name, priority in (('a', 3), ('b', 1), ('c', 2)):
+        heap.push(name, priority, name.upper())
+
+    assert heap.peek() == ('b', 1, 'B')
+    assert pop_all(heap) == [('b', 1, 'B'), ('c', 2, 'C'), ('a', 3, 'A')]
+    assert heap.peek() is None
+
+def test_ties_keep_insertion_order():
+    heap = IndexedHeap()
+    for name in 'abcd':
+        heap.push(name, 0)
+
+    assert [name for name, _, _ in pop_all(heap)] == list('abcd')
+
+def test_push_existing_updates():
+    heap = IndexedHeap()
+    heap.push('a', 1, 'old')
+    heap.push('b', 2)
+    heap.push('a', 3, 'new')
+
+    assert len(heap) == 2
+    assert heap.get('a') == 'new'
+    assert heap.pop()[0] == 'b'
+
+def test_update_remove_rename():
+    heap = IndexedHeap()
+    for i in range(10):
+        heap.push(f"s{i}", i)
+
+    heap.update('s9', -1)
+    heap.update('s0', 20)
+    assert heap.remove('s5')
+    assert not heap.remove('s5')
+    assert 's5' not in heap
+
+    heap.rename('s1', 'renamed')
+    assert 's1' not in heap and 'renamed' in heap
+    check_positions(heap)
+
+    names = [name for name, _, _ in pop_all(heap)]
+    assert names == ['s9', 'renamed', 's2', 's3', 's4', 's6', 's7', 's8', 's0']
+
+def test_matches_sorting_under_random_changes():
+    rng = random.Random(1)
+    heap = IndexedHeap()
+    priorities = {}
+
+    for _ in range(2000):
+        name = f"s{rng.randrange(200)}"
+        action = rng.random()
+        if action < 0.5:
+            priorities[name] = rng.random()
+            heap.push(name, priorities[name])
+        elif action < 0.8 and name in priorities:
+            priorities[name] = rng.random()
+            heap.update(name, priorities[name])
+        elif name in priorities:
+            del priorities[name]
+            assert heap.remove(name)
+
+    check_positions(heap)
+    assert [(name, priority) for name, priority, _ in pop_all(heap)] == sorted(priorities.items(), key=lambda item: item[1])
+
+def test_rebuild():
+    heap = IndexedHeap()
+    for i in range(20):
+        heap.push(f"s{i}", i, i)
+
+    heap.rebuild(lambda name, value: -value)
+    check_positions(heap)
+    assert [name for name, _, _ in pop_all(heap)] == [f"s{i}" for i in reversed(range(20))]
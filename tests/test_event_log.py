@@ -0,0 +1,74 @@
+import event_log as el
+from event_log import EventLog, LogEntry
+
+def check(streamer: str, online: bool) -> LogEntry:
+    return LogEntry('00:00:00', streamer, el.CHECK, online, '')
+
+def test_entries_wait_for_flush():
+    log = EventLog(capacity=4)
+    log.add(check('a', True))
+    assert len(log) == 0
+
+    assert log.flush() == 1
+    assert len(log) == 1 and log[0].streamer == 'a'
+    assert log.flush() == 0
+
+def test_ring_buffer_drops_the_oldest():
+    log = EventLog(capacity=4)
+    for i in range(10):
+        log.add(check(str(i), True))
+    log.flush()
+
+    assert len(log) == 4
+    assert [log[i].streamer for i in range(len(log))] == ['6', '7', '8', '9']
+
+    for i in range(10, 13):
+        log.add(check(str(i), True))
+        log.flush()
+    assert [log[i].streamer for i in range(len(log))] == ['9', '10', '11', '12']
+
+def test_filters():
+    log = EventLog(capacity=8)
+    log.add(check('Alice', True))
+    log.add(check('bob', False))
+    log.add(LogEntry('00:00:00', 'alice', el.ENDED, False, ''))
+    log.add(LogEntry('00:00:00', 'Config file', el.ERROR, False, ''))
+    log.flush()
+
+    def shown(streamer: str, status: str) -> list:
+        log.set_filter(streamer, status)
+        return [(log[i].streamer, log[i].kind) for i in range(len(log))]
+
+    assert shown(' ALI ', el.ALL) == [('Alice', el.CHECK), ('alice', el.ENDED)]
+    assert shown('', el.ONLINE) == [('Alice', el.CHECK)]
+    assert shown('', el.OFFLINE) == [('bob', el.CHECK)]
+    assert shown('', el.ERROR) == [('Config file', el.ERROR)]
+    assert shown('', el.DROP) == []
+
+    # New entries follow the filter in place.
+    log.set_filter('', el.OFFLINE)
+    log.add(check('carol', True))
+    log.add(check('dave', False))
+    log.flush()
+    assert [log[i].streamer for i in range(len(log))] == ['bob', 'dave']
+
+def test_filtered_view_forgets_overwritten_entries():
+    log = EventLog(capacity=4)
+    log.set_filter('a', el.ALL)
+    for i in range(20):
+        log.add(check('a' if i % 2 else 'b', True))
+        log.flush()
+
+        # Only the entries still in the buffer are shown.
+        assert len(log) == len([n for n in range(max(i - 3, 0), i + 1) if n % 2])
+        assert all(log[j].streamer == 'a' for j in range(len(log)))
+
+    assert len(log.view) <= 2 * len(log) + 2
+
+def test_clear():
+    log = EventLog(capacity=4)
+    log.add(check('a', True))
+    log.flush()
+    log.clear()
+
+    assert len(log) == 0 and log.total == 0
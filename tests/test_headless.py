@@ -0,0 +1,73 @@
+import json
+import signal
+import logging
+import pytest
+import dispatch
+from headless import Headless
+
+@pytest.fixture
+def headless(tmp_path, monkeypatch):
+    ''' Builds a Headless app whose home, and so every file it keeps, is `tmp_path`. '''
+
+    monkeypatch.setenv('HOME', str(tmp_path))
+    monkeypatch.setattr(dispatch, '_call_after', None)
+
+    handlers = {}
+    monkeypatch.setattr(signal, 'signal', lambda signum, handler: handlers.__setitem__(signum, handler))
+
+    app = Headless(str(tmp_path), logging.getLogger('test_headless'))
+    app.handlers = handlers
+    return app
+
+def test_first_run_writes_the_default_config(tmp_path, headless):
+    config = json.loads((tmp_path / '.streamlink_looper.json').read_text())
+    assert config == headless.DefaultConfig()
+    assert (tmp_path / 'Videos' / 'Streamlink Looper').is_dir()
+
+    headless.Shutdown()
+
+def test_signal_stops_and_saves(tmp_path, headless, caplog):
+    headless.store.set('log_scroll_down', False)
+
+    # The signal arrives once the loop is running.
+    headless.loop.call_after(lambda: headless.handlers[signal.SIGTERM](signal.SIGTERM, None))
+    with caplog.at_level(logging.INFO, 'test_headless'):
+        headless.Run()
+
+    assert set(headless.handlers) >= {signal.SIGINT, signal.SIGTERM}
+    messages = [r.getMessage() for r in caplog.records]
+    assert messages[0].startswith('Started. 0 streamers in 0 domains')
+    assert 'SIGTERM received, stopping.' in messages
+    assert messages[-1] == 'Stopped.'
+
+    config = json.loads((tmp_path / '.streamlink_looper.json').read_text())
+    assert config['log_scroll_down'] is False
+
+def test_scheduler_calls_run_on_the_loop(headless):
+    # Calls from other threads go through `dispatch.CallAfter`, which the app points at its loop.
+    ran = []
+    dispatch.CallAfter(ran.append, 1)
+    dispatch.CallAfter(headless.loop.stop)
+    headless.loop.run()
+
+    assert ran == [1]
+    headless.Shutdown()
+
+def test_messages_are_logged(headless, caplog):
+    with caplog.at_level(logging.DEBUG, 'test_headless'):
+        headless.Log('a', '00:00:00', True)
+        headless.LogBufferDrop('a', '00:00:00', 2 * 1024 * 1024)
+        headless.LogBandwidth('a', '00:00:00', '1080p', None)
+        headless.LogBandwidth('a', '00:00:00', '1080p', '720p')
+        headless.LogConfigError('disk full')
+        headless.LogStatistics()
+
+    levels = [(r.levelname, r.getMessage()) for r in caplog.records]
+    assert levels[0] == ('DEBUG', 'a: checked, it was online.')
+    assert levels[1][0] == 'WARNING' and 'dropped' in levels[1][1]
+    assert levels[2] == ('WARNING', "a: not recorded, the bandwidth budget can't sustain 1080p.")
+    assert levels[3][1].startswith('a: recorded in 720p instead of 1080p')
+    assert levels[4] == ('ERROR', "The configuration couldn't be saved: disk full")
+    assert any(message.startswith('Config file: ') for _, message in levels[5:])
+
+    headless.Shutdown()
@@ -0,0 +1,136 @@
+import time
+from threading import Thread
+import pytest
+from pipeline import BufferQueue, BLOCK, SPILL, DROP
+
+def drain(queue: BufferQueue) -> bytes:
+    data = b''
+    while (chunk := queue.get()) is not None:
+        data += chunk
+
+    return data
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        BufferQueue(policy='wait')
+
+def test_keeps_order_and_ends_after_close():
+    queue = BufferQueue(max_bytes=100)
+    for chunk in (b'ab', b'cd', b'ef'):
+        assert queue.put(chunk)
+
+    queue.close()
+    assert drain(queue) == b'abcdef'
+    assert not queue.put(b'gh')
+
+def test_get_timeout():
+    queue = BufferQueue()
+    assert queue.get(0.01) == b''
+
+def test_block_waits_for_the_writer():
+    queue = BufferQueue(max_bytes=4, policy=BLOCK)
+    queue.put(b'1234')
+    done = []
+
+    thread = Thread(target=lambda: done.append(queue.put(b'5678')))
+    thread.start()
+    time.sleep(0.05)
+    assert not done
+
+    assert queue.get() == b'1234'
+    thread.join(1)
+    assert done == [True]
+    assert queue.get() == b'5678'
+
+    stats = queue.stats()
+    assert stats['high_water'] == 4
+    assert stats['blocked_time'] > 0
+
+def test_block_stops_on_close():
+    queue = BufferQueue(max_bytes=4, policy=BLOCK)
+    queue.put(b'1234')
+    done = []
+
+    thread = Thread(target=lambda: done.append(queue.put(b'5678')))
+    thread.start()
+    time.sleep(0.05)
+    queue.close()
+    thread.join(1)
+    assert done == [False]
+
+def test_spill_keeps_order(tmp_path):
+    queue = BufferQueue(max_bytes=4, policy=SPILL, spill_dir=tmp_path)
+    for chunk in (b'1234', b'5678', b'9'):
+        queue.put(chunk)
+
+    # Once something was spilled, a chunk that would fit still goes after it.
+    assert queue.get() == b'1234'
+    queue.put(b'0')
+    queue.close()
+
+    assert drain(queue) == b'56789' + b'0'
+    stats = queue.stats()
+    assert stats['spilled_bytes'] == 6
+    assert stats['buffered'] == 0
+    queue.release()
+
+def test_drop_calls_on_drop():
+    dropped = []
+    queue = BufferQueue(max_bytes=4, policy=DROP, on_drop=dropped.append)
+    queue.put(b'1234')
+    queue.put(b'567')
+    queue.close()
+
+    assert drain(queue) == b'1234'
+    assert dropped == [3]
+    stats = queue.stats()
+    assert (stats['dropped_bytes'], stats['dropped_chunks']) == (3, 1)
+
+def test_chunk_bigger_than_the_buffer_fits_when_empty():
+    queue = BufferQueue(max_bytes=2, policy=DROP)
+    assert queue.put(b'12345')
+    assert queue.stats()['buffered'] == 5
+
+def test_spill_keeps_order_while_both_sides_run():
+    queue = BufferQueue(max_bytes=64, policy=SPILL)
+    chunks = [bytes([i % 251]) * (i % 50 + 1) for i in range(3000)]
+    received = []
+
+    def write():
+        while (chunk := queue.get()) is not None:
+            received.append(chunk)
+            if len(received) % 100 == 0:
+                time.sleep(0.001)
+
+    writer = Thread(target=write)
+    writer.start()
+    for chunk in chunks:
+        queue.put(chunk)
+    queue.close()
+    writer.join(10)
+
+    assert b''.join(received) == b''.join(chunks)
+    assert queue.stats()['spilled_bytes'] > 0
+    queue.release()
+
+def test_spill_io_runs_outside_the_queue_lock(monkeypatch):
+    queue = BufferQueue(max_bytes=4, policy=SPILL)
+    queue.put(b'1234')
+    held = []
+
+    original = BufferQueue._spill
+    def spill(self, data, offset):
+        # The writer can take from the queue while the spill file is being written.
+        def take():
+            if self.cond.acquire(blocking=False):
+                held.append(True)
+                self.cond.release()
+
+        thread = Thread(target=take)
+        thread.start()
+        thread.join()
+        original(self, data, offset)
+
+    monkeypatch.setattr(BufferQueue, '_spill', spill)
+    queue.put(b'5678')
+    assert held == [True]
@@ -0,0 +1,51 @@
+import pytest
+from progress import ProgressRegistry
+
+def test_register_copies_the_entries():
+    registry = ProgressRegistry()
+    entries = registry.entries
+
+    a = registry.register('a', 'best')
+    assert 'a' not in entries and registry.entries['a'] is a
+
+    before = registry.entries
+    registry.unregister('a')
+    registry.unregister('missing')
+    assert 'a' in before and registry.entries == {}
+
+def test_snapshot_rates():
+    registry = ProgressRegistry()
+    a = registry.register('a', 'best')
+    b = registry.register('b', '720p')
+    a.started = b.started = 100.0
+
+    for t in range(1, 21):
+        a.total = t * 1000
+        b.total = t * 3000
+        snapshot = registry.snapshot(100.0 + t)
+
+    quality, started, total, rates = snapshot['a']
+    assert (quality, started, total) == ('best', 100.0, 20000)
+    assert rates[1] == pytest.approx(1000)
+    assert snapshot['b'][3][1] == pytest.approx(3000)
+    assert registry.global_rates()[1] == pytest.approx(4000)
+
+def test_restarted_download_gets_a_new_meter():
+    registry = ProgressRegistry()
+    first = registry.register('a', 'best')
+    first.started = 0.0
+    first.total = 50000
+    registry.snapshot(10.0)
+
+    registry.unregister('a')
+    assert registry.snapshot(11.0) == {}
+    assert registry.meters == {}
+
+    second = registry.register('a', 'best')
+    second.started = 20.0
+    second.total = 1000
+    snapshot = registry.snapshot(21.0)
+    assert snapshot['a'][3][1] == pytest.approx(1000)
+
+    # The global total only counts the bytes added.
+    assert registry.global_total == 51000
@@ -0,0 +1,89 @@
+import os
+import time
+import pytest
+from recording_catalog import RecordingCatalog, ENDED, KILLED, UNKNOWN
+
+@pytest.fixture
+def catalog(tmp_path):
+    catalog = RecordingCatalog(str(tmp_path / 'recordings.db'))
+    yield catalog
+    catalog.close()
+
+def write(path, size: int, mtime: float = None):
+    path.write_bytes(b'x' * size)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    return str(path)
+
+def test_start_update_finish(catalog):
+    recording = catalog.start('/r/a_2026-01-01__00-00-00.ts', 'a', 'https://twitch.tv/a', 'best')
+    catalog.update(recording, 1000)
+    entry, = catalog.recordings()
+    assert entry['bytes'] == 1000 and entry['ended'] is None
+
+    catalog.finish(recording, 2000, KILLED)
+    entry, = catalog.recordings()
+    assert entry['bytes'] == 2000 and entry['end_reason'] == KILLED and entry['ended'] is not None
+
+def test_filters(catalog, monkeypatch):
+    now = time.time()
+    for i, (streamer, started) in enumerate([('a', now - 3600), ('a', now - 60), ('b', now - 60)]):
+        monkeypatch.setattr(time, 'time', lambda: started)
+        recording = catalog.start(f'/r/{i}.ts', streamer, '', 'best')
+        catalog.finish(recording, 100 * (i + 1), ENDED)
+    monkeypatch.undo()
+
+    assert [r['file'] for r in catalog.recordings('a')] == ['/r/1.ts', '/r/0.ts']
+    assert [r['file'] for r in catalog.recordings(since=now - 120)] in (['/r/1.ts', '/r/2.ts'], ['/r/2.ts', '/r/1.ts'])
+    assert [r['file'] for r in catalog.recordings(until=now - 120)] == ['/r/0.ts']
+    assert catalog.summary() == (3, 600)
+    assert catalog.summary('a', since=now - 120) == (1, 200)
+    assert catalog.summary('c') == (0, 0)
+
+def test_last_bitrate_skips_short_recordings(catalog, monkeypatch):
+    now = time.time()
+    clock = [now - 600]
+    monkeypatch.setattr(time, 'time', lambda: clock[0])
+
+    long = catalog.start('/r/long.ts', 'a', '', 'best')
+    clock[0] = now - 480
+    catalog.finish(long, 120 * 1000, ENDED)
+
+    short = catalog.start('/r/short.ts', 'a', '', 'best')
+    clock[0] = now - 470
+    catalog.finish(short, 10 * 5000, ENDED)
+
+    assert catalog.last_bitrate('a', 'best') == pytest.approx(8000)
+    assert catalog.last_bitrate('a', '720p') is None
+
+def test_reconcile(catalog, tmp_path):
+    folder = tmp_path / 'recordings'
+    (folder / 'sub').mkdir(parents=True)
+    old = time.time() - 3600
+
+    # An unknown file, a file whose size changed, a deleted file, a file left open and one in a subfolder.
+    added = write(folder / 'a_2026-01-01__00-00-00.ts', 100)
+    changed = write(folder / 'b_2026-01-01__00-00-00.ts', 300)
+    catalog.finish(catalog.start(changed, 'b', '', 'best'), 200, ENDED)
+    catalog.finish(catalog.start(str(folder / 'c_2026-01-01__00-00-00.ts'), 'c', '', 'best'), 100, ENDED)
+    open_file = write(folder / 'd_2026-01-01__00-00-00.ts', 400, old)
+    catalog.start(open_file, 'd', '', 'best')
+    nested = str(folder / 'sub' / 'e_2026-01-01__00-00-00.ts')
+    catalog.finish(catalog.start(nested, 'e', '', 'best'), 100, ENDED)
+    nested_open = str(folder / 'sub' / 'f_2026-01-01__00-00-00.ts')
+    catalog.start(nested_open, 'f', '', 'best')
+
+    counts = catalog.reconcile(str(folder), stale=60)
+    assert counts == {'added': 1, 'updated': 1, 'removed': 1, 'closed': 1}
+
+    entries = {r['file']: r for r in catalog.recordings()}
+    assert entries[added]['streamer'] == 'a' and entries[added]['end_reason'] == UNKNOWN
+    assert entries[changed]['bytes'] == 300
+    assert str(folder / 'c_2026-01-01__00-00-00.ts') not in entries
+    assert entries[open_file]['ended'] == pytest.approx(old) and entries[open_file]['bytes'] == 400
+
+    # The subfolder isn't scanned, so its entries are left as they were.
+    assert entries[nested]['bytes'] == 100
+    assert entries[nested_open]['ended'] is None
+
+    assert catalog.reconcile(str(folder), stale=60) == {'added': 0, 'updated': 0, 'removed': 0, 'closed': 0}
@@ -0,0 +1,83 @@
+import time
+import queue
+from threading import Event, Thread
+import recording_workers
+import recording_catalog as catalog
+from recording_workers import RecordingPool, RemoteRecording, worker_main
+
+def open_forever(sessions, url: str, quality: str):
+    ''' Worker opener that never returns, like a stream stuck connecting. '''
+
+    time.sleep(60)
+
+class StuckStream():
+    ''' A stream whose reads wait until `release` is set. '''
+
+    def __init__(self, release: Event):
+        self.release = release
+
+    def readinto(self, view) -> int:
+        self.release.wait()
+        return 0
+
+    def close(self):
+        pass
+
+def test_dead_worker_fails_its_recordings(tmp_path, monkeypatch):
+    # The other worker is stuck opening its stream, so it's terminated.
+    monkeypatch.setattr(recording_workers, 'SHUTDOWN_TIMEOUT', 1)
+    pool = RecordingPool(2, open_forever)
+    try:
+        first = pool.submit('https://site.tv/a', 'best', str(tmp_path / 'a.ts'), {})
+        second = pool.submit('https://site.tv/b', 'best', str(tmp_path / 'b.ts'), {})
+        assert first.worker != second.worker
+
+        pool.processes[first.worker].kill()
+        assert first.done.wait(10)
+        assert first.reason == catalog.READ_ERROR
+        assert pool.stats()['recordings'] == 1
+
+        # The other worker's recording goes on.
+        assert not second.done.is_set()
+    finally:
+        pool.shutdown()
+
+    assert second.done.is_set()
+
+def test_callback_that_raises_doesnt_stop_the_listener(capsys):
+    pool = RecordingPool(1)
+    pool.results = queue.Queue()
+
+    def fail(size):
+        raise ValueError('callback failed')
+
+    recording = RemoteRecording(0, 0, on_drop=fail)
+    pool.recordings[0] = recording
+    pool.load[0] = 1
+    listener = Thread(target=pool._listen, daemon=True)
+    listener.start()
+
+    pool.results.put(('drop', 0, 100))
+    pool.results.put(('ended', 0, catalog.ENDED, 1000, {}))
+    assert recording.done.wait(5)
+    assert (recording.reason, recording.total) == (catalog.ENDED, 1000)
+    assert 'callback failed' in capsys.readouterr().err
+
+    pool.isClosed = True
+    listener.join(5)
+
+def test_worker_exits_with_a_stuck_recording(tmp_path, monkeypatch):
+    monkeypatch.setattr(recording_workers, 'CLOSE_TIMEOUT', 0.2)
+    release = Event()
+    commands = queue.Queue()
+    results = queue.Queue()
+
+    commands.put(('start', 0, 'https://site.tv/a', 'best', str(tmp_path / 'a.ts'), {}))
+    commands.put(None)
+
+    start = time.monotonic()
+    worker_main(commands, results, lambda sessions, url, quality: StuckStream(release), {})
+    assert time.monotonic() - start < 5
+    assert results.get(timeout=1)[0] == 'opened'
+
+    release.set()
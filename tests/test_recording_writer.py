@@ -0,0 +1,118 @@
+import os
+import errno
+import pytest
+import recording_writer
+from recording_writer import RecordingWriter, BLOCK_SIZE
+from utilities import LatencyHistogram
+
+def size(path) -> int:
+    return os.path.getsize(path)
+
+def test_coalesces_into_aligned_writes(tmp_path):
+    path = tmp_path / 'a.ts'
+    path.write_bytes(b'x' * 100)
+    latencies = {'write': LatencyHistogram(), 'sync': LatencyHistogram()}
+    writer = RecordingWriter(str(path), write_size=BLOCK_SIZE * 2, latencies=latencies)
+
+    writer.write(b'a' * 5000)
+    assert size(path) == 100
+
+    # The write ends on a block boundary of the file, the rest waits.
+    writer.write(b'b' * 5000)
+    assert size(path) == BLOCK_SIZE * 2
+    assert len(writer.pending) == 10_100 - BLOCK_SIZE * 2
+
+    writer.close()
+    assert path.read_bytes() == b'x' * 100 + b'a' * 5000 + b'b' * 5000
+    assert latencies['write'].count() == 2
+    assert latencies['sync'].count() == 0
+
+def test_tick_writes_what_waited_too_long(tmp_path, monkeypatch):
+    monkeypatch.setattr(recording_writer, 'FLUSH_INTERVAL', 0)
+    path = tmp_path / 'a.ts'
+    writer = RecordingWriter(str(path))
+
+    assert writer.timeout() is None
+    writer.write(b'abc')
+    assert writer.timeout() == 0
+
+    writer.tick()
+    assert path.read_bytes() == b'abc'
+    assert writer.timeout() is None
+    writer.close()
+
+def test_sync_by_size(tmp_path):
+    writer = RecordingWriter(str(tmp_path / 'a.ts'), write_size=BLOCK_SIZE, sync_bytes=BLOCK_SIZE * 2)
+
+    for _ in range(4):
+        writer.write(b'a' * BLOCK_SIZE)
+
+    assert writer.syncs == 2
+    writer.close()
+    assert writer.syncs == 2
+
+def test_sync_by_time(tmp_path, monkeypatch):
+    monkeypatch.setattr(recording_writer, 'FLUSH_INTERVAL', 0)
+    writer = RecordingWriter(str(tmp_path / 'a.ts'), sync_seconds=0.01)
+
+    writer.write(b'abc')
+    writer.tick()
+    assert writer.syncs == 0
+    assert 0 <= writer.timeout() <= 0.01
+
+    writer.unsyncedSince -= 1
+    writer.tick()
+    assert writer.syncs == 1
+
+    # Closing syncs what's left, since there's a sync setting.
+    writer.write(b'def')
+    writer.close()
+    assert writer.syncs == 2
+
+@pytest.mark.skipif(recording_writer._fallocate is None, reason='no fallocate here')
+def test_preallocation_is_given_back(tmp_path):
+    path = tmp_path / 'a.ts'
+    writer = RecordingWriter(str(path), write_size=BLOCK_SIZE, preallocate=1_048_576)
+
+    writer.write(b'a' * BLOCK_SIZE)
+    assert size(path) == BLOCK_SIZE
+    writer.close()
+    assert size(path) == BLOCK_SIZE
+    assert os.stat(path).st_blocks * 512 < 1_048_576
+
+def test_write_error_stops_the_file(tmp_path, monkeypatch):
+    path = tmp_path / 'a.ts'
+    writer = RecordingWriter(str(path), write_size=BLOCK_SIZE)
+
+    def full(fd, data):
+        raise OSError(errno.ENOSPC, 'No space left on device')
+
+    monkeypatch.setattr(recording_writer.os, 'write', full)
+    with pytest.raises(OSError):
+        writer.write(b'a' * BLOCK_SIZE)
+
+    assert writer.error.errno == errno.ENOSPC
+    assert not writer.pending
+    monkeypatch.undo()
+
+    # Nothing more is written, and closing doesn't raise the same error again.
+    writer.write(b'b' * BLOCK_SIZE)
+    assert writer.timeout() is None
+    writer.tick()
+    writer.close()
+    assert size(path) == 0
+
+def test_write_error_on_close(tmp_path, monkeypatch):
+    writer = RecordingWriter(str(tmp_path / 'a.ts'))
+    writer.write(b'abc')
+
+    def broken(fd, data):
+        raise OSError(errno.EIO, 'Input/output error')
+
+    monkeypatch.setattr(recording_writer.os, 'write', broken)
+    with pytest.raises(OSError):
+        writer.close()
+
+    # The file was closed anyway.
+    with pytest.raises(OSError):
+        os.fstat(writer.fd)
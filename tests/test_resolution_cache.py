@@ -0,0 +1,55 @@
+import pytest
+import resolution_cache
+from resolution_cache import ResolutionCache
+
+class Clock():
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(resolution_cache.time, 'monotonic', clock)
+    return clock
+
+def test_expires_after_ttl(clock):
+    cache = ResolutionCache(ttl=60)
+    cache.put('a', {'best': 1})
+    assert cache.get('a') == {'best': 1}
+
+    clock.now += 60
+    assert cache.get('a') is None
+    assert cache.stats() == {'hits': 1, 'misses': 1, 'invalidations': 0, 'size': 0}
+
+def test_max_age(clock):
+    cache = ResolutionCache(ttl=60)
+    cache.put('a', {'best': 1})
+
+    clock.now += 20
+    assert cache.get('a', max_age=30) == {'best': 1}
+    clock.now += 10
+    assert cache.get('a', max_age=30) is None
+    assert cache.get('a') is None
+
+def test_evicts_the_least_recently_used(clock):
+    cache = ResolutionCache(max_size=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    cache.get('a')
+    cache.put('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.stats()['size'] == 2
+
+def test_invalidate(clock):
+    cache = ResolutionCache()
+    cache.put('a', 1)
+    cache.invalidate('a')
+    cache.invalidate('a')
+
+    assert cache.get('a') is None
+    assert cache.stats()['invalidations'] == 1
@@ -0,0 +1,168 @@
+import time
+import pytest
+import dispatch
+from check_history import CheckHistory
+from check_policy import MIN_CHECKS
+from config_store import ConfigStore
+from scheduler import Scheduler
+
+HOUR = 3600
+
+def streamer(name: str, domain: str = 'site.tv', priority: int = 1) -> dict:
+    return {'name': name, 'url': f"https://{domain}/{name}", 'quality': 'best', 'priority': priority, 'wait_until': ''}
+
+@pytest.fixture
+def make_scheduler(tmp_path, monkeypatch):
+    ''' Builds a Scheduler whose files are in `tmp_path` and whose checks are only recorded, never run. '''
+
+    monkeypatch.setattr(dispatch, '_call_after', lambda function, *args, **kwargs: None)
+    schedulers = []
+
+    def make(streamers: list, domains: dict = None, **settings) -> Scheduler:
+        appData = {'download_dir': str(tmp_path), 'catalog_path': str(tmp_path / 'recordings.db'),
+            'history_path': str(tmp_path / 'history.bin'), 'domains': domains or {'site.tv': 30},
+            'streamers_data': streamers, **settings}
+        scheduler = Scheduler(None, ConfigStore(appData), False)
+        schedulers.append(scheduler)
+
+        scheduler.submitted = []
+        scheduler.engine.submit = lambda domain, data, job, callback: scheduler.submitted.append(data['name'])
+        return scheduler
+
+    yield make
+
+    for scheduler in schedulers:
+        scheduler.Shutdown()
+        scheduler.Close()
+
+def learn_offline_now(path, name: str):
+    ''' Gives `name` a history where they're never live at this hour, but are at another one. '''
+
+    history = CheckHistory(str(path))
+    now = time.time()
+    for week in range(MIN_CHECKS):
+        history.record(name, now - week * 168 * HOUR, False, 0)
+        history.record(name, now + 12 * HOUR - week * 168 * HOUR, True, 0)
+    history.close()
+
+def test_learned_streamer_that_isnt_due_is_stepped_past(tmp_path, make_scheduler):
+    learn_offline_now(tmp_path / 'history.bin', 'learned')
+    scheduler = make_scheduler([streamer('learned'), streamer('new', priority=5)])
+    assert scheduler.policy.learned('learned', time.time())
+
+    # 'learned' waited longer, so it's on top, but its learned wait isn't over.
+    scheduler.streamers['learned']['checked_at'] = time.monotonic() - 100
+    scheduler.PushToHeap(scheduler.streamers['learned'])
+    scheduler.PushToHeap(scheduler.streamers['new'], checked=True)
+    heap = scheduler.queueOf['new']['heap']
+    assert heap.peek()[0] == 'learned'
+
+    scheduler.ChooseOne('site.tv')
+    assert scheduler.submitted == ['new']
+    assert heap.peek()[0] == 'learned'
+
+    # Nobody else is left, so nothing is checked until 'learned' is due.
+    scheduler.ChooseOne('site.tv')
+    assert scheduler.submitted == ['new']
+
+    scheduler.streamers['learned']['checked_at'] -= 10 * HOUR
+    scheduler.PushToHeap(scheduler.streamers['learned'])
+    scheduler.ChooseOne('site.tv')
+    assert scheduler.submitted == ['new', 'learned']
+
+def test_static_policy_checks_the_top(make_scheduler):
+    scheduler = make_scheduler([streamer('a'), streamer('b', priority=5)], check_policy='static')
+    scheduler.ChooseOne('site.tv')
+    scheduler.ChooseOne('site.tv')
+    assert scheduler.submitted == ['a', 'b']
+
+def test_rename_keeps_the_history(tmp_path, make_scheduler):
+    learn_offline_now(tmp_path / 'history.bin', 'old')
+    scheduler = make_scheduler([streamer('old')])
+    assert scheduler.policy.learned('old', time.time())
+
+    scheduler.store.update_streamer('old', {'name': 'new'})
+    scheduler.EditStreamer('old', streamer('new'))
+    assert scheduler.history.histogram('old') is None
+    assert scheduler.policy.learned('new', time.time())
+
+    scheduler.history.close()
+    assert CheckHistory(str(tmp_path / 'history.bin')).histogram('new') is not None
+
+def check_indexes(scheduler: Scheduler):
+    ''' Every index agrees with the others and with the store. '''
+
+    queued = set()
+    for domain, queue in scheduler.scheduler.items():
+        assert queue['domain'] == domain
+        for name, record in queue['streamers'].items():
+            assert name not in queued
+            queued.add(name)
+
+            assert record['name'] == name
+            assert scheduler.streamers[name] is record
+            assert scheduler.queueOf[name] is queue
+            assert scheduler.store.record(name) is record
+            assert record['url'].split('/')[2] == domain
+
+            # Out of the fridge a streamer is in its heap. One put in the fridge may still be
+            # there too, `ChooseOne` drops it when it comes up.
+            in_fridge = name in scheduler.fridge
+            assert in_fridge == (record['wait_until'] != '')
+            assert in_fridge or name in queue['heap']
+
+        for entry in queue['heap'].heap:
+            assert entry[2] in queue['streamers']
+
+    assert queued == set(scheduler.streamers) == set(scheduler.queueOf)
+    for entry in scheduler.fridge.heap:
+        assert entry[2] in queued
+
+def test_indexes_stay_consistent(make_scheduler):
+    domains = {f"site{d}.tv": 30 for d in range(4)}
+    streamers = [streamer(f"s{i}", f"site{i % 4}.tv", i % 5 + 1) for i in range(4000)]
+    scheduler = make_scheduler(streamers, domains)
+    check_indexes(scheduler)
+    assert len(scheduler.streamers) == 4000
+
+    # Renames, and moves to another domain.
+    for i in range(0, 4000, 7):
+        new = streamer(f"r{i}", f"site{(i + 1) % 4}.tv" if i % 2 else f"site{i % 4}.tv", 2)
+        scheduler.store.update_streamer(f"s{i}", new)
+        scheduler.EditStreamer(f"s{i}", new)
+    check_indexes(scheduler)
+    assert 's7' not in scheduler.streamers and scheduler.queueOf['r7']['domain'] == 'site0.tv'
+
+    # Into the fridge and out of it, by hand and when the time is over.
+    for i in range(1, 4000, 5):
+        name = scheduler.store.record(f"s{i}") and f"s{i}" or f"r{i}"
+        until = '2000-01-01 00:00:00' if i % 2 else '2100-01-01 00:00:00'
+        scheduler.store.set_wait_until(name, until)
+        scheduler.PutInFridge(name, until)
+    check_indexes(scheduler)
+
+    scheduler.TransferFromFridgeToQueue('s6')
+    scheduler.isActive = True
+    scheduler.OnTimer()
+    scheduler.isActive = False
+    check_indexes(scheduler)
+    assert len(scheduler.fridge) == 399
+    assert 's6' in scheduler.queueOf['s6']['heap']
+
+    # Taken out to be recorded and queued again.
+    for i in range(2, 4000, 11):
+        name = scheduler.store.record(f"s{i}") and f"s{i}" or f"r{i}"
+        record = scheduler.streamers[name]
+        domain = scheduler.queueOf[name]['domain']
+        scheduler.RemoveFromQueue(name)
+        assert name not in scheduler.streamers and name not in scheduler.fridge
+        scheduler.RemoveFromThread(name)
+        scheduler.AddToQueue(record, domain)
+    check_indexes(scheduler)
+
+    # Deleted.
+    for i in range(3, 4000, 13):
+        name = scheduler.store.record(f"s{i}") and f"s{i}" or f"r{i}"
+        scheduler.store.remove_streamer(name)
+        scheduler.RemoveFromQueue(name)
+    check_indexes(scheduler)
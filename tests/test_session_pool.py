@@ -0,0 +1,89 @@
+import sys
+import types
+import pytest
+from threading import Thread
+from session_pool import SessionPool, DEFAULTS
+
+class FakeHTTP():
+    def __init__(self, adapters: dict):
+        self.adapters = adapters
+        self.headers = {}
+
+@pytest.fixture
+def streamlink(monkeypatch):
+    ''' Stands in for streamlink, whose sessions get `make_adapter()` adapters, and records the `setup_adapter` calls. '''
+
+    fake = types.SimpleNamespace(sessions=[], setups=[], make_adapter=object, real_setup=None)
+
+    class Streamlink():
+        def __init__(self):
+            self.http = FakeHTTP({'https://': fake.make_adapter(), 'http://': fake.make_adapter()})
+            fake.sessions.append(self)
+
+    def setup_adapter(adapter, stats, pool_size, retries, backoff, keep_alive):
+        fake.setups.append((adapter, stats, pool_size, retries, backoff, keep_alive))
+        if fake.real_setup:
+            fake.real_setup(adapter, stats, pool_size, retries, backoff, keep_alive)
+
+    module = types.ModuleType('streamlink')
+    module.Streamlink = Streamlink
+    options = types.ModuleType('streamlink.options')
+    options.Options = dict
+    monkeypatch.setitem(sys.modules, 'streamlink', module)
+    monkeypatch.setitem(sys.modules, 'streamlink.options', options)
+
+    # http_adapter imports requests, which the other tests don't need.
+    adapter_module = types.ModuleType('http_adapter')
+    adapter_module.setup_adapter = setup_adapter
+    monkeypatch.setitem(sys.modules, 'http_adapter', adapter_module)
+
+    return fake
+
+def test_settings_apply_overrides():
+    pool = SessionPool({'http_pool_size': 4, 'http_domains': {'twitch.tv': {'http_pool_size': 20, 'http_keep_alive': False}}})
+
+    assert pool.settings('twitch.tv') == {**DEFAULTS, 'http_pool_size': 20, 'http_keep_alive': False}
+    assert pool.settings('youtube.com') == {**DEFAULTS, 'http_pool_size': 4}
+    assert SessionPool().settings('twitch.tv') == DEFAULTS
+
+def test_one_session_per_domain(streamlink):
+    pool = SessionPool()
+    sessions = []
+    threads = [Thread(target=lambda: sessions.append(pool.get('twitch.tv'))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(streamlink.sessions) == 1 and all(s is streamlink.sessions[0] for s in sessions)
+    assert pool.get('youtube.com') is not sessions[0]
+    assert len(streamlink.sessions) == 2
+    assert set(pool.connection_stats()) == {'twitch.tv', 'youtube.com'}
+
+def test_overrides_reach_the_adapters(streamlink):
+    pool = SessionPool({'http_retries': 5, 'http_domains': {'twitch.tv': {'http_pool_size': 20, 'http_keep_alive': False}}})
+    twitch = pool.get('twitch.tv')
+    youtube = pool.get('youtube.com')
+
+    # Streamlink's own adapters are set up in place, both on one stats object per domain.
+    setups = {id(adapter): rest for adapter, *rest in streamlink.setups}
+    for session, pool_size, keep_alive in ((twitch, 20, False), (youtube, 10, True)):
+        adapters = list(session.http.adapters.values())
+        assert all(setups[id(a)][1:] == [pool_size, 5, 0.5, keep_alive] for a in adapters)
+        assert setups[id(adapters[0])][0] is setups[id(adapters[1])][0]
+
+    assert twitch.http.headers == {'Connection': 'close'}
+    assert youtube.http.headers == {}
+
+def test_real_adapters_are_sized(streamlink, monkeypatch):
+    requests = pytest.importorskip('requests')
+    monkeypatch.delitem(sys.modules, 'http_adapter')
+    from http_adapter import setup_adapter
+
+    streamlink.make_adapter = requests.adapters.HTTPAdapter
+    streamlink.real_setup = setup_adapter
+    pool = SessionPool({'http_pool_size': 7, 'http_retries': 2})
+
+    adapter = pool.get('twitch.tv').http.adapters['https://']
+    assert adapter.poolmanager.connection_pool_kw['maxsize'] == 7
+    assert adapter.max_retries.total == 2
@@ -0,0 +1,79 @@
+import json
+import pytest
+from config_store import ConfigStore, load_config
+from state_db import StateDatabase
+
+def config() -> dict:
+    return {
+        'storage': 'sqlite',
+        'download_dir': '/recordings',
+        'log_scroll_down': True,
+        'domains': {'twitch.tv': 60, 'youtube.com': 120},
+        'streamers_data': [
+            {'name': 'a', 'url': 'https://twitch.tv/a', 'quality': 'best', 'priority': 1, 'wait_until': ''},
+            {'name': 'b', 'url': 'https://youtube.com/b', 'quality': '720p', 'priority': 2, 'wait_until': '2026-01-01 00:00:00'},
+        ],
+    }
+
+def test_json_is_migrated_once(tmp_path):
+    json_path = tmp_path / 'config.json'
+    db_path = tmp_path / 'config.db'
+    json_path.write_text(json.dumps(config()))
+
+    data, database = load_config(str(json_path), str(db_path), dict)
+    assert database is not None
+    assert not json_path.exists()
+    assert (tmp_path / 'config.json.migrated').exists()
+    assert database.load() == config() == data
+    database.close()
+
+    # The next start reads the database.
+    data, database = load_config(str(json_path), str(db_path), dict)
+    assert data == config()
+    database.close()
+
+def test_missing_json_is_created_from_defaults(tmp_path):
+    json_path = tmp_path / 'config.json'
+    data, database = load_config(str(json_path), str(tmp_path / 'config.db'), lambda: {'domains': {}, 'streamers_data': []})
+
+    assert database is None
+    assert json.loads(json_path.read_text()) == data
+
+def test_store_changes_are_saved_as_rows(tmp_path):
+    database = StateDatabase(str(tmp_path / 'config.db'))
+    database.import_data(config())
+    changes = []
+    store = ConfigStore(database.load(), lambda: changes.append(1), database)
+
+    store.set('download_dir', '/elsewhere')
+    store.set('domains', {'twitch.tv': 30})
+    store.add_streamer({'name': 'c', 'url': 'https://twitch.tv/c', 'quality': 'best', 'priority': 3, 'wait_until': ''})
+    store.update_streamer('a', {'name': 'renamed', 'quality': '480p'})
+    store.set_wait_until('renamed', '2026-02-01 00:00:00')
+    store.set_wait_until('b', '')
+    store.remove_streamer('c')
+
+    # With the database, nothing asks for the json file to be saved.
+    assert not changes
+
+    database.close()
+    data = StateDatabase(str(tmp_path / 'config.db')).load()
+    assert data['download_dir'] == '/elsewhere'
+    assert data['domains'] == {'twitch.tv': 30}
+    assert data['streamers_data'] == [
+        {'name': 'renamed', 'url': 'https://twitch.tv/a', 'quality': '480p', 'priority': 1, 'wait_until': '2026-02-01 00:00:00'},
+        {'name': 'b', 'url': 'https://youtube.com/b', 'quality': '720p', 'priority': 2, 'wait_until': ''},
+    ]
+
+def test_failed_write_is_rolled_back(tmp_path):
+    database = StateDatabase(str(tmp_path / 'config.db'))
+    database.import_data(config())
+
+    with pytest.raises(Exception):
+        database.set_domains({'twitch.tv': object()})
+
+    assert database.load()['domains'] == config()['domains']
+
+    # The connection isn't left in the failed transaction.
+    database.set_domains({'twitch.tv': 10})
+    assert database.load()['domains'] == {'twitch.tv': 10}
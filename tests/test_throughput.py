@@ -0,0 +1,49 @@
+import math
+import pytest
+from throughput import ThroughputMeter
+
+def test_ewma_follows_a_steady_rate():
+    meter = ThroughputMeter(time_constant=3)
+    for t in range(31):
+        meter.sample(t * 1000, t)
+
+    assert meter.rate == pytest.approx(1000 * (1 - math.exp(-10)))
+
+def test_ewma_smooths_bursts():
+    meter = ThroughputMeter(time_constant=3)
+    meter.sample(0, 0)
+    meter.sample(6000, 1)
+
+    # A 6000 B burst after one second moves the estimate only part of the way.
+    assert meter.rate == pytest.approx(6000 * (1 - math.exp(-1 / 3)))
+
+    for t in range(2, 7):
+        meter.sample(6000, t)
+    assert meter.rate < 6000 * (1 - math.exp(-1 / 3))
+
+def test_window_averages():
+    meter = ThroughputMeter(window=60)
+    total = 0
+    for t in range(121):
+        # 1000 B/s for the first 110 s, then 5000 B/s.
+        total += 1000 if t <= 110 else 5000
+        meter.sample(total, t)
+
+    instant, short, long = meter.rates()
+    assert short == pytest.approx(5000)
+    assert long == pytest.approx((50 * 1000 + 10 * 5000) / 60)
+
+    # The window keeps one sample older than 60 s and drops the rest.
+    assert meter.samples[0][0] == 60
+
+def test_short_history_and_bad_samples():
+    meter = ThroughputMeter()
+    assert meter.rates() == (0.0, 0.0, 0.0)
+
+    meter.sample(0, 10)
+    meter.sample(500, 10)
+    meter.sample(500, 9)
+    assert len(meter.samples) == 1
+
+    meter.sample(1000, 12)
+    assert meter.average(10) == meter.average(60) == pytest.approx(500)
@@ -0,0 +1,62 @@
+'''
+Estimates download speed from timestamped byte totals. HLS delivers data in segment-sized
+bursts, so the bytes in any single second swing between zero and a whole segment.
+The instantaneous speed is smoothed with an EWMA. The 10 s and 60 s averages come
+from a sliding window of (time, total) samples.
+'''
+
+import math
+from collections import deque
+
+class ThroughputMeter():
+    def __init__(self, window: float = 60, time_constant: float = 3):
+        self.window = window
+        self.time_constant = time_constant
+
+        self.samples = deque()
+        self.rate = 0.0
+        self.last_total = 0
+
+    def sample(self, total: int, now: float):
+        ''' Records that `total` bytes had been downloaded at the monotonic time `now`. '''
+
+        if self.samples:
+            last_time, last_total = self.samples[-1]
+            diff = now - last_time
+            if diff <= 0:
+                return
+
+            rate = (total - last_total) / diff
+            alpha = 1 - math.exp(-diff / self.time_constant)
+            self.rate += alpha * (rate - self.rate)
+
+        self.samples.append((now, total))
+        self.last_total = total
+
+        # Keeps one sample older than the window, so the window average covers the whole window.
+        while len(self.samples) > 2 and self.samples[1][0] <= now - self.window:
+            self.samples.popleft()
+
+    def average(self, seconds: float) -> float:
+        ''' Returns the average speed, in bytes per second, over the last `seconds`.
+        If there's less history than that, the average covers all of it. '''
+
+        if len(self.samples) < 2:
+            return 0.0
+
+        latest_time, latest_total = self.samples[-1]
+        oldest_time, oldest_total = self.samples[0]
+        for t, total in reversed(self.samples):
+            if t <= latest_time - seconds:
+                oldest_time, oldest_total = t, total
+                break
+
+        if latest_time <= oldest_time:
+            return 0.0
+
+        return (latest_total - oldest_total) / (latest_time - oldest_time)
+
+    def rates(self) -> tuple:
+        ''' Returns a tuple (instantaneous, 10 s average, 60 s average), in bytes per second. '''
+
+        return (self.rate, self.average(10), self.average(60))
@@ -1,3 +1,79 @@
+from importlib import metadata
+from threading import Lock
+
+class LatencyStats:
+    ''' Count, mean and max of a series of durations. '''
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value: float):
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+class LatencyHistogram:
+    ''' Durations counted in power-of-two buckets: bucket 0 is under 64 µs, bucket `i` under 64·2^i µs,
+    and the last one everything longer. Added to from any thread. '''
+
+    BUCKETS = 17
+    SMALLEST = 64e-6
+
+    def __init__(self):
+        self.counts = [0] * self.BUCKETS
+        self.total = 0.0
+        self.max = 0.0
+        self.lock = Lock()
+
+    def add(self, seconds: float):
+        i = 0
+        limit = self.SMALLEST
+        while seconds >= limit and i < self.BUCKETS - 1:
+            limit *= 2
+            i += 1
+
+        with self.lock:
+            self.counts[i] += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def snapshot(self) -> tuple:
+        ''' Returns (counts, total, max), to be sent to another process and given to `merge`. '''
+
+        with self.lock:
+            return list(self.counts), self.total, self.max
+
+    def merge(self, counts: list, total: float, most: float):
+        with self.lock:
+            for i, count in enumerate(counts):
+                self.counts[i] += count
+            self.total += total
+            self.max = max(self.max, most)
+
+    def count(self) -> int:
+        with self.lock:
+            return sum(self.counts)
+
+    def percentile(self, share: float) -> float:
+        ''' Returns the upper bound of the bucket holding the `share` (0 to 1) percentile. The last bucket gives the max. '''
+
+        with self.lock:
+            target = share * sum(self.counts)
+            seen = 0
+            for i, count in enumerate(self.counts):
+                seen += count
+                if count and seen >= target:
+                    return self.SMALLEST * 2 ** i if i < self.BUCKETS - 1 else self.max
+
+            return 0.0
+
 class dummy_event:
     def __init__(self, id):
         self.id = id
@@ -5,6 +81,15 @@ class dummy_event:
     def GetId(self):
         return self.id
 
+def package_version(name: str) -> str | int:
+    ''' Returns the installed version of the package `name`, or -1 if it isn't installed.
+    Read from the package metadata, so the package itself isn't imported. '''
+
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return -1
+
 def get_unit(size: float) -> str:
     unit = ''
     if size < 1024:
@@ -30,15 +115,24 @@ def get_downloaded_value(size: float) -> float:
         return size / 1_073_741_824
 
 
-def get_progress_text(dl_total: float, dl_temp: float, time_diff: float) -> tuple:
+def get_speed_text(speed: float) -> str:
+    ''' Returns `speed`, in bytes per second, as text. '''
+
+    return f"{get_downloaded_value(speed):.2f} {get_unit(speed)}/s"
+
+
+def get_progress_text(dl_total: float, speed: float) -> tuple:
     ''' Returns a tuple (downloaded, speed). '''
     
     downloaded = get_downloaded_value(dl_total)
     unit_downloaded = get_unit(dl_total)
-    
-    speed = get_downloaded_value(dl_temp / time_diff)
-    speed_unit = get_unit(dl_temp / time_diff)
 
-    t = (f"{downloaded:.2f} {unit_downloaded}", f"{speed:.2f} {speed_unit}/s")
+    t = (f"{downloaded:.2f} {unit_downloaded}", get_speed_text(speed))
     return t
-    
\ No newline at end of file
+
+
+def get_elapsed_text(seconds: float) -> str:
+    ''' Returns `seconds` formatted as HH:MM:SS. '''
+
+    seconds = int(seconds)
+    return f"{seconds // 3600:02}:{seconds // 60 % 60:02}:{seconds % 60:02}"
\ No newline at end of file